@@ -7,6 +7,7 @@ service BlogService {
         response: Post[]
         cache: 5m
         rateLimit: 100/m
+        pageSize: 20
     }
     
     endpoint /posts/:id {
@@ -68,6 +68,12 @@ service ProductService {
     
     connect to InventoryService via http
     
+    // Fill the product cache before the readiness probe passes
+    on start {
+        warmPools()
+        primeCache()
+    }
+    
     deploy on: kubernetes
     port: 8002
     replicas: 5
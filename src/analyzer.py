@@ -0,0 +1,253 @@
+"""
+CloudScript Semantic Analyzer - Latency budgets across service call chains
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from ast_nodes import Program
+from ir import program_model
+
+
+# Protocols where the caller waits for the callee's response
+SYNC_PROTOCOLS = {"http", "grpc"}
+
+
+@dataclass
+class BudgetViolation:
+    """A service whose timeout does not cover its downstream call chain"""
+    service: str
+    timeout: float
+    required: float
+    slowest_callee: str
+
+
+@dataclass
+class AnalysisReport:
+    """Result of the latency-budget analysis"""
+    violations: List[BudgetViolation] = field(default_factory=list)
+    cycles: List[List[str]] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)
+    critical_path: List[str] = field(default_factory=list)
+    critical_latency: float = 0.0
+    
+    # Services shown at each end of a long critical path in the summary
+    SUMMARY_ENDS = 3
+    
+    @property
+    def ok(self) -> bool:
+        return not self.violations and not self.cycles
+    
+    def summary(self) -> str:
+        """The critical path on one line, with the middle of a long path elided"""
+        if not self.critical_path:
+            return ""
+        path = self.critical_path
+        ends = self.SUMMARY_ENDS
+        if len(path) > 2 * ends + 1:
+            path = path[:ends] + [f"... {len(path) - 2 * ends} more ..."] + path[-ends:]
+        return f"   Critical path: {' -> '.join(path)} ({self.critical_latency:g}s worst case)"
+    
+    def format(self) -> str:
+        """Format the report for console output"""
+        lines = []
+        for violation in self.violations:
+            lines.append(
+                f"⚠️  {violation.service}: timeout {violation.timeout:g}s does not cover "
+                f"downstream worst case {violation.required:g}s "
+                f"(via {violation.slowest_callee})"
+            )
+        for cycle in self.cycles:
+            lines.append(f"⚠️  Call cycle: {' -> '.join(cycle + cycle[:1])}")
+        for target in self.unresolved:
+            lines.append(f"   ℹ️  {target} is not defined in this spec, treated as external")
+        if self.critical_path:
+            lines.append(
+                f"   Critical path: {' -> '.join(self.critical_path)} "
+                f"({self.critical_latency:g}s worst case)"
+            )
+        return "\n".join(lines)
+
+
+class LatencyAnalyzer:
+    """Checks that caller timeouts exceed the worst-case latency of their callees.
+
+    The worst-case latency of a call into a service is its own timeout (the
+    largest endpoint ``timeout:``) plus the worst-case latency of its slowest
+    downstream chain, plus ``hop_overhead`` seconds per network hop. Only
+    synchronous connections (http, grpc) are considered. Runs in
+    O(services + connections).
+    """
+    
+    def __init__(self, hop_overhead: float = 0.01):
+        self.hop_overhead = hop_overhead
+    
+    def analyze(self, program: Program) -> AnalysisReport:
+        report = AnalysisReport()
+        
+        model = program_model(program)
+        services = model.by_name
+        edges: Dict[str, List[str]] = {}
+        unresolved = set()
+        
+        for service in model.services:
+            targets = []
+            for conn in service.connections:
+                if conn.protocol not in SYNC_PROTOCOLS:
+                    continue
+                targets.append(conn.target_service)
+                if conn.target_service not in services:
+                    unresolved.add(conn.target_service)
+            edges[service.name] = targets
+        
+        report.unresolved = sorted(unresolved)
+        timeouts = {name: service.timeout_seconds for name, service in services.items()}
+        
+        # Components come out of Tarjan's algorithm in reverse topological
+        # order, so every callee is finished before its callers.
+        components = self._strongly_connected_components(list(services), edges)
+        component_of = {}
+        for index, component in enumerate(components):
+            for name in component:
+                component_of[name] = index
+            if len(component) > 1 or component[0] in edges.get(component[0], []):
+                report.cycles.append(component)
+        
+        downstream: Dict[str, float] = {}
+        next_hop: Dict[str, Optional[str]] = {}
+        
+        for component in components:
+            for name in component:
+                worst = 0.0
+                worst_target = None
+                for target in edges[name]:
+                    if component_of.get(target) == component_of[name]:
+                        # Cyclic edges have no finite worst case; reported above
+                        continue
+                    cost = self.hop_overhead + (timeouts.get(target) or 0.0) + downstream.get(target, 0.0)
+                    if worst_target is None or cost > worst:
+                        worst = cost
+                        worst_target = target
+                downstream[name] = worst
+                next_hop[name] = worst_target
+        
+        for service in model.services:
+            timeout = timeouts[service.name]
+            required = downstream[service.name]
+            if timeout is not None and next_hop[service.name] is not None and timeout <= required:
+                report.violations.append(BudgetViolation(
+                    service=service.name,
+                    timeout=timeout,
+                    required=round(required, 6),
+                    slowest_callee=next_hop[service.name]
+                ))
+        
+        if model.services:
+            root = max(model.services, key=lambda s: downstream[s.name]).name
+            if next_hop[root] is not None:
+                report.critical_path = self._follow(root, next_hop)
+                report.critical_latency = round(downstream[root], 6)
+        
+        return report
+    
+    def _follow(self, start: str, next_hop: Dict[str, Optional[str]]) -> List[str]:
+        """Reconstruct the slowest call path starting at a service"""
+        path = [start]
+        current = next_hop.get(start)
+        while current is not None:
+            path.append(current)
+            current = next_hop.get(current)
+        return path
+    
+    def _strongly_connected_components(self, nodes: List[str], edges: Dict[str, List[str]]) -> List[List[str]]:
+        """Iterative Tarjan's algorithm (no recursion limit on deep call chains)"""
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        counter = 0
+        children_of = {node: [t for t in edges.get(node, []) if t in edges] for node in nodes}
+        
+        for root in nodes:
+            if root in index_of:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child_index = work.pop()
+                if child_index == 0:
+                    index_of[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                
+                children = children_of[node]
+                recurse = False
+                for i in range(child_index, len(children)):
+                    child = children[i]
+                    if child not in index_of:
+                        work.append((node, i + 1))
+                        work.append((child, 0))
+                        recurse = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                if recurse:
+                    continue
+                
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component[::-1])
+                
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+        
+        return components
+
+
+def main():
+    from lexer import Lexer
+    from parser import Parser
+    
+    code = """
+    service Gateway {
+        endpoint /orders {
+            method: POST
+            timeout: 5s
+        }
+        connect to OrderService via http
+    }
+
+    service OrderService {
+        endpoint /orders {
+            method: POST
+            timeout: 3s
+        }
+        connect to PaymentService via grpc
+        connect to NotificationService via rabbitmq
+    }
+
+    service PaymentService {
+        endpoint /payments {
+            method: POST
+            timeout: 3s
+        }
+    }
+    """
+    
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    parser = Parser(tokens)
+    ast = parser.parse()
+    
+    report = LatencyAnalyzer().analyze(ast)
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ class ASTNode:
 class Program(ASTNode):
     """Root node of the AST"""
     services: List['Service'] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -38,6 +39,8 @@ class Endpoint(ASTNode):
     timeout: Optional[str] = None
     auth: Optional[str] = None
     fallback: Optional[str] = None
+    compress: Optional[str] = None  # auto, gzip, br, zstd or none
+    page_size: Optional[str] = None  # items per page of an array response
 
 
 @dataclass
@@ -61,6 +64,27 @@ class DatabaseConfig(ASTNode):
     settings: Dict[str, Any] = field(default_factory=dict)
 
 
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def duration_to_seconds(duration: Optional[str]) -> Optional[float]:
+    """Convert a duration literal (e.g. '5m', '3s') to seconds"""
+    if not duration:
+        return None
+    unit = duration[-1]
+    if unit in DURATION_UNITS:
+        return float(duration[:-1]) * DURATION_UNITS[unit]
+    return float(duration)
+
+
+def rate_limit_per_second(rate_limit: Optional[str]) -> Optional[float]:
+    """Convert a rate limit literal (e.g. '100/m') to requests per second"""
+    if not rate_limit:
+        return None
+    count, _, unit = rate_limit.partition('/')
+    return float(count) / DURATION_UNITS.get(unit or 's', 1)
+
+
 def print_ast(node: ASTNode, indent: int = 0) -> str:
     """Pretty print AST for debugging"""
     result = []
@@ -68,6 +92,8 @@ def print_ast(node: ASTNode, indent: int = 0) -> str:
     
     if isinstance(node, Program):
         result.append(f"{prefix}Program:")
+        for path in node.imports:
+            result.append(f"{prefix}  Import: {path}")
         for service in node.services:
             result.append(print_ast(service, indent + 1))
     
@@ -85,6 +111,10 @@ def print_ast(node: ASTNode, indent: int = 0) -> str:
             result.append(f"{prefix}  Configs:")
             for key, value in node.configs.items():
                 result.append(f"{prefix}    {key}: {value}")
+        if node.events:
+            result.append(f"{prefix}  Events:")
+            for event in node.events:
+                result.append(print_ast(event, indent + 2))
     
     elif isinstance(node, Endpoint):
         result.append(f"{prefix}Endpoint: {node.path}")
@@ -100,8 +130,15 @@ def print_ast(node: ASTNode, indent: int = 0) -> str:
             result.append(f"{prefix}  timeout: {node.timeout}")
         if node.auth:
             result.append(f"{prefix}  auth: {node.auth}")
+        if node.compress:
+            result.append(f"{prefix}  compress: {node.compress}")
+        if node.page_size:
+            result.append(f"{prefix}  pageSize: {node.page_size}")
     
     elif isinstance(node, Connection):
         result.append(f"{prefix}Connection to {node.target_service} via {node.protocol}")
     
+    elif isinstance(node, Event):
+        result.append(f"{prefix}On {node.event_type}: {', '.join(node.actions)}")
+    
     return "\n".join(result)
@@ -0,0 +1,371 @@
+"""
+CloudScript AST Serializer - Versioned binary format for precompiled specs (.csc)
+"""
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from ast_nodes import Program, Service, Endpoint, Connection, Event
+
+
+MAGIC = b"CSC\x00"
+
+# Bump when the layout changes; readers accept every version up to this one
+FORMAT_VERSION = 3
+
+COMPILED_SUFFIX = ".csc"
+
+# magic, version, flags, string count, import count, service count
+HEADER = struct.Struct("<4sHHIII")
+
+# Every field is a little-endian uint32: string ids, counts and value tags.
+# String ids start at 1 so that 0 can stand for None.
+NONE_ID = 0
+
+TAG_NONE, TAG_STR, TAG_INT, TAG_FLOAT, TAG_BOOL, TAG_LIST, TAG_DICT = range(7)
+
+ENDPOINT_FIELDS = ("path", "method", "response_type", "cache", "rate_limit", "timeout", "auth", "fallback",
+                   "compress", "page_size")
+
+# Endpoint fields stored by each format version; later fields read as None
+ENDPOINT_FIELD_COUNT = {1: 8, 2: 9, 3: 10}
+
+# Words are held in array('I'), which must be 32 bits wide; the check
+# is explicit so it also runs under python -O
+if array("I").itemsize != 4:
+    raise ImportError(f"array('I') is {array('I').itemsize} bytes on this platform; the .csc format needs 4")
+
+# array('I') uses native byte order; the format is little-endian
+SWAP_BYTES = sys.byteorder == "big"
+
+
+class ASTFormatError(ValueError):
+    """Raised when data is not a readable serialized AST"""
+    pass
+
+
+def _to_bytes(words: array) -> bytes:
+    """uint32 words as little-endian bytes"""
+    if SWAP_BYTES:
+        words = array("I", words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def _from_bytes(data) -> array:
+    """Little-endian bytes as uint32 words; ValueError unless a multiple of 4 bytes"""
+    words = array("I")
+    words.frombytes(data)
+    if SWAP_BYTES:
+        words.byteswap()
+    return words
+
+
+class _Writer:
+    """Encodes nodes into uint32 words with a shared string table"""
+    
+    def __init__(self):
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+    
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE_ID
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            self.strings.append(value)
+            string_id = self.string_ids[value] = len(self.strings)
+        return string_id
+    
+    def value(self, words: array, value: Any):
+        if value is None:
+            words.append(TAG_NONE)
+        elif isinstance(value, bool):
+            words.extend((TAG_BOOL, int(value)))
+        elif isinstance(value, int):
+            words.extend((TAG_INT, self.string(str(value))))
+        elif isinstance(value, float):
+            words.extend((TAG_FLOAT, self.string(repr(value))))
+        elif isinstance(value, str):
+            words.extend((TAG_STR, self.string(value)))
+        elif isinstance(value, (list, tuple)):
+            words.extend((TAG_LIST, len(value)))
+            for item in value:
+                self.value(words, item)
+        elif isinstance(value, dict):
+            words.extend((TAG_DICT, len(value)))
+            for key, item in value.items():
+                words.append(self.string(str(key)))
+                self.value(words, item)
+        else:
+            raise TypeError(f"Cannot serialize config value of type {type(value).__name__}")
+    
+    def service(self, service: Service) -> array:
+        words = array("I", (self.string(service.name), len(service.endpoints)))
+        string = self.string
+        for endpoint in service.endpoints:
+            words.extend(string(getattr(endpoint, name)) for name in ENDPOINT_FIELDS)
+        words.append(len(service.connections))
+        for conn in service.connections:
+            words.extend((string(conn.target_service), string(conn.protocol)))
+        self.value(words, service.configs)
+        words.append(len(service.events))
+        for event in service.events:
+            words.extend((string(event.event_type), len(event.actions)))
+            words.extend(string(action) for action in event.actions)
+        return words
+
+
+class _Reader:
+    """Decodes one service record"""
+    
+    def __init__(self, words: array, strings: List[Optional[str]], version: int = FORMAT_VERSION):
+        self.words = words
+        self.strings = strings
+        self.width = ENDPOINT_FIELD_COUNT[version]
+        self.position = 0
+    
+    def value(self) -> Any:
+        words = self.words
+        tag = words[self.position]
+        self.position += 1
+        if tag == TAG_NONE:
+            return None
+        payload = words[self.position]
+        self.position += 1
+        if tag == TAG_STR:
+            return self.strings[payload]
+        if tag == TAG_INT:
+            return int(self.strings[payload])
+        if tag == TAG_FLOAT:
+            return float(self.strings[payload])
+        if tag == TAG_BOOL:
+            return bool(payload)
+        if tag == TAG_LIST:
+            return [self.value() for _ in range(payload)]
+        if tag == TAG_DICT:
+            result = {}
+            for _ in range(payload):
+                key = self.strings[words[self.position]]
+                self.position += 1
+                result[key] = self.value()
+            return result
+        raise ASTFormatError(f"Unknown value tag {tag}")
+    
+    def service(self) -> Service:
+        words = self.words
+        strings = self.strings
+        name = strings[words[0]]
+        count = words[1]
+        position = 2
+        width = self.width
+        
+        endpoints = []
+        for _ in range(count):
+            endpoints.append(Endpoint(*[strings[i] for i in words[position:position + width]]))
+            position += width
+        
+        connections = []
+        count = words[position]
+        position += 1
+        for _ in range(count):
+            connections.append(Connection(strings[words[position]], strings[words[position + 1]]))
+            position += 2
+        
+        self.position = position
+        configs = self.value()
+        position = self.position
+        
+        events = []
+        count = words[position]
+        position += 1
+        for _ in range(count):
+            event_type = strings[words[position]]
+            actions = [strings[i] for i in words[position + 2:position + 2 + words[position + 1]]]
+            position += 2 + len(actions)
+            events.append(Event(event_type, actions))
+        
+        return Service(name=name, endpoints=endpoints, connections=connections,
+                       configs=configs, events=events)
+
+
+def dumps_ast(program: Program) -> bytes:
+    """Serialize a program.
+
+    Layout (all integers little-endian)::
+
+        header      magic, version, flags, #strings, #imports, #services
+        strings     uint32 byte length per string, then the UTF-8 bytes
+        imports     uint32 string id per import
+        index       (name id, offset, word count) per service
+        services    uint32 words per service, at the offsets in the index
+
+    The index lets a reader decode a single service without touching the
+    others.
+    """
+    writer = _Writer()
+    imports = array("I", (writer.string(path) for path in program.imports))
+    records = [writer.service(service) for service in program.services]
+    
+    index = array("I")
+    offset = 0
+    for service, words in zip(program.services, records):
+        index.extend((writer.string(service.name), offset, len(words)))
+        offset += len(words)
+    
+    encoded = [s.encode("utf-8") for s in writer.strings]
+    lengths = array("I", (len(b) for b in encoded))
+    
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded), len(imports), len(records)),
+        _to_bytes(lengths),
+        b"".join(encoded),
+        _to_bytes(imports),
+        _to_bytes(index),
+    ]
+    parts.extend(_to_bytes(words) for words in records)
+    return b"".join(parts)
+
+
+class SerializedProgram:
+    """A serialized program whose services are decoded on first access"""
+    
+    def __init__(self, data: bytes):
+        view = memoryview(data)
+        if len(view) < HEADER.size:
+            raise ASTFormatError("Truncated header")
+        magic, version, _flags, string_count, import_count, service_count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ASTFormatError("Not a CloudScript AST file")
+        if not 1 <= version <= FORMAT_VERSION:
+            raise ASTFormatError(f"Unsupported format version {version} (supported: 1 to {FORMAT_VERSION})")
+        self.version = version
+        
+        try:
+            position = HEADER.size
+            lengths = _from_bytes(view[position:position + 4 * string_count])
+            position += 4 * string_count
+            
+            blob = bytes(view[position:position + sum(lengths)])
+            strings = [None]
+            start = 0
+            for length in lengths:
+                strings.append(blob[start:start + length].decode("utf-8"))
+                start += length
+            position += start
+            self.strings = strings
+            
+            words = _from_bytes(view[position:position + 4 * (import_count + 3 * service_count)])
+            position += 4 * (import_count + 3 * service_count)
+            if len(words) != import_count + 3 * service_count:
+                raise ValueError("truncated service index")
+            
+            # String ids outside the table raise IndexError
+            self.imports = [strings[i] for i in words[:import_count]]
+            self._entries = []
+            self._by_name: Dict[str, int] = {}
+            for i in range(import_count, len(words), 3):
+                name_id, offset, count = words[i:i + 3]
+                self._by_name.setdefault(strings[name_id], len(self._entries))
+                self._entries.append((position + 4 * offset, count))
+        except (ValueError, IndexError) as e:
+            raise ASTFormatError(f"Corrupt AST data: {e}")
+        self._data = view
+        self._services: Dict[int, Service] = {}
+    
+    @property
+    def service_names(self) -> List[str]:
+        return list(self._by_name)
+    
+    def service(self, name: str) -> Service:
+        """Decode one service, leaving the rest untouched"""
+        return self._decode(self._by_name[name])
+    
+    def program(self) -> Program:
+        return Program(services=[self._decode(i) for i in range(len(self._entries))],
+                       imports=list(self.imports))
+    
+    def _decode(self, index: int) -> Service:
+        service = self._services.get(index)
+        if service is None:
+            start, count = self._entries[index]
+            try:
+                words = _from_bytes(self._data[start:start + 4 * count])
+                if len(words) != count:
+                    raise ValueError("truncated service record")
+                service = _Reader(words, self.strings, self.version).service()
+            except (ValueError, IndexError, TypeError) as e:
+                # TypeError: a record too short for its fields, or a missing string where one belongs
+                raise ASTFormatError(f"Corrupt service record {index}: {e}")
+            self._services[index] = service
+        return service
+
+
+def loads_ast(data: bytes) -> Program:
+    """Deserialize a program"""
+    return SerializedProgram(data).program()
+
+
+def save_ast(program: Program, path: Union[str, Path]):
+    """Write a program to a .csc file"""
+    Path(path).write_bytes(dumps_ast(program))
+
+
+def load_ast(path: Union[str, Path], lazy: bool = False) -> Union[Program, SerializedProgram]:
+    """Read a .csc file; with ``lazy`` services are decoded on demand"""
+    serialized = SerializedProgram(Path(path).read_bytes())
+    return serialized if lazy else serialized.program()
+
+
+def main():
+    # Benchmark: re-parsing a large spec vs loading its serialized AST
+    import time
+    from lexer import Lexer
+    from parser import Parser
+    
+    blocks = []
+    for i in range(600):
+        endpoints = "".join(f"""
+            endpoint /resource{i}/items{j}/:id {{
+                method: GET
+                response: Item{j}[]
+                cache: 5m
+                rateLimit: 100/m
+                timeout: 3s
+                auth: required
+            }}""" for j in range(10))
+        blocks.append(f"""
+        service Service{i} {{{endpoints}
+            connect to Service{(i + 1) % 600} via http
+            port: {8000 + i}
+            replicas: 3
+            database postgres {{
+                host: "db{i}"
+                port: 5432
+            }}
+        }}""")
+    source = "\n".join(blocks)
+    
+    start = time.perf_counter()
+    program = Parser(Lexer(source).tokenize()).parse()
+    parse_time = time.perf_counter() - start
+    
+    data = dumps_ast(program)
+    start = time.perf_counter()
+    loaded = loads_ast(data)
+    load_time = time.perf_counter() - start
+    assert loaded == program
+    
+    start = time.perf_counter()
+    SerializedProgram(data).service("Service300")
+    lazy_time = time.perf_counter() - start
+    
+    print(f"Source: {len(source):,} bytes, serialized: {len(data):,} bytes")
+    print(f"Parse:      {parse_time * 1000:8.2f}ms")
+    print(f"Load:       {load_time * 1000:8.2f}ms ({parse_time / load_time:.0f}x faster)")
+    print(f"Lazy (1):   {lazy_time * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,145 +3,575 @@ CloudScript Compiler - Main Entry Point
 """
 import os
 import sys
+import time
 import argparse
 from pathlib import Path
+from typing import List
 from lexer import Lexer
 from parser import Parser
-from docker_generator import DockerGenerator
-from kubernetes_generator import KubernetesGenerator
-from openapi_generator import OpenAPIGenerator
+from analyzer import LatencyAnalyzer
 from ast_nodes import print_ast
+from ir import build_program_model, service_model
+from modules import ModuleLoader, ModuleError
+from ast_serializer import COMPILED_SUFFIX
+from diagnostics import ParseError
+
+# Generation targets: name -> (compiler method, description). Each method imports
+# its generator when it runs, so a target adds nothing to startup until it is used.
+TARGETS = {
+    "docker": ("_generate_docker", "Docker files (Dockerfile, docker-compose.yml)"),
+    "kubernetes": ("_generate_kubernetes", "Kubernetes manifests"),
+    "openapi": ("_generate_openapi", "OpenAPI documentation"),
+    "mesh": ("_generate_mesh", "Istio VirtualService/DestinationRule"),
+    "loadtest": ("_generate_loadtest", "asyncio load generator per service"),
+    "standins": ("_generate_standins", "asyncio stand-ins for each service's HTTP dependencies"),
+}
+TARGET_ALIASES = {"k8s": "kubernetes", "docs": "openapi"}
+
+# Targets generated by "all"; the rest are opt-in
+ALL_TARGETS = ("docker", "kubernetes", "openapi")
+
+# Encodings openapi_generator.precompress() can write
+PRECOMPRESS_ENCODINGS = ("gzip", "br")
 
 
 class CloudScriptCompiler:
     """Main compiler class"""
     
-    def __init__(self, source_file: str, output_dir: str = "generated"):
+    def __init__(self, source_file: str, output_dir: str = "generated",
+                 compact: bool = False, precompress: tuple = (),
+                 templates: tuple = (), template_cache: str = None,
+                 module_cache: str = None, jobs: int = None):
         self.source_file = source_file
+        self.modules = ModuleLoader(module_cache, jobs)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-        
-    def compile(self, target: str = "all", verbose: bool = False):
-        """Compile CloudScript source code"""
+        self.compact = compact
+        self.precompress = precompress
+        self.template_dirs = list(templates)
+        self.template_cache = template_cache
+        self._templates = None
+        # Work units (service names, PROGRAM_UNIT) generated by a sharded run; None for all
+        self._selection = None
+        # Every file the targets wrote, for the shard manifest
+        self._written: List[Path] = []
+    
+    @property
+    def templates(self):
+        """The template loader, created when a target first renders a template"""
+        if self._templates is None:
+            from templates import TemplateLoader, default_loader
+            if self.template_dirs or self.template_cache:
+                self._templates = TemplateLoader(self.template_dirs, self.template_cache)
+            else:
+                self._templates = default_loader()
+        return self._templates
+    
+    def compile(self, target: str = "all", verbose: bool = False, hop_overhead: float = 0.01,
+                shard: tuple = None, shard_timings: str = None):
+        """Compile CloudScript source code, or only shard (index, count) of it"""
         print(f"🚀 CloudScript Compiler v1.0")
         print(f"📄 Source: {self.source_file}")
         print(f"📁 Output: {self.output_dir}")
+        if shard:
+            print(f"🧩 Shard: {shard[0]}/{shard[1]}")
         print()
         
-        # Read source file
-        try:
-            with open(self.source_file, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-        except FileNotFoundError:
-            print(f"❌ Error: File '{self.source_file}' not found")
-            sys.exit(1)
-        
-        # Lexical analysis
-        print("🔍 Lexical Analysis...")
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
-        if verbose:
-            print(f"   Found {len(tokens)} tokens")
+        source_path = Path(self.source_file)
+        if source_path.is_dir() or source_path.suffix == COMPILED_SUFFIX:
+            # Project mode (every .cs file in the directory) or a precompiled spec
+            ast = self._load_modules(verbose)
+        else:
+            # Read source file
+            try:
+                with open(self.source_file, 'r', encoding='utf-8') as f:
+                    source_code = f.read()
+            except FileNotFoundError:
+                print(f"❌ Error: File '{self.source_file}' not found")
+                sys.exit(1)
+            
+            # Lexical analysis
+            print("🔍 Lexical Analysis...")
+            lexer = Lexer(source_code)
+            tokens = lexer.tokenize()
+            if verbose:
+                print(f"   Found {len(tokens)} tokens")
+            
+            # Syntax analysis
+            print("🔍 Syntax Analysis...")
+            parser = Parser(tokens)
+            try:
+                ast = parser.parse()
+            except ParseError as e:
+                print(f"❌ {len(e.errors)} syntax error(s):")
+                print(e.format(self.source_file))
+                sys.exit(1)
+            if ast.imports:
+                ast = self._load_modules(verbose)
         
-        # Syntax analysis
-        print("🔍 Syntax Analysis...")
-        parser = Parser(tokens)
-        ast = parser.parse()
         if verbose:
             print(f"   Parsed {len(ast.services)} service(s)")
             print("\n📊 AST:")
             print(print_ast(ast))
             print()
         
+        # Semantic analysis
+        print("🔍 Semantic Analysis...")
+        build_program_model(ast)
+        report = LatencyAnalyzer(hop_overhead).analyze(ast)
+        if report.violations or report.cycles or verbose:
+            output = report.format()
+            if output:
+                print(output)
+        elif report.critical_path:
+            print(report.summary())
+        
         # Code generation
         print("⚙️  Code Generation...")
         
-        if target in ["all", "docker"]:
-            self._generate_docker(ast, verbose)
-        
-        if target in ["all", "kubernetes", "k8s"]:
-            self._generate_kubernetes(ast, verbose)
-        
-        if target in ["all", "openapi", "docs"]:
-            self._generate_openapi(ast, verbose)
+        target = TARGET_ALIASES.get(target, target)
+        names = ALL_TARGETS if target == "all" else (target,)
+        if shard:
+            self._compile_shard(ast, names, target, shard, shard_timings, verbose)
+        else:
+            for name in names:
+                getattr(self, TARGETS[name][0])(ast, verbose)
         
         print("\n✅ Compilation successful!")
         print(f"📦 Output files in: {self.output_dir}")
     
+    def _load_modules(self, verbose):
+        """Load the source file's imports, or every file in a project directory"""
+        print("📦 Loading Modules...")
+        try:
+            project = self.modules.load(self.source_file)
+        except ModuleError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+        
+        if verbose:
+            print(f"   Loaded {len(project.modules)} module(s), {project.cache_hits} from cache")
+            for module in project.modules:
+                services = ", ".join(s.name for s in module.program.services) or "no services"
+                print(f"   {module.path}: {services}")
+        return project.program
+    
+    def _compile_shard(self, ast, names, target, shard, shard_timings, verbose):
+        """Generate this shard's work units, timing each, and write its manifest"""
+        from sharding import ShardError, clear_previous, plan_shards, read_timings, write_manifest
+        index, count = shard
+        try:
+            timings = read_timings(shard_timings) if shard_timings else None
+        except ShardError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+        plan = plan_shards(ast, count, timings)
+        clear_previous(self.output_dir)
+        
+        self._written = []
+        started = time.perf_counter()
+        unit_timings = {}
+        for unit in plan.units_for(index):
+            self._selection = {unit}
+            unit_started = time.perf_counter()
+            for name in names:
+                getattr(self, TARGETS[name][0])(ast, verbose)
+            unit_timings[unit] = time.perf_counter() - unit_started
+            print(f"   ✓ Generated {unit} ({unit_timings[unit] * 1000:.1f} ms)")
+        self._selection = None
+        
+        manifest_path = write_manifest(self.output_dir, self._written, index, count, target, plan,
+                                       unit_timings, time.perf_counter() - started)
+        print(f"   ✓ Generated {manifest_path}")
+    
+    def _open(self, path: Path):
+        """Open a generated file for writing, recording it"""
+        self._written.append(path)
+        return open(path, 'w')
+    
+    def _record(self, paths: List[Path]) -> List[Path]:
+        """Record files a helper wrote itself"""
+        self._written.extend(paths)
+        return paths
+    
+    def _services(self, ast):
+        """The services being generated: all of them, or the current shard unit"""
+        if self._selection is None:
+            return ast.services
+        return [service for service in ast.services if service.name in self._selection]
+    
+    def _owns_program(self) -> bool:
+        """Whether to write the artifacts built from the whole program"""
+        from sharding import PROGRAM_UNIT
+        return self._selection is None or PROGRAM_UNIT in self._selection
+    
+    def _generated(self, message):
+        """A target's summary line; a sharded run reports per unit instead"""
+        if self._selection is None:
+            print(f"   ✓ {message}")
+    
     def _generate_docker(self, ast, verbose):
         """Generate Docker files"""
-        generator = DockerGenerator()
+        from docker_generator import DockerGenerator
+        from grpc_generator import GrpcGenerator
+        generator = DockerGenerator(self.templates)
+        grpc = GrpcGenerator(self.templates)
         
-        for service in ast.services:
-            service_dir = self.output_dir / service.name.lower()
+        for service in self._services(ast):
+            service_dir = self.output_dir / service_model(service).slug
             service_dir.mkdir(exist_ok=True)
             
             # Generate Dockerfile
             dockerfile_path = service_dir / "Dockerfile"
-            with open(dockerfile_path, 'w') as f:
+            with self._open(dockerfile_path) as f:
                 f.write(generator.generate_dockerfile(service))
             if verbose:
                 print(f"   ✓ Generated {dockerfile_path}")
             
             # Generate requirements.txt
             req_path = service_dir / "requirements.txt"
-            with open(req_path, 'w') as f:
+            with self._open(req_path) as f:
                 f.write(generator.generate_requirements_txt(service))
             if verbose:
                 print(f"   ✓ Generated {req_path}")
             
             # Generate app.py
             app_path = service_dir / "app.py"
-            with open(app_path, 'w') as f:
+            with self._open(app_path) as f:
                 f.write(generator.generate_app_py(service))
             if verbose:
                 print(f"   ✓ Generated {app_path}")
+            
+            # Generate lifecycle.py
+            lifecycle_path = service_dir / "lifecycle.py"
+            with self._open(lifecycle_path) as f:
+                f.write(generator.generate_lifecycle_py(service))
+            if verbose:
+                print(f"   ✓ Generated {lifecycle_path}")
+            
+            # Generate compression.py
+            compression_path = service_dir / "compression.py"
+            with self._open(compression_path) as f:
+                f.write(generator.generate_compression_py(service))
+            if verbose:
+                print(f"   ✓ Generated {compression_path}")
+            
+            # Generate tracing.py
+            tracing_path = service_dir / "tracing.py"
+            with self._open(tracing_path) as f:
+                f.write(generator.generate_tracing_py(service))
+            if verbose:
+                print(f"   ✓ Generated {tracing_path}")
+            
+            # Generate rate_limit.py and http_clients.py where used
+            for filename, source in (("rate_limit.py", generator.generate_rate_limit_py(service)),
+                                     ("http_clients.py", generator.generate_http_clients_py(service, ast))):
+                if source is not None:
+                    source_path = service_dir / filename
+                    with self._open(source_path) as f:
+                        f.write(source)
+                    if verbose:
+                        print(f"   ✓ Generated {source_path}")
+            
+            # Generate pagination.py for services with array GET endpoints
+            pagination = generator.generate_pagination_py(service)
+            if pagination is not None:
+                pagination_path = service_dir / "pagination.py"
+                with self._open(pagination_path) as f:
+                    f.write(pagination)
+                if verbose:
+                    print(f"   ✓ Generated {pagination_path}")
+            
+            # Generate response_cache.py for services with cached endpoints
+            response_cache = generator.generate_response_cache_py(service)
+            if response_cache is not None:
+                cache_path = service_dir / "response_cache.py"
+                with self._open(cache_path) as f:
+                    f.write(response_cache)
+                if verbose:
+                    print(f"   ✓ Generated {cache_path}")
+            
+            # Generate messaging.py for services on kafka/rabbitmq
+            messaging = generator.generate_messaging_py(service)
+            if messaging is not None:
+                messaging_path = service_dir / "messaging.py"
+                with self._open(messaging_path) as f:
+                    f.write(messaging)
+                if verbose:
+                    print(f"   ✓ Generated {messaging_path}")
+            
+            # Generate .proto files, compiled in the image, and the gRPC server/clients
+            protos = grpc.protos_for(service, ast)
+            if protos:
+                protos_dir = service_dir / "protos"
+                protos_dir.mkdir(exist_ok=True)
+                for target in protos:
+                    proto_path = protos_dir / f"{target.slug}.proto"
+                    with self._open(proto_path) as f:
+                        f.write(grpc.generate_proto(target.service))
+                    if verbose:
+                        print(f"   ✓ Generated {proto_path}")
+            for filename, source in (("grpc_server.py", grpc.generate_server_py(service)),
+                                     ("grpc_clients.py", grpc.generate_clients_py(service, ast))):
+                if source is not None:
+                    grpc_path = service_dir / filename
+                    with self._open(grpc_path) as f:
+                        f.write(source)
+                    if verbose:
+                        print(f"   ✓ Generated {grpc_path}")
+        
+        # Generate a load balancer config per replicated service
+        for service in self._services(ast):
+            nginx_conf = generator.generate_nginx_conf(service)
+            if nginx_conf is not None:
+                nginx_dir = self.output_dir / "nginx"
+                nginx_dir.mkdir(exist_ok=True)
+                nginx_path = nginx_dir / f"{service_model(service).slug}.conf"
+                with self._open(nginx_path) as f:
+                    f.write(nginx_conf)
+                if verbose:
+                    print(f"   ✓ Generated {nginx_path}")
         
         # Generate docker-compose.yml
-        compose_path = self.output_dir / "docker-compose.yml"
-        with open(compose_path, 'w') as f:
-            f.write(generator.generate_docker_compose(ast))
-        print(f"   ✓ Generated Docker configuration")
+        if self._owns_program():
+            compose_path = self.output_dir / "docker-compose.yml"
+            with self._open(compose_path) as f:
+                f.write(generator.generate_docker_compose(ast))
+        self._generated("Generated Docker configuration")
     
     def _generate_kubernetes(self, ast, verbose):
         """Generate Kubernetes manifests"""
+        from kubernetes_generator import KubernetesGenerator
         generator = KubernetesGenerator()
         
         k8s_dir = self.output_dir / "kubernetes"
         k8s_dir.mkdir(exist_ok=True)
         
-        for service in ast.services:
-            manifest_path = k8s_dir / f"{service.name.lower()}.yaml"
-            with open(manifest_path, 'w') as f:
+        for service in self._services(ast):
+            manifest_path = k8s_dir / f"{service_model(service).slug}.yaml"
+            with self._open(manifest_path) as f:
                 f.write(generator.generate_all_manifests(service))
             if verbose:
                 print(f"   ✓ Generated {manifest_path}")
         
-        print(f"   ✓ Generated Kubernetes manifests")
+        self._generated("Generated Kubernetes manifests")
     
     def _generate_openapi(self, ast, verbose):
         """Generate OpenAPI documentation"""
+        from openapi_generator import OpenAPIGenerator, precompress
         generator = OpenAPIGenerator()
         
         docs_dir = self.output_dir / "docs"
         docs_dir.mkdir(exist_ok=True)
         
-        for service in ast.services:
+        for service in self._services(ast):
             # Generate OpenAPI spec
-            openapi_path = docs_dir / f"{service.name.lower()}-openapi.json"
-            with open(openapi_path, 'w') as f:
-                f.write(generator.generate_openapi(service))
+            openapi_path = docs_dir / f"{service_model(service).slug}-openapi.json"
+            with self._open(openapi_path) as f:
+                generator.write_openapi(service, f, compact=self.compact)
             if verbose:
                 print(f"   ✓ Generated {openapi_path}")
             
+            # Pre-compressed siblings for static docs servers
+            for compressed_path in self._record(precompress(openapi_path, self.precompress)):
+                if verbose:
+                    print(f"   ✓ Generated {compressed_path}")
+            
             # Generate Swagger UI
-            swagger_path = docs_dir / f"{service.name.lower()}-swagger.html"
-            with open(swagger_path, 'w') as f:
+            swagger_path = docs_dir / f"{service_model(service).slug}-swagger.html"
+            with self._open(swagger_path) as f:
                 f.write(generator.generate_swagger_ui_html(service))
             if verbose:
                 print(f"   ✓ Generated {swagger_path}")
         
-        print(f"   ✓ Generated API documentation")
+        # Generate the aggregated API gateway spec
+        if self._owns_program():
+            gateway_path = docs_dir / "gateway-openapi.json"
+            with self._open(gateway_path) as f:
+                f.write(generator.generate_gateway_openapi(ast, compact=self.compact))
+            self._record(precompress(gateway_path, self.precompress))
+            if verbose:
+                print(f"   ✓ Generated {gateway_path}")
+        
+        self._generated("Generated API documentation")
+    
+    def _generate_mesh(self, ast, verbose):
+        """Generate Istio service mesh manifests"""
+        from mesh_generator import MeshGenerator
+        generator = MeshGenerator()
+        
+        mesh_dir = self.output_dir / "mesh"
+        mesh_dir.mkdir(exist_ok=True)
+        
+        for service in self._services(ast):
+            manifest_path = mesh_dir / f"{service_model(service).slug}.yaml"
+            with self._open(manifest_path) as f:
+                f.write(generator.generate_all_manifests(service))
+            if verbose:
+                print(f"   ✓ Generated {manifest_path}")
+        
+        self._generated("Generated service mesh manifests")
+    
+    def _generate_loadtest(self, ast, verbose):
+        """Generate asyncio load generator scripts"""
+        from loadtest_generator import LoadTestGenerator
+        generator = LoadTestGenerator()
+        
+        loadtest_dir = self.output_dir / "loadtest"
+        loadtest_dir.mkdir(exist_ok=True)
+        
+        for service in self._services(ast):
+            script_path = loadtest_dir / generator.script_name(service)
+            with self._open(script_path) as f:
+                f.write(generator.generate_load_test(service))
+            if verbose:
+                print(f"   ✓ Generated {script_path}")
+        
+        self._generated("Generated load test scripts")
+    
+    def _generate_standins(self, ast, verbose):
+        """Generate stand-in servers for each service's HTTP dependencies"""
+        from standin_generator import StandInGenerator
+        generator = StandInGenerator(self.templates)
+        
+        standin_dir = self.output_dir / "standins"
+        standin_dir.mkdir(exist_ok=True)
+        
+        for service in self._services(ast):
+            script = generator.generate_standins(service, ast)
+            if script is None:
+                continue
+            script_path = standin_dir / generator.script_name(service)
+            with self._open(script_path) as f:
+                f.write(script)
+            if verbose:
+                print(f"   ✓ Generated {script_path}")
+        
+        self._generated("Generated stand-in servers")
+
+
+def pack(source_file: str, output: str = None, module_cache: str = None, jobs: int = None):
+    """Precompile a CloudScript source file or project into a .csc file"""
+    try:
+        project = ModuleLoader(module_cache, jobs).load(source_file)
+    except ModuleError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    source_path = Path(source_file)
+    from ast_serializer import save_ast
+    output_path = Path(output) if output else source_path.with_name(source_path.stem + COMPILED_SUFFIX)
+    save_ast(project.program, output_path)
+    
+    print(f"📦 Packed {len(project.program.services)} service(s) from "
+          f"{len(project.modules)} module(s) into {output_path} ({output_path.stat().st_size:,} bytes)")
+
+
+def simulate(source_file: str, load_factors, base_rate: float, service_time: float,
+             distribution: str, duration: float, seed: int):
+    """Run the discrete-event simulator over a CloudScript source file or project"""
+    try:
+        ast = ModuleLoader().load(source_file).program
+    except ModuleError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    print(f"📈 Simulating {len(ast.services)} service(s) from {source_file}")
+    print(f"   {base_rate:g} req/s per endpoint at 1x, {duration:g}s simulated per load factor")
+    print()
+    
+    from simulator import Simulator
+    simulator = Simulator(ast, base_rate=base_rate, service_time=service_time,
+                          distribution=distribution, duration=duration, seed=seed)
+    print(simulator.format_report(simulator.sweep(load_factors)))
+
+
+def query(source_file: str, route: str = None, where=(), services_only: bool = False):
+    """Look up endpoints by route and attributes in a CloudScript source file or project"""
+    from query import QueryError, parse_filters, program_index
+    try:
+        ast = ModuleLoader().load(source_file).program
+    except ModuleError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    index = program_index(ast)
+    try:
+        filters = parse_filters(where)
+        if route:
+            method, _, path = route.strip().rpartition(' ')
+            matches = index.route(path, method or None)
+            wanted = {id(ref) for ref in index.endpoints(**filters)} if filters else None
+            matches = [ref for ref in matches if wanted is None or id(ref) in wanted]
+        else:
+            matches = index.endpoints(**filters)
+    except QueryError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    if services_only:
+        names = list(dict.fromkeys(ref.service.name for ref in matches))
+        print(f"🔎 {len(names)} of {len(index.model.services)} service(s) match")
+        for name in names:
+            print(f"   {name}")
+        return
+    
+    print(f"🔎 {len(matches)} of {len(index.entries)} endpoint(s) match")
+    for ref in matches:
+        print(f"   {ref.service.name:24} {ref.endpoint.method:6} {ref.endpoint.path}")
+
+
+def merge(shard_dirs, output: str = None):
+    """Combine the outputs of a sharded compile into one tree"""
+    from sharding import TIMINGS_NAME, ShardError, merge_shards
+    output_dir = Path(output or 'generated')
+    try:
+        timings = merge_shards(shard_dirs, output_dir)
+    except ShardError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    print(f"🧩 Merged {len(shard_dirs)} shard(s) into {output_dir}")
+    for shard, seconds in sorted(timings["shards"].items(), key=lambda item: int(item[0])):
+        print(f"   shard {shard:>3}  {seconds * 1000:9.1f} ms")
+    print(f"   Unit timings in {output_dir / TIMINGS_NAME}; pass it to --shard-timings to rebalance")
+
+
+def encoding_list(value: str) -> tuple:
+    """argparse type for --precompress: comma-separated encodings, checked before compiling"""
+    encodings = tuple(e.strip() for e in value.split(',') if e.strip())
+    unknown = [e for e in encodings if e not in PRECOMPRESS_ENCODINGS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unsupported encoding(s) {', '.join(unknown)}; "
+                                         f"choose from {', '.join(PRECOMPRESS_ENCODINGS)}")
+    return encodings
+
+
+def positive_float(value: str) -> float:
+    """argparse type for simulator rates and times, which must be above zero"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a number")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def positive_float_list(value: str) -> list:
+    """argparse type for --load: comma-separated factors, each above zero"""
+    return [positive_float(factor.strip()) for factor in value.split(',')]
+
+
+def target_help() -> str:
+    """The target list for --help"""
+    lines = ["  all        - Generate all outputs (default)"]
+    for name, (_, description) in TARGETS.items():
+        suffix = "" if name in ALL_TARGETS else " (not included in all)"
+        lines.append(f"  {name:10} - {description}{suffix}")
+    for alias, name in TARGET_ALIASES.items():
+        lines.append(f"  {alias:10} - Same as {name}")
+    return "\n".join(lines) + "\n"
 
 
 def main():
@@ -153,34 +583,113 @@ Examples:
   cloudscript compile service.cs                    # Compile all targets
   cloudscript compile service.cs --target docker    # Generate Docker files only
   cloudscript compile service.cs --target k8s       # Generate Kubernetes files only
+  cloudscript compile service.cs --target mesh      # Generate Istio manifests only
   cloudscript compile service.cs -v                 # Verbose output
   cloudscript compile service.cs -o output/         # Custom output directory
+  cloudscript compile service.cs --templates org/   # Override built-in templates
+  cloudscript compile specs/ --module-cache .csc/   # Compile every .cs file in a directory
+  cloudscript simulate service.cs --load 1,2,3      # Simulate at 1x, 2x and 3x traffic
+  cloudscript pack specs/ -o platform.csc           # Precompile a spec for other teams
+  cloudscript compile platform.csc                  # Compile a precompiled spec
+  cloudscript query specs/ --route "GET /users/42"  # Which services serve a request
+  cloudscript query specs/ --where auth=required --where cache=none
+  cloudscript compile specs/ --shard 1/4 -o shard1/ # Generate a quarter of the output
+  cloudscript merge shard1/ shard2/ shard3/ shard4/ # Combine shards into generated/
 
 Supported targets:
-  all        - Generate all outputs (default)
-  docker     - Docker files (Dockerfile, docker-compose.yml)
-  k8s        - Kubernetes manifests
-  kubernetes - Same as k8s
-  openapi    - OpenAPI documentation
-  docs       - Same as openapi
-        """
+""" + target_help()
     )
     
-    parser.add_argument('command', choices=['compile'], help='Command to execute')
-    parser.add_argument('source', help='CloudScript source file (.cs)')
+    parser.add_argument('command', choices=['compile', 'simulate', 'pack', 'query', 'merge'],
+                       help='Command to execute')
+    parser.add_argument('source', nargs='+',
+                       help='CloudScript source file (.cs or .csc) or project directory; '
+                            'for merge, the shard output directories')
     parser.add_argument('-t', '--target', default='all',
-                       choices=['all', 'docker', 'kubernetes', 'k8s', 'openapi', 'docs'],
+                       choices=['all', *TARGETS, *TARGET_ALIASES],
                        help='Generation target (default: all)')
-    parser.add_argument('-o', '--output', default='generated',
-                       help='Output directory (default: generated)')
+    parser.add_argument('-o', '--output', default=None,
+                       help='Output directory (default: generated), or the .csc file for pack')
     parser.add_argument('-v', '--verbose', action='store_true',
                        help='Verbose output')
+    parser.add_argument('--compact', action='store_true',
+                       help='Write OpenAPI JSON without indentation')
+    parser.add_argument('--precompress', type=encoding_list, default=(),
+                       help='Comma-separated encodings (gzip,br) for pre-compressed OpenAPI files')
+    parser.add_argument('--hop-overhead', type=float, default=10,
+                       help='Per-hop network overhead in ms for latency budget analysis (default: 10)')
+    parser.add_argument('--templates', action='append', default=[], metavar='DIR',
+                       help='Directory of .tmpl files overriding the built-in templates (repeatable)')
+    parser.add_argument('--template-cache', metavar='DIR',
+                       help='Cache compiled templates as bytecode in this directory')
+    parser.add_argument('--module-cache', metavar='DIR',
+                       help='Cache parsed modules in this directory, keyed by content hash')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='Processes for parsing modules in parallel (default: CPU count)')
+    
+    sharding = parser.add_argument_group('sharding options')
+    sharding.add_argument('--shard', metavar='INDEX/COUNT',
+                          help='Generate only this shard of the output (1/4 is the first of four)')
+    sharding.add_argument('--shard-timings', metavar='FILE',
+                          help='Balance shards by the timings a previous merge wrote '
+                               '(every shard must use the same file)')
+    
+    simulation = parser.add_argument_group('simulation options')
+    simulation.add_argument('--load', type=positive_float_list, default='1,2,3',
+                            help='Comma-separated load factors to simulate (default: 1,2,3)')
+    simulation.add_argument('--rps', type=positive_float, default=10.0,
+                            help='Requests/second per endpoint at 1x load (default: 10)')
+    simulation.add_argument('--service-time', type=positive_float, default=20.0,
+                            help='Mean per-replica service time in ms (default: 20)')
+    simulation.add_argument('--distribution', default='exponential',
+                            choices=['exponential', 'lognormal', 'constant'],
+                            help='Service time distribution (default: exponential)')
+    simulation.add_argument('--duration', type=positive_float, default=60.0,
+                            help='Simulated seconds per load factor (default: 60)')
+    simulation.add_argument('--seed', type=int, default=42,
+                            help='Random seed (default: 42)')
+    
+    lookup = parser.add_argument_group('query options')
+    lookup.add_argument('--route', metavar='"[METHOD] PATH"',
+                        help='Endpoints serving a path (/users/42) or route (/users/:id)')
+    lookup.add_argument('--where', action='append', default=[], metavar='KEY=VALUE',
+                        help='Filter on method, auth, cache, rateLimit, timeout, response, service, '
+                             'protocol, database, calls, calledBy or platform (repeatable; '
+                             'none and any match unset and set values)')
+    lookup.add_argument('--services', action='store_true',
+                        help='List matching services instead of endpoints')
     
     args = parser.parse_args()
     
+    if args.command == 'merge':
+        merge(args.source, args.output)
+        return
+    if len(args.source) > 1:
+        parser.error(f"{args.command} takes one source, got {len(args.source)}")
+    args.source = args.source[0]
+    
     if args.command == 'compile':
-        compiler = CloudScriptCompiler(args.source, args.output)
-        compiler.compile(args.target, args.verbose)
+        shard = None
+        if args.shard:
+            from sharding import ShardError, parse_shard
+            try:
+                shard = parse_shard(args.shard)
+            except ShardError as e:
+                parser.error(str(e))
+        compiler = CloudScriptCompiler(args.source, args.output or 'generated', args.compact, args.precompress,
+                                       tuple(args.templates), args.template_cache,
+                                       args.module_cache, args.jobs)
+        compiler.compile(args.target, args.verbose, args.hop_overhead / 1000, shard, args.shard_timings)
+    
+    elif args.command == 'simulate':
+        simulate(args.source, args.load, args.rps, args.service_time / 1000,
+                 args.distribution, args.duration, args.seed)
+    
+    elif args.command == 'pack':
+        pack(args.source, args.output, args.module_cache, args.jobs)
+    
+    elif args.command == 'query':
+        query(args.source, args.route, args.where, args.services)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+"""
+CloudScript Diagnostics - Errors and warnings with source locations
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class Diagnostic:
+    """A problem in the source, spanning line:column up to end_line:end_column"""
+    line: int
+    column: int
+    end_line: int
+    end_column: int
+    message: str
+    severity: str = "error"  # error, warning
+    synthetic: bool = False  # reported at a token the parser made up rather than found in the source
+
+    def format(self, source_name: Optional[str] = None) -> str:
+        location = f"{self.line}:{self.column}"
+        if source_name:
+            location = f"{source_name}:{location}"
+        return f"{location}: {self.severity}: {self.message}"
+
+
+class ParseError(SyntaxError):
+    """Raised after parsing when the source has errors.
+
+    Carries every diagnostic from the pass and the partial program that
+    was recovered.
+    """
+
+    def __init__(self, diagnostics: List[Diagnostic], program=None):
+        self.diagnostics = diagnostics
+        self.program = program
+        super().__init__(self.format())
+
+    def __reduce__(self):
+        # Keep the diagnostics when crossing process boundaries
+        return (ParseError, (self.diagnostics, self.program))
+
+    @property
+    def errors(self) -> List[Diagnostic]:
+        return [d for d in self.diagnostics if d.severity == "error"]
+
+    def format(self, source_name: Optional[str] = None) -> str:
+        return "\n".join(d.format(source_name) for d in self.diagnostics)
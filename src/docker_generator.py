@@ -1,211 +1,163 @@
 """
 Docker Configuration Generator
 """
-from ast_nodes import Program, Service, Endpoint
-from typing import Dict, List
+from ast_nodes import Program, Service
+from ir import (CPU_LIMIT_MILLICORES, DRAIN_DELAY_SECONDS, GRPC_PORT, MAX_PAGE_SIZE, MEMORY_LIMIT_MIB,
+                EndpointModel, program_model, service_model)
+from templates import TemplateLoader, default_loader
+from dataclasses import dataclass, field
+from typing import List, Optional
+import re
 
 
-class DockerGenerator:
-    """Generates Dockerfile and docker-compose.yml"""
-    
-    def generate_dockerfile(self, service: Service) -> str:
-        """Generate Dockerfile for a service"""
-        port = service.configs.get('port', 8080)
-        
-        dockerfile = f"""# Dockerfile for {service.name}
-FROM python:3.11-slim
+@dataclass
+class HttpTarget:
+    """A service called over HTTP and its default base URL"""
+    name: str
+    slug: str
+    url: str
 
-WORKDIR /app
 
-# Install dependencies
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
+@dataclass
+class RateZone:
+    """An nginx limit_req zone for one rate-limited endpoint"""
+    name: str
+    method: str
+    rate: str
+    burst: int
 
-# Copy application code
-COPY . .
 
-# Expose port
-EXPOSE {port}
+@dataclass
+class NginxLocation:
+    """An nginx location for one endpoint path"""
+    match: str
+    cache_seconds: Optional[float] = None
+    zones: List[RateZone] = field(default_factory=list)
 
-# Health check
-HEALTHCHECK --interval=30s --timeout=3s --start-period=5s --retries=3 \\
-  CMD curl -f http://localhost:{port}/health || exit 1
 
-# Run the application
-CMD ["python", "app.py"]
-"""
-        return dockerfile
+def nginx_rate(per_second: float) -> str:
+    """An nginx rate; it only counts whole requests per second or minute"""
+    if per_second >= 1 and per_second == int(per_second):
+        return f"{int(per_second)}r/s"
+    return f"{max(1, round(per_second * 60))}r/m"
+
+
+def nginx_match(endpoint: EndpointModel) -> str:
+    """`= /users` for a fixed path, a regex for one with parameters"""
+    if not endpoint.path_params:
+        return f"= {endpoint.path}"
+    parts = ["[^/]+" if segment.startswith(":") else re.escape(segment) for segment in endpoint.path.split("/")]
+    return f"~ ^{'/'.join(parts)}$"
+
+
+class DockerGenerator:
+    """Generates Dockerfile and docker-compose.yml"""
+    
+    def __init__(self, loader: Optional[TemplateLoader] = None):
+        self.loader = loader or default_loader()
+    
+    def generate_dockerfile(self, service: Service) -> str:
+        """Generate Dockerfile for a service"""
+        return self.loader.render("Dockerfile", service=service_model(service), grpc_port=GRPC_PORT)
     
     def generate_docker_compose(self, program: Program) -> str:
         """Generate docker-compose.yml for all services"""
-        compose = """version: '3.8'
-
-services:
-"""
-        
-        for service in program.services:
-            port = service.configs.get('port', 8080)
-            replicas = service.configs.get('replicas', 1)
-            
-            service_config = f"""
-  {service.name.lower()}:
-    build:
-      context: ./{service.name.lower()}
-      dockerfile: Dockerfile
-    ports:
-      - "{port}:{port}"
-    environment:
-      - SERVICE_NAME={service.name}
-      - PORT={port}
-"""
-            
-            # Add database if configured
-            if 'database' in service.configs:
-                db_config = service.configs['database']
-                db_type = db_config.get('type', 'postgres')
-                compose += service_config
-                compose += f"""    depends_on:
-      - {service.name.lower()}_db
-"""
-                
-                # Add database service
-                if db_type == 'postgres':
-                    compose += f"""
-  {service.name.lower()}_db:
-    image: postgres:15-alpine
-    environment:
-      - POSTGRES_DB={service.name.lower()}_db
-      - POSTGRES_USER=user
-      - POSTGRES_PASSWORD=password
-    volumes:
-      - {service.name.lower()}_db_data:/var/lib/postgresql/data
-"""
-            else:
-                compose += service_config
-            
-            # Add deploy configuration for replicas
-            if replicas > 1:
-                compose += f"""    deploy:
-      replicas: {replicas}
-      restart_policy:
-        condition: on-failure
-"""
-            compose += "\n"
-        
-        # Add volumes section if needed
-        compose += "\nvolumes:\n"
-        for service in program.services:
-            if 'database' in service.configs:
-                compose += f"  {service.name.lower()}_db_data:\n"
-        
-        # Add networks
-        compose += """
-networks:
-  default:
-    name: cloudscript_network
-"""
-        
-        return compose
+        model = program_model(program)
+        balanced = {service.name: service for service in model.services if service.load_balanced}
+        return self.loader.render("docker-compose.yml", services=model.services, grpc_port=GRPC_PORT,
+                                  balanced=balanced, cpus=f"{CPU_LIMIT_MILLICORES / 1000:g}",
+                                  mem_limit=f"{MEMORY_LIMIT_MIB}m")
+    
+    def generate_nginx_conf(self, service: Service) -> Optional[str]:
+        """Generate the load balancer in front of a replicated service"""
+        model = service_model(service)
+        if not model.load_balanced:
+            return None
+        return self.loader.render("nginx.conf", service=model, locations=self.nginx_locations(service))
+    
+    def nginx_locations(self, service: Service) -> List[NginxLocation]:
+        """One location per path with a cached GET or a rate limit"""
+        model = service_model(service)
+        locations = {}
+        for endpoint in model.endpoints:
+            cached = endpoint.method == "GET" and endpoint.cache_seconds
+            if not cached and not endpoint.rate_limit:
+                continue
+            location = locations.setdefault(endpoint.path, NginxLocation(nginx_match(endpoint)))
+            if cached:
+                location.cache_seconds = endpoint.cache_seconds
+            if endpoint.rate_limit:
+                name = f"{model.slug}_{endpoint.method.lower()}_{endpoint.function_name}"
+                location.zones.append(RateZone(name, endpoint.method, nginx_rate(endpoint.rate_limit),
+                                               endpoint.rate_limit_burst))
+        return list(locations.values())
     
     def generate_requirements_txt(self, service: Service) -> str:
         """Generate requirements.txt with common dependencies"""
-        requirements = [
-            "fastapi==0.104.1",
-            "uvicorn[standard]==0.24.0",
-            "pydantic==2.5.0",
-            "httpx==0.25.1"
-        ]
-        
-        # Add database drivers if needed
-        if 'database' in service.configs:
-            db_type = service.configs['database'].get('type')
-            if db_type == 'postgres':
-                requirements.append("psycopg2-binary==2.9.9")
-                requirements.append("sqlalchemy==2.0.23")
-            elif db_type == 'mongodb':
-                requirements.append("pymongo==4.6.0")
-            elif db_type == 'redis':
-                requirements.append("redis==5.0.1")
-        
-        # Add message queue libraries if needed
-        for conn in service.connections:
-            if conn.protocol == 'rabbitmq':
-                requirements.append("pika==1.3.2")
-            elif conn.protocol == 'kafka':
-                requirements.append("kafka-python==2.0.2")
-            elif conn.protocol == 'grpc':
-                requirements.append("grpcio==1.59.3")
-                requirements.append("grpcio-tools==1.59.3")
-        
-        return "\n".join(requirements) + "\n"
+        return self.loader.render("requirements.txt", service=service_model(service))
     
     def generate_app_py(self, service: Service) -> str:
         """Generate a basic FastAPI application"""
-        port = service.configs.get('port', 8080)
-        
-        app_code = f'''"""
-{service.name} - Auto-generated by CloudScript
-"""
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import os
-
-app = FastAPI(title="{service.name}")
-
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    return {{"status": "healthy", "service": "{service.name}"}}
-
-'''
-        
-        # Generate endpoints
-        for endpoint in service.endpoints:
-            method = endpoint.method or "GET"
-            path = endpoint.path
-            response_type = endpoint.response_type or "dict"
-            
-            app_code += f'''
-@app.{method.lower()}("{path}")
-async def {self._sanitize_function_name(path)}():
-    """
-    {method} {path}
-    Response: {response_type}
-    """
-    # TODO: Implement endpoint logic
-    return {{"message": "Endpoint {path} called", "method": "{method}"}}
-'''
-        
-        app_code += f'''
-
-if __name__ == "__main__":
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port={port},
-        log_level="info"
-    )
-'''
-        
-        return app_code
+        return self.loader.render("app.py", service=service_model(service), grpc_port=GRPC_PORT)
+    
+    def generate_lifecycle_py(self, service: Service) -> str:
+        """Generate readiness tracking and the built-in event actions"""
+        return self.loader.render("lifecycle.py", service=service_model(service), drain_delay=DRAIN_DELAY_SECONDS)
+    
+    def generate_compression_py(self, service: Service) -> str:
+        """Generate the response compression middleware"""
+        return self.loader.render("compression.py", service=service_model(service))
+    
+    def generate_tracing_py(self, service: Service) -> str:
+        """Generate the tracer, its batching exporter and the tracing middleware"""
+        return self.loader.render("tracing.py", service=service_model(service))
+    
+    def generate_rate_limit_py(self, service: Service) -> Optional[str]:
+        """Generate the token bucket middleware, if any endpoint has a rate limit"""
+        model = service_model(service)
+        if not model.rate_limited_endpoints:
+            return None
+        return self.loader.render("rate_limit.py", service=model)
+    
+    def generate_http_clients_py(self, service: Service, program: Program) -> Optional[str]:
+        """Generate traced, pooled clients for the services this one calls over HTTP"""
+        model = service_model(service)
+        if not model.http_targets:
+            return None
+        return self.loader.render("http_clients.py", service=model, targets=self.http_targets(service, program))
+    
+    def http_targets(self, service: Service, program: Program) -> List[HttpTarget]:
+        """HTTP targets, addressed by their compose service name and port"""
+        by_name = program_model(program).by_name
+        targets = {}
+        for conn in service_model(service).http_targets:
+            target = by_name.get(conn.target_service)
+            slug = conn.target_service.lower()
+            # External services get a URL without a port; set <NAME>_URL for them
+            url = f"http://{slug}:{target.port}" if target is not None else f"http://{slug}"
+            targets[conn.target_service] = HttpTarget(conn.target_service, slug, url)
+        return list(targets.values())
+    
+    def generate_pagination_py(self, service: Service) -> Optional[str]:
+        """Generate cursor pagination and row streaming, if the service has array GET endpoints"""
+        model = service_model(service)
+        if not model.paginated_endpoints:
+            return None
+        return self.loader.render("pagination.py", service=model, max_page_size=MAX_PAGE_SIZE)
+    
+    def generate_response_cache_py(self, service: Service) -> Optional[str]:
+        """Generate the coalescing response cache, if the service has cached GET endpoints"""
+        model = service_model(service)
+        if not model.cached_endpoints:
+            return None
+        return self.loader.render("response_cache.py", service=model)
     
-    def _sanitize_function_name(self, path: str) -> str:
-        """Convert path to valid Python function name"""
-        # Remove leading slash and convert to snake_case
-        name = path.lstrip('/').replace('/', '_').replace(':', '').replace('-', '_')
-        if not name:
-            name = "root"
-        return name
+    def generate_messaging_py(self, service: Service) -> Optional[str]:
+        """Generate async Kafka/RabbitMQ producers and consumers, if the service uses a broker"""
+        model = service_model(service)
+        if not model.message_protocols:
+            return None
+        return self.loader.render("messaging.py", service=model)
 
 
 def main():
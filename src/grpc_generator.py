@@ -0,0 +1,170 @@
+"""
+gRPC Generator - Protocol Buffers definitions, grpc.aio servers and pooled clients
+"""
+import re
+from dataclasses import dataclass, field
+from ast_nodes import Program, Service
+from ir import GRPC_PORT, EndpointModel, ServiceModel, program_model, service_model
+from templates import TemplateLoader, default_loader
+from typing import List, Optional
+
+
+# Request bodies are sent for these methods, as in the OpenAPI output
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+# Primitive response types and the well-known wrapper that carries each
+WRAPPERS = {
+    "string": "StringValue",
+    "int": "Int64Value",
+    "float": "DoubleValue",
+    "bool": "BoolValue",
+}
+
+
+@dataclass
+class ProtoRpc:
+    """One endpoint as an RPC"""
+    endpoint: EndpointModel
+    name: str               # GetUsersId
+    method_name: str        # get_users_id, for the Python client
+    request: str            # GetUsersIdRequest
+    response: str           # google.protobuf.Struct
+    response_class: str     # struct_pb2.Struct
+    path_params: List[str] = field(default_factory=list)
+    has_body: bool = False
+
+
+@dataclass
+class ProtoService:
+    """A service's gRPC interface"""
+    name: str
+    package: str
+    module: str             # protoc output: <module>_pb2, <module>_pb2_grpc
+    rpcs: List[ProtoRpc] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+
+
+def build_proto_service(service: ServiceModel) -> ProtoService:
+    """Map each endpoint to an RPC.
+
+    The DSL declares response type names but not their fields, so custom
+    types travel as ``google.protobuf.Struct`` and arrays as ``ListValue``;
+    primitives use the well-known wrappers. Both convert to and from JSON
+    without a schema.
+    """
+    proto = ProtoService(name=service.name, package=f"cloudscript.{service.slug}", module=service.slug)
+    imports = set()
+    seen = set()
+    
+    for endpoint in service.endpoints:
+        name = endpoint.operation_id[0].upper() + endpoint.operation_id[1:]
+        # Routes differing only in punctuation map to the same name
+        base, suffix = name, 2
+        while name in seen:
+            name, suffix = f"{base}{suffix}", suffix + 1
+        seen.add(name)
+        
+        if endpoint.is_array:
+            response, module = "google.protobuf.ListValue", "struct"
+        elif endpoint.base_type in WRAPPERS:
+            response, module = f"google.protobuf.{WRAPPERS[endpoint.base_type]}", "wrappers"
+        else:
+            response, module = "google.protobuf.Struct", "struct"
+        imports.add(module)
+        
+        has_body = endpoint.method in BODY_METHODS
+        if has_body:
+            imports.add("struct")
+        proto.rpcs.append(ProtoRpc(
+            endpoint=endpoint,
+            name=name,
+            method_name=re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower(),
+            request=f"{name}Request",
+            response=response,
+            response_class=f"{module}_pb2.{response.rsplit('.', 1)[1]}",
+            path_params=endpoint.path_params,
+            has_body=has_body,
+        ))
+    
+    proto.imports = sorted(imports)
+    return proto
+
+
+class GrpcGenerator:
+    """Generates .proto files, a grpc.aio server for services called over
+    gRPC, and pooled clients for their callers"""
+    
+    def __init__(self, loader: Optional[TemplateLoader] = None):
+        self.loader = loader or default_loader()
+    
+    def generate_proto(self, service: Service) -> str:
+        """Generate the .proto definition of a service's endpoints"""
+        return self.loader.render("service.proto", proto=build_proto_service(service_model(service)))
+    
+    def generate_server_py(self, service: Service) -> Optional[str]:
+        """Generate the grpc.aio server, if other services call this one over gRPC"""
+        model = service_model(service)
+        if not model.serves_grpc:
+            return None
+        return self.loader.render("grpc_server.py", service=model, proto=build_proto_service(model),
+                                  port=GRPC_PORT)
+    
+    def generate_clients_py(self, service: Service, program: Program) -> Optional[str]:
+        """Generate pooled clients for the service's gRPC targets defined in the program"""
+        model = service_model(service)
+        if not model.grpc_targets:
+            return None
+        targets = self.grpc_targets(service, program)
+        return self.loader.render("grpc_clients.py", service=model,
+                                  targets=[build_proto_service(target) for target in targets],
+                                  port=GRPC_PORT)
+    
+    def grpc_targets(self, service: Service, program: Program) -> List[ServiceModel]:
+        """gRPC targets with known endpoints; external ones have no .proto to compile"""
+        by_name = program_model(program).by_name
+        targets = {}
+        for conn in service_model(service).grpc_targets:
+            target = by_name.get(conn.target_service)
+            if target is not None:
+                targets[target.name] = target
+        return list(targets.values())
+    
+    def protos_for(self, service: Service, program: Program) -> List[ServiceModel]:
+        """Every .proto a service's image compiles: its own and its targets'"""
+        model = service_model(service)
+        protos = [model] if model.serves_grpc else []
+        return protos + [t for t in self.grpc_targets(service, program) if t is not model]
+
+
+def main():
+    # Test the generator
+    from lexer import Lexer
+    from parser import Parser
+    
+    code = """
+    service OrderService {
+        endpoint /orders { method: POST response: Order }
+        connect to PaymentService via grpc
+    }
+    service PaymentService {
+        endpoint /payments { method: POST response: Payment }
+        endpoint /payments/:id { method: GET response: Payment timeout: 2s }
+        endpoint /payments/:id/status { method: GET response: string }
+        endpoint /payments/recent { method: GET response: Payment[] }
+    }
+    """
+    ast = Parser(Lexer(code).tokenize()).parse()
+    generator = GrpcGenerator()
+    order, payment = ast.services
+    program_model(ast)
+    
+    print("=== paymentservice.proto ===")
+    print(generator.generate_proto(payment))
+    print("=== paymentservice/grpc_server.py ===")
+    print(generator.generate_server_py(payment))
+    print("=== orderservice/grpc_clients.py ===")
+    print(generator.generate_clients_py(order, ast))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+CloudScript Intermediate Representation - Precomputed per-service model shared by generators
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from ast_nodes import Program, Service, Endpoint, Connection, duration_to_seconds, rate_limit_per_second
+from lexer import Lexer, TokenType
+
+
+# Response types that map to OpenAPI primitives instead of component schemas
+PRIMITIVE_TYPES = {"string", "int", "float", "bool", "object"}
+
+# Connection protocols that go through a message broker
+MESSAGE_PROTOCOLS = ("kafka", "rabbitmq")
+
+# Port every gRPC server listens on inside its container
+GRPC_PORT = 50051
+
+# Items per page of an array response without a `pageSize:`
+DEFAULT_PAGE_SIZE = 50
+
+# Largest `limit` a client may ask for, unless MAX_PAGE_SIZE is set at runtime
+MAX_PAGE_SIZE = 1000
+
+# Resources of each service container, shared by Kubernetes and docker-compose
+CPU_REQUEST_MILLICORES = 100
+CPU_LIMIT_MILLICORES = 200
+MEMORY_REQUEST_MIB = 128
+MEMORY_LIMIT_MIB = 256
+
+# Content encodings the generated compression middleware supports
+COMPRESS_ENCODINGS = ("br", "zstd", "gzip")
+
+# Graceful shutdown: on SIGTERM a service fails readiness, keeps serving for
+# DRAIN_DELAY_SECONDS while load balancers stop routing to it, then waits up
+# to its drain timeout for in-flight requests. The grace period before
+# SIGKILL also covers the `on shutdown` actions.
+DRAIN_DELAY_SECONDS = 5
+DRAIN_TIMEOUT_SECONDS = 20
+SHUTDOWN_ACTIONS_SECONDS = 10
+
+# Event actions implemented by the generated lifecycle module
+BUILTIN_ACTIONS = {
+    "warmPools": "lifecycle.warm_pools",
+    "primeCache": "lifecycle.prime_cache",
+    "preload": "lifecycle.preload",
+    "drain": "lifecycle.drain",
+    "flush": "lifecycle.flush",
+}
+
+
+@dataclass
+class ActionModel:
+    """One call in an event block"""
+    name: str
+    args: List[Any]  # str, int, float; durations in seconds
+    
+    @property
+    def builtin(self) -> bool:
+        return self.name in BUILTIN_ACTIONS
+    
+    @property
+    def call(self) -> str:
+        """The Python call expression, awaited by the generated app"""
+        function = BUILTIN_ACTIONS.get(self.name, self.name)
+        return f"{function}({', '.join(repr(arg) for arg in self.args)})"
+
+
+@dataclass
+class EndpointModel:
+    """An endpoint with its derived values computed once"""
+    endpoint: Endpoint
+    method: str
+    path: str
+    segments: List[str]
+    path_params: List[str]
+    route_key: str
+    function_name: str
+    operation_id: str
+    response_type: Optional[str]
+    base_type: Optional[str]
+    is_array: bool
+    cache_seconds: Optional[float]
+    timeout_seconds: Optional[float]
+    rate_limit: Optional[float]  # requests per second
+    compress: str = "auto"       # auto, gzip, br, zstd or none
+    page_size: int = DEFAULT_PAGE_SIZE
+    
+    @property
+    def rate_limit_burst(self) -> Optional[int]:
+        """Requests a client may send at once: the count in e.g. `rateLimit: 100/m`"""
+        if not self.endpoint.rate_limit:
+            return None
+        return max(1, int(float(self.endpoint.rate_limit.partition('/')[0])))
+    
+    @property
+    def paginated(self) -> bool:
+        """GETs of object arrays are served a page at a time"""
+        return self.method == "GET" and self.is_array and self.base_type not in PRIMITIVE_TYPES
+    
+    @property
+    def collection(self) -> str:
+        """Table or collection holding the rows: the last literal path segment"""
+        literal = [part for part in self.segments if not part.startswith(':')]
+        return literal[-1].replace('-', '_') if literal else f"{self.base_type.lower()}s"
+
+
+@dataclass
+class ServiceModel:
+    """A service with its derived values computed once"""
+    service: Service
+    name: str
+    slug: str
+    port: int
+    replicas: Optional[int]
+    database: Optional[str]
+    endpoints: List[EndpointModel] = field(default_factory=list)
+    connections: List[Connection] = field(default_factory=list)
+    inbound: List[Tuple[str, str]] = field(default_factory=list)  # (caller, protocol)
+    custom_types: List[str] = field(default_factory=list)
+    events: Dict[str, List[ActionModel]] = field(default_factory=dict)  # event type -> actions
+    _by_endpoint: Dict[int, EndpointModel] = field(default_factory=dict, repr=False)
+    
+    def endpoint(self, endpoint: Endpoint) -> EndpointModel:
+        """Look up the model for one of this service's endpoints"""
+        model = self._by_endpoint.get(id(endpoint))
+        if model is None:
+            # Endpoint added after the model was built
+            model = self._by_endpoint[id(endpoint)] = build_endpoint_model(endpoint)
+        return model
+    
+    @property
+    def timeout_seconds(self) -> Optional[float]:
+        """The service's latency budget: its largest endpoint timeout"""
+        timeouts = [e.timeout_seconds for e in self.endpoints if e.timeout_seconds is not None]
+        return max(timeouts) if timeouts else None
+    
+    @property
+    def message_targets(self) -> List[Connection]:
+        """Outbound connections that go through a message broker"""
+        return [conn for conn in self.connections if conn.protocol in MESSAGE_PROTOCOLS]
+    
+    @property
+    def message_sources(self) -> List[str]:
+        """Broker protocols other services use to send to this one"""
+        return sorted({protocol for _, protocol in self.inbound if protocol in MESSAGE_PROTOCOLS})
+    
+    @property
+    def load_balanced(self) -> bool:
+        """More than one replica, so docker-compose puts a load balancer in front"""
+        return (self.replicas or 1) > 1
+    
+    @property
+    def http_targets(self) -> List[Connection]:
+        """Outbound connections made over HTTP"""
+        return [conn for conn in self.connections if conn.protocol == "http"]
+    
+    @property
+    def rate_limited_endpoints(self) -> List[EndpointModel]:
+        """Endpoints with a `rateLimit:`"""
+        return [e for e in self.endpoints if e.rate_limit]
+    
+    @property
+    def grpc_targets(self) -> List[Connection]:
+        """Outbound connections made over gRPC"""
+        return [conn for conn in self.connections if conn.protocol == "grpc"]
+    
+    @property
+    def serves_grpc(self) -> bool:
+        """True if another service calls this one over gRPC"""
+        return any(protocol == "grpc" for _, protocol in self.inbound)
+    
+    @property
+    def message_protocols(self) -> List[str]:
+        """Every broker protocol this service produces or consumes on"""
+        return sorted({conn.protocol for conn in self.message_targets} | set(self.message_sources))
+    
+    @property
+    def custom_actions(self) -> List[str]:
+        """Event actions the user implements, in order of first use"""
+        names = {}
+        for actions in self.events.values():
+            for action in actions:
+                if not action.builtin:
+                    names[action.name] = None
+        return list(names)
+    
+    @property
+    def drain_timeout(self) -> float:
+        """Seconds to wait for in-flight requests on SIGTERM, from `on shutdown { drain(30s) }`"""
+        for action in self.events.get("shutdown", []):
+            if action.name == "drain" and action.args:
+                return float(action.args[0])
+        return float(DRAIN_TIMEOUT_SECONDS)
+    
+    @property
+    def termination_grace_seconds(self) -> int:
+        """Seconds between SIGTERM and SIGKILL that the drain and shutdown actions need"""
+        return math.ceil(DRAIN_DELAY_SECONDS + self.drain_timeout + SHUTDOWN_ACTIONS_SECONDS)
+    
+    @property
+    def shutdown_actions(self) -> List[ActionModel]:
+        """`on shutdown` actions run after the server stops; drain() runs on SIGTERM, before it"""
+        return [action for action in self.events.get("shutdown", []) if action.name != "drain"]
+    
+    @property
+    def cached_endpoints(self) -> List[EndpointModel]:
+        """GET endpoints with a cache duration"""
+        return [e for e in self.endpoints if e.method == "GET" and e.cache_seconds]
+    
+    @property
+    def paginated_endpoints(self) -> List[EndpointModel]:
+        """Endpoints served with cursor pagination"""
+        return [e for e in self.endpoints if e.paginated]
+    
+    @property
+    def compress_encodings(self) -> List[str]:
+        """Encodings any endpoint may be compressed with; auto allows all of them"""
+        encodings = set()
+        for endpoint in self.endpoints:
+            if endpoint.compress == "auto":
+                encodings.update(COMPRESS_ENCODINGS)
+            elif endpoint.compress != "none":
+                encodings.add(endpoint.compress)
+        return sorted(encodings)
+    
+    @property
+    def cache_paths(self) -> List[str]:
+        """Cached GET endpoints warm-up can request: no path parameters, and no credential needed.
+
+        Callers with credentials are cached per caller, so an anonymous warm-up
+        request could not prime their entries anyway.
+        """
+        return [e.path for e in self.cached_endpoints if not e.path_params and e.endpoint.auth != "required"]
+
+
+@dataclass
+class ProgramModel:
+    """The whole program, with services indexed by name"""
+    program: Program
+    services: List[ServiceModel] = field(default_factory=list)
+    by_name: Dict[str, ServiceModel] = field(default_factory=dict)
+
+
+def build_endpoint_model(endpoint: Endpoint) -> EndpointModel:
+    method = (endpoint.method or "GET").upper()
+    path = endpoint.path
+    segments = [part for part in path.split('/') if part]
+    response_type = endpoint.response_type
+    base_type = response_type[:-2] if response_type and response_type.endswith('[]') else response_type
+    
+    # Operation ID: method plus capitalized path segments (getUsersId)
+    if segments:
+        operation_id = method.lower() + "".join(part.replace(':', '').capitalize() for part in segments)
+    else:
+        operation_id = method.lower() + 'Root'
+    
+    # Function name: path in snake_case (users_id)
+    function_name = path.lstrip('/').replace('/', '_').replace(':', '').replace('-', '_') or "root"
+    
+    return EndpointModel(
+        endpoint=endpoint,
+        method=method,
+        path=path,
+        segments=segments,
+        path_params=[part[1:] for part in segments if part.startswith(':')],
+        route_key=f"{method} {path}",
+        function_name=function_name,
+        operation_id=operation_id,
+        response_type=response_type,
+        base_type=base_type,
+        is_array=bool(response_type and response_type.endswith('[]')),
+        cache_seconds=duration_to_seconds(endpoint.cache),
+        timeout_seconds=duration_to_seconds(endpoint.timeout),
+        rate_limit=rate_limit_per_second(endpoint.rate_limit),
+        compress=endpoint.compress or "auto",
+        page_size=int(endpoint.page_size) if endpoint.page_size else DEFAULT_PAGE_SIZE,
+    )
+
+
+def build_action_model(action: str) -> ActionModel:
+    """Split normalized action text, e.g. ``drain(30s)``, into name and values"""
+    tokens = Lexer(action).tokenize()
+    args = []
+    for token in tokens[2:-2]:
+        if token.type == TokenType.COMMA:
+            continue
+        if token.type == TokenType.NUMBER:
+            args.append(float(token.value) if '.' in token.value else int(token.value))
+        elif token.type == TokenType.DURATION:
+            args.append(duration_to_seconds(token.value))
+        else:
+            args.append(token.value)
+    return ActionModel(name=tokens[0].value, args=args)
+
+
+def build_service_model(service: Service) -> ServiceModel:
+    database = service.configs.get('database')
+    model = ServiceModel(
+        service=service,
+        name=service.name,
+        slug=service.name.lower(),
+        port=service.configs.get('port', 8080),
+        replicas=service.configs.get('replicas'),
+        database=database.get('type') if database else None,
+        connections=list(service.connections),
+    )
+    
+    custom_types = {}
+    for endpoint in service.endpoints:
+        endpoint_model = build_endpoint_model(endpoint)
+        model.endpoints.append(endpoint_model)
+        model._by_endpoint[id(endpoint)] = endpoint_model
+        if endpoint_model.base_type and endpoint_model.base_type not in PRIMITIVE_TYPES:
+            custom_types[endpoint_model.base_type] = None
+    model.custom_types = list(custom_types)
+    
+    for event in service.events:
+        actions = model.events.setdefault(event.event_type, [])
+        actions.extend(build_action_model(action) for action in event.actions)
+    
+    return model
+
+
+def build_program_model(program: Program) -> ProgramModel:
+    """Build the model for a whole program in a single pass over the AST.
+
+    The models are cached on the AST nodes, so generators that receive a
+    ``Service`` share them via ``service_model``. Call this again after
+    mutating the AST to refresh the cache.
+    """
+    model = ProgramModel(program=program)
+    
+    for service in program.services:
+        service_model = build_service_model(service)
+        service.__dict__['_model'] = service_model
+        model.services.append(service_model)
+        model.by_name[service.name] = service_model
+    
+    for service_model in model.services:
+        for conn in service_model.connections:
+            target = model.by_name.get(conn.target_service)
+            if target is not None:
+                target.inbound.append((service_model.name, conn.protocol))
+    
+    program.__dict__['_model'] = model
+    return model
+
+
+def program_model(program: Program) -> ProgramModel:
+    """Return the cached model for a program, building it on first use"""
+    model = program.__dict__.get('_model')
+    if model is None:
+        model = build_program_model(program)
+    return model
+
+
+def service_model(service: Service) -> ServiceModel:
+    """Return the cached model for a service, building it on first use.
+
+    Services outside a program model have no inbound connections.
+    """
+    model = service.__dict__.get('_model')
+    if model is None:
+        model = build_service_model(service)
+        service.__dict__['_model'] = model
+    return model
@@ -2,7 +2,14 @@
 Kubernetes Configuration Generator
 """
 from ast_nodes import Program, Service
-import yaml
+from ir import (CPU_LIMIT_MILLICORES, CPU_REQUEST_MILLICORES, GRPC_PORT, MEMORY_LIMIT_MIB,
+                MEMORY_REQUEST_MIB, service_model)
+
+
+def to_yaml(document) -> str:
+    """Block-style YAML in insertion order; yaml is imported on first use"""
+    import yaml
+    return yaml.dump(document, default_flow_style=False, sort_keys=False)
 
 
 class KubernetesGenerator:
@@ -10,16 +17,21 @@ class KubernetesGenerator:
     
     def generate_deployment(self, service: Service) -> str:
         """Generate Kubernetes Deployment"""
-        port = service.configs.get('port', 8080)
-        replicas = service.configs.get('replicas', 3)
+        model = service_model(service)
+        port = model.port
+        replicas = model.replicas or 3
+        slug = model.slug
+        container_ports = [{'containerPort': port, 'name': 'http'}]
+        if model.serves_grpc:
+            container_ports.append({'containerPort': GRPC_PORT, 'name': 'grpc'})
         
         deployment = {
             'apiVersion': 'apps/v1',
             'kind': 'Deployment',
             'metadata': {
-                'name': service.name.lower(),
+                'name': slug,
                 'labels': {
-                    'app': service.name.lower(),
+                    'app': slug,
                     'generated-by': 'cloudscript'
                 }
             },
@@ -27,24 +39,23 @@ class KubernetesGenerator:
                 'replicas': replicas,
                 'selector': {
                     'matchLabels': {
-                        'app': service.name.lower()
+                        'app': slug
                     }
                 },
                 'template': {
                     'metadata': {
                         'labels': {
-                            'app': service.name.lower()
+                            'app': slug
                         }
                     },
                     'spec': {
+                        # SIGTERM drains in-flight requests, then runs the `on shutdown` actions
+                        'terminationGracePeriodSeconds': model.termination_grace_seconds,
                         'containers': [{
-                            'name': service.name.lower(),
-                            'image': f'{service.name.lower()}:latest',
+                            'name': slug,
+                            'image': f'{slug}:latest',
                             'imagePullPolicy': 'IfNotPresent',
-                            'ports': [{
-                                'containerPort': port,
-                                'name': 'http'
-                            }],
+                            'ports': container_ports,
                             'env': [
                                 {
                                     'name': 'SERVICE_NAME',
@@ -53,16 +64,20 @@ class KubernetesGenerator:
                                 {
                                     'name': 'PORT',
                                     'value': str(port)
+                                },
+                                {
+                                    'name': 'OTEL_SERVICE_NAME',
+                                    'value': service.name
                                 }
                             ],
                             'resources': {
                                 'requests': {
-                                    'memory': '128Mi',
-                                    'cpu': '100m'
+                                    'memory': f'{MEMORY_REQUEST_MIB}Mi',
+                                    'cpu': f'{CPU_REQUEST_MILLICORES}m'
                                 },
                                 'limits': {
-                                    'memory': '256Mi',
-                                    'cpu': '200m'
+                                    'memory': f'{MEMORY_LIMIT_MIB}Mi',
+                                    'cpu': f'{CPU_LIMIT_MILLICORES}m'
                                 }
                             },
                             'livenessProbe': {
@@ -75,7 +90,7 @@ class KubernetesGenerator:
                             },
                             'readinessProbe': {
                                 'httpGet': {
-                                    'path': '/health',
+                                    'path': '/ready',
                                     'port': port
                                 },
                                 'initialDelaySeconds': 5,
@@ -87,44 +102,47 @@ class KubernetesGenerator:
             }
         }
         
-        return yaml.dump(deployment, default_flow_style=False, sort_keys=False)
+        return to_yaml(deployment)
     
     def generate_service(self, service: Service) -> str:
         """Generate Kubernetes Service"""
-        port = service.configs.get('port', 8080)
+        model = service_model(service)
+        port = model.port
+        slug = model.slug
+        ports = [{'port': 80, 'targetPort': port, 'protocol': 'TCP', 'name': 'http'}]
+        if model.serves_grpc:
+            # appProtocol lets meshes and gateways balance per request, not per connection
+            ports.append({'port': GRPC_PORT, 'targetPort': GRPC_PORT, 'protocol': 'TCP',
+                          'name': 'grpc', 'appProtocol': 'grpc'})
         
         k8s_service = {
             'apiVersion': 'v1',
             'kind': 'Service',
             'metadata': {
-                'name': service.name.lower(),
+                'name': slug,
                 'labels': {
-                    'app': service.name.lower()
+                    'app': slug
                 }
             },
             'spec': {
                 'type': 'ClusterIP',
-                'ports': [{
-                    'port': 80,
-                    'targetPort': port,
-                    'protocol': 'TCP',
-                    'name': 'http'
-                }],
+                'ports': ports,
                 'selector': {
-                    'app': service.name.lower()
+                    'app': slug
                 }
             }
         }
         
-        return yaml.dump(k8s_service, default_flow_style=False, sort_keys=False)
+        return to_yaml(k8s_service)
     
     def generate_ingress(self, service: Service) -> str:
         """Generate Kubernetes Ingress"""
+        slug = service_model(service).slug
         ingress = {
             'apiVersion': 'networking.k8s.io/v1',
             'kind': 'Ingress',
             'metadata': {
-                'name': f'{service.name.lower()}-ingress',
+                'name': f'{slug}-ingress',
                 'annotations': {
                     'nginx.ingress.kubernetes.io/rewrite-target': '/',
                     'cert-manager.io/cluster-issuer': 'letsencrypt-prod'
@@ -133,14 +151,14 @@ class KubernetesGenerator:
             'spec': {
                 'ingressClassName': 'nginx',
                 'rules': [{
-                    'host': f'{service.name.lower()}.example.com',
+                    'host': f'{slug}.example.com',
                     'http': {
                         'paths': [{
                             'path': '/',
                             'pathType': 'Prefix',
                             'backend': {
                                 'service': {
-                                    'name': service.name.lower(),
+                                    'name': slug,
                                     'port': {
                                         'number': 80
                                     }
@@ -150,29 +168,31 @@ class KubernetesGenerator:
                     }
                 }],
                 'tls': [{
-                    'hosts': [f'{service.name.lower()}.example.com'],
-                    'secretName': f'{service.name.lower()}-tls'
+                    'hosts': [f'{slug}.example.com'],
+                    'secretName': f'{slug}-tls'
                 }]
             }
         }
         
-        return yaml.dump(ingress, default_flow_style=False, sort_keys=False)
+        return to_yaml(ingress)
     
     def generate_hpa(self, service: Service) -> str:
         """Generate Horizontal Pod Autoscaler"""
-        replicas = service.configs.get('replicas', 3)
+        model = service_model(service)
+        replicas = model.replicas or 3
+        slug = model.slug
         
         hpa = {
             'apiVersion': 'autoscaling/v2',
             'kind': 'HorizontalPodAutoscaler',
             'metadata': {
-                'name': f'{service.name.lower()}-hpa'
+                'name': f'{slug}-hpa'
             },
             'spec': {
                 'scaleTargetRef': {
                     'apiVersion': 'apps/v1',
                     'kind': 'Deployment',
-                    'name': service.name.lower()
+                    'name': slug
                 },
                 'minReplicas': replicas,
                 'maxReplicas': replicas * 3,
@@ -201,34 +221,39 @@ class KubernetesGenerator:
             }
         }
         
-        return yaml.dump(hpa, default_flow_style=False, sort_keys=False)
+        return to_yaml(hpa)
     
     def generate_configmap(self, service: Service) -> str:
         """Generate ConfigMap for service configuration"""
+        model = service_model(service)
+        slug = model.slug
         config_data = {}
         
         # Add database connection string if configured
-        if 'database' in service.configs:
-            db_config = service.configs['database']
-            db_type = db_config.get('type', 'postgres')
+        if model.database:
+            db_type = model.database
             config_data['DATABASE_TYPE'] = db_type
-            config_data['DATABASE_URL'] = f'{db_type}://user:password@{service.name.lower()}-db:5432/{service.name.lower()}'
+            config_data['DATABASE_URL'] = f'{db_type}://user:password@{slug}-db:5432/{slug}'
         
         # Add connected services
         for conn in service.connections:
             key = f'{conn.target_service.upper()}_URL'
-            config_data[key] = f'http://{conn.target_service.lower()}'
+            if conn.protocol == 'grpc':
+                # gRPC target URI, read by the generated channel pool
+                config_data[key] = f'dns:///{conn.target_service.lower()}:{GRPC_PORT}'
+            else:
+                config_data[key] = f'http://{conn.target_service.lower()}'
         
         configmap = {
             'apiVersion': 'v1',
             'kind': 'ConfigMap',
             'metadata': {
-                'name': f'{service.name.lower()}-config'
+                'name': f'{slug}-config'
             },
             'data': config_data
         }
         
-        return yaml.dump(configmap, default_flow_style=False, sort_keys=False)
+        return to_yaml(configmap)
     
     def generate_all_manifests(self, service: Service) -> str:
         """Generate all Kubernetes manifests in one file"""
@@ -0,0 +1,657 @@
+"""
+CloudScript Language Server - LSP over stdio with incremental parsing
+"""
+import bisect
+import json
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from lexer import Lexer, Token, TokenType
+from parser import EVENT_TYPES, Parser
+from ast_nodes import Service, Endpoint
+from ir import PRIMITIVE_TYPES, build_endpoint_model, build_service_model
+
+
+# LSP constants
+SYNC_INCREMENTAL = 2
+SEVERITY = {"error": 1, "warning": 2}
+KIND_KEYWORD = 14
+KIND_CLASS = 7
+KIND_ENUM_MEMBER = 20
+KIND_PROPERTY = 10
+MESSAGE_ERROR = 1
+
+TOP_LEVEL_KEYWORDS = ["service", "import"]
+SERVICE_KEYWORDS = ["endpoint", "connect to", "deploy on:", "port:", "replicas:", "database", "on"]
+ENDPOINT_KEYWORDS = ["method:", "response:", "cache:", "rateLimit:", "timeout:", "auth:", "fallback:",
+                     "compress:", "pageSize:"]
+
+# Completion values by the keyword before the colon
+VALUE_COMPLETIONS = {
+    TokenType.METHOD: ["GET", "POST", "PUT", "DELETE", "PATCH"],
+    TokenType.AUTH: ["required", "optional", "none"],
+    TokenType.ON: ["docker", "kubernetes", "aws", "azure", "gcp"],
+    TokenType.COMPRESS: ["auto", "gzip", "br", "zstd", "none"],
+}
+PROTOCOLS = ["http", "grpc", "rabbitmq", "kafka"]
+
+
+class Block:
+    """A run of whole lines holding one service (or the preamble before the first).
+
+    Tokens and diagnostics are stored relative to ``start`` so blocks after
+    an edit only need their start shifted.
+    """
+    __slots__ = ("start", "line_count", "tokens", "program", "diagnostics")
+    
+    def __init__(self, start: int, line_count: int, tokens: List[Token]):
+        self.start = start
+        self.line_count = line_count
+        self.tokens = tokens
+        parser = Parser(tokens, raise_on_error=False)
+        self.program = parser.parse()
+        self.diagnostics = parser.diagnostics
+    
+    @property
+    def anchored(self) -> bool:
+        """True if the block begins with a service on its first line"""
+        tokens = self.tokens
+        return bool(tokens) and tokens[0].type == TokenType.SERVICE and tokens[0].line == 1
+
+
+class Document:
+    """An open document, re-parsed one service block at a time.
+
+    Blocks split at lines whose first token is ``service``, which is also
+    where the parser's error recovery always resynchronizes, so parsing the
+    blocks separately matches parsing the whole file.
+    """
+    
+    def __init__(self, uri: str, text: str):
+        self.uri = uri
+        self.lines = text.split("\n")
+        self.blocks = self._build(0, len(self.lines))
+        self._starts = [block.start for block in self.blocks]
+    
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+    
+    def apply_change(self, change: Dict[str, Any]):
+        if "range" not in change:
+            self.__init__(self.uri, change["text"])
+            return
+        
+        start, end = change["range"]["start"], change["range"]["end"]
+        first = self.block_index(start["line"])
+        last = self.block_index(end["line"])
+        region_start = self.blocks[first].start
+        region_end = self.blocks[last].start + self.blocks[last].line_count
+        
+        prefix = self.lines[start["line"]][:start["character"]]
+        suffix = self.lines[end["line"]][end["character"]:]
+        new_lines = (prefix + change["text"] + suffix).split("\n")
+        self.lines[start["line"]:end["line"] + 1] = new_lines
+        delta = len(new_lines) - (end["line"] - start["line"] + 1)
+        region_end += delta
+        
+        blocks = self._build(region_start, region_end)
+        if first > 0 and not blocks[0].anchored:
+            # The edit removed the service that started this block
+            first -= 1
+            region_start = self.blocks[first].start
+            blocks = self._build(region_start, region_end)
+        if region_end < len(self.lines) and self._unterminated(blocks[-1]):
+            # Strings are the only tokens that span lines: one opened by the
+            # edit may close in a later block, so lex the rest of the file
+            last = len(self.blocks) - 1
+            region_end = len(self.lines)
+            blocks = self._build(region_start, region_end)
+        
+        self.blocks[first:last + 1] = blocks
+        if delta:
+            for block in self.blocks[first + len(blocks):]:
+                block.start += delta
+        self._starts = [block.start for block in self.blocks]
+    
+    def _build(self, start: int, end: int) -> List[Block]:
+        """Lex lines [start, end) once and parse each service block"""
+        # The lexer's EOF stays with the last block
+        tokens = Lexer("\n".join(self.lines[start:end])).tokenize()
+        if end < len(self.lines):
+            # It ends the region, not the document; a later block follows
+            tokens[-1].synthetic = True
+        
+        # Split before every line whose first token is `service`
+        splits = [1]
+        last_line = 0
+        for token in tokens:
+            if token.line != last_line:
+                last_line = token.line
+                if token.type == TokenType.SERVICE and token.line != 1:
+                    splits.append(token.line)
+        splits.append(end - start + 1)
+        
+        blocks = []
+        index = 0
+        for block_start, block_end in zip(splits, splits[1:]):
+            block_tokens = []
+            while index < len(tokens) and tokens[index].line < block_end:
+                token = tokens[index]
+                token.line -= block_start - 1
+                block_tokens.append(token)
+                index += 1
+            blocks.append(Block(start + block_start - 1, block_end - block_start, block_tokens))
+        return blocks
+    
+    def _unterminated(self, block: Block) -> bool:
+        return any(token.type == TokenType.ERROR and token.value == "Unterminated string"
+                   for token in block.tokens)
+    
+    def block_index(self, line: int) -> int:
+        return max(0, bisect.bisect_right(self._starts, line) - 1)
+    
+    def services(self) -> List[Tuple[Service, Block]]:
+        return [(service, block) for block in self.blocks for service in block.program.services]
+    
+    def imports(self) -> List[str]:
+        return [path for block in self.blocks for path in block.program.imports]
+    
+    def diagnostics(self) -> List[Dict[str, Any]]:
+        result = []
+        for i, block in enumerate(self.blocks):
+            offset = block.start - 1
+            following = self.blocks[i + 1].tokens[0] if i + 1 < len(self.blocks) else None
+            for d in block.diagnostics:
+                start = d.column - 1
+                end = d.end_column - 1
+                message = d.message
+                line = d.line + offset
+                if following is not None and d.synthetic:
+                    # The block ended where the next `service` starts
+                    line = block.start + block.line_count
+                    start, end = following.column - 1, following.end_column - 1
+                    message = message.replace("end of file", "'service'")
+                result.append({
+                    "range": {
+                        "start": {"line": line, "character": start},
+                        "end": {"line": line + d.end_line - d.line, "character": end},
+                    },
+                    "severity": SEVERITY.get(d.severity, 1),
+                    "source": "cloudscript",
+                    "message": message,
+                })
+        return result
+    
+    def context_at(self, line: int, character: int):
+        """Find the block, token and enclosing scopes at an LSP position.
+
+        Returns (block, tokens before the cursor, token under the cursor,
+        scopes). Scopes are the open braces from the outside in, each
+        ("service", Service), ("endpoint", Endpoint) or ("block", None).
+        """
+        block = self.blocks[self.block_index(line)]
+        rel_line = line - block.start + 1
+        column = character + 1
+        services = {service.name: service for service in block.program.services}
+        
+        before: List[Token] = []
+        under = None
+        scopes: List[Tuple[str, Any]] = []
+        endpoint_index = 0
+        tokens = block.tokens
+        
+        for i, token in enumerate(tokens):
+            if (token.line, token.column) >= (rel_line, column):
+                break
+            if token.line == rel_line and token.end_column >= column:
+                under = token
+            before.append(token)
+            
+            if token.type == TokenType.LBRACE:
+                owner = tokens[i - 1] if i > 0 else None
+                keyword = tokens[i - 2] if i > 1 else None
+                scope = ("block", None)
+                if keyword and keyword.type == TokenType.SERVICE and owner.type == TokenType.IDENTIFIER:
+                    service = services.get(owner.value)
+                    if service is not None:
+                        scope = ("service", service)
+                        endpoint_index = 0
+                elif keyword and keyword.type == TokenType.ENDPOINT and owner.type == TokenType.PATH:
+                    service = scopes[-1][1] if scopes and scopes[-1][0] == "service" else None
+                    if service is not None and endpoint_index < len(service.endpoints):
+                        scope = ("endpoint", service.endpoints[endpoint_index])
+                    endpoint_index += 1
+                scopes.append(scope)
+            elif token.type == TokenType.RBRACE and scopes:
+                scopes.pop()
+        
+        if under is None:
+            # Cursor at the start of a token
+            index = len(before)
+            if index < len(tokens) and tokens[index].line == rel_line and tokens[index].column == column:
+                under = tokens[index]
+        
+        return block, before, under, scopes
+    
+    def find_service(self, name: str) -> Optional[Dict[str, Any]]:
+        for block in self.blocks:
+            tokens = block.tokens
+            for i in range(len(tokens) - 1):
+                if (tokens[i].type == TokenType.SERVICE and tokens[i + 1].type == TokenType.IDENTIFIER
+                        and tokens[i + 1].value == name):
+                    return _location(self.uri, block.start, tokens[i + 1])
+        return None
+
+
+def _location(uri: str, block_start: int, token: Token) -> Dict[str, Any]:
+    line = token.line + block_start - 1
+    return {
+        "uri": uri,
+        "range": {
+            "start": {"line": line, "character": token.column - 1},
+            "end": {"line": line, "character": token.end_column - 1},
+        },
+    }
+
+
+def _duration(text: str, seconds: float) -> str:
+    normalized = f"{seconds:g}s"
+    return text if text == normalized else f"{text} ({normalized})"
+
+
+def _uri_to_path(uri: str) -> Optional[Path]:
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    return Path(unquote(parsed.path))
+
+
+class LanguageServer:
+    """Handles LSP requests and notifications for CloudScript documents.
+
+    Positions are treated as code points rather than UTF-16 units, which
+    only differs for characters outside the Basic Multilingual Plane.
+    """
+    
+    def __init__(self, output=None):
+        self.output = output
+        self.documents: Dict[str, Document] = {}
+        self.shutting_down = False
+        self._imported: Dict[Path, Tuple[float, Document]] = {}
+        self.handlers = {
+            "initialize": self.initialize,
+            "shutdown": self.shutdown,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+            "textDocument/hover": self.hover,
+            "textDocument/definition": self.definition,
+            "textDocument/completion": self.completion,
+        }
+    
+    # Transport
+    
+    def log_error(self, message: str):
+        """Report a failure to the editor's log and stderr; notifications have no reply to carry it"""
+        traceback.print_exc(file=sys.stderr)
+        self.send({"jsonrpc": "2.0", "method": "window/logMessage",
+                   "params": {"type": MESSAGE_ERROR, "message": message}})
+    
+    def send(self, message: Dict[str, Any]):
+        if self.output is None:
+            return
+        body = json.dumps(message).encode("utf-8")
+        self.output.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        self.output.flush()
+    
+    def handle(self, message: Dict[str, Any]):
+        """Dispatch one message, replying if it is a request"""
+        method = message.get("method")
+        handler = self.handlers.get(method)
+        is_request = "id" in message
+        
+        if handler is None:
+            if is_request:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": -32601, "message": f"Method not found: {method}"}})
+            return None
+        
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as e:
+            if is_request:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": -32603, "message": str(e)}})
+            else:
+                self.log_error(f"{method} failed: {type(e).__name__}: {e}")
+            return None
+        
+        if is_request:
+            self.send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+        return result
+    
+    def serve(self, stdin, stdout, record=None):
+        """Read Content-Length framed messages until exit"""
+        self.output = stdout
+        while True:
+            headers = {}
+            while True:
+                line = stdin.readline()
+                if not line:
+                    return
+                line = line.decode("ascii").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            
+            body = stdin.read(int(headers.get("content-length", 0)))
+            try:
+                message = json.loads(body)
+            except ValueError as e:
+                self.log_error(f"Unreadable message: {e}")
+                continue
+            if record is not None:
+                record.write(json.dumps(message) + "\n")
+                record.flush()
+            if message.get("method") == "exit":
+                return
+            self.handle(message)
+    
+    # Lifecycle
+    
+    def initialize(self, params):
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL},
+                "hoverProvider": True,
+                "definitionProvider": True,
+                "completionProvider": {"triggerCharacters": [":", " "]},
+            },
+            "serverInfo": {"name": "cloudscript-language-server", "version": "1.0"},
+        }
+    
+    def shutdown(self, params):
+        self.shutting_down = True
+        return None
+    
+    # Document sync
+    
+    def did_open(self, params):
+        document = params["textDocument"]
+        self.documents[document["uri"]] = Document(document["uri"], document["text"])
+        self.publish_diagnostics(document["uri"])
+    
+    def did_change(self, params):
+        uri = params["textDocument"]["uri"]
+        document = self.documents[uri]
+        for change in params["contentChanges"]:
+            document.apply_change(change)
+        self.publish_diagnostics(uri)
+    
+    def did_close(self, params):
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self.send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                   "params": {"uri": uri, "diagnostics": []}})
+    
+    def publish_diagnostics(self, uri: str):
+        self.send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                   "params": {"uri": uri, "diagnostics": self.documents[uri].diagnostics()}})
+    
+    # Language features
+    
+    def hover(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        position = params["position"]
+        _, before, under, scopes = document.context_at(position["line"], position["character"])
+        if under is None:
+            return None
+        
+        if under.type == TokenType.IDENTIFIER and len(before) >= 2 and before[-2].type in (TokenType.SERVICE, TokenType.TO):
+            text = self._service_summary(document, under.value)
+        elif scopes and scopes[-1][0] == "endpoint":
+            service = scopes[-2][1] if len(scopes) > 1 else None
+            text = self._endpoint_summary(scopes[-1][1], service)
+        else:
+            return None
+        return {"contents": {"kind": "markdown", "value": text}}
+    
+    def definition(self, params):
+        uri = params["textDocument"]["uri"]
+        document = self.documents[uri]
+        position = params["position"]
+        _, before, under, _ = document.context_at(position["line"], position["character"])
+        if under is None or under.type != TokenType.IDENTIFIER:
+            return None
+        if len(before) < 2 or before[-2].type not in (TokenType.TO, TokenType.SERVICE):
+            return None
+        
+        for candidate in [document] + [d for u, d in self.documents.items() if u != uri] + self._imports(document):
+            location = candidate.find_service(under.value)
+            if location is not None:
+                return location
+        return None
+    
+    def completion(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        position = params["position"]
+        _, before, under, scopes = document.context_at(position["line"], position["character"])
+        
+        # A word being typed is replaced by the completion, so look behind it
+        if before and before[-1] is under and under.type not in (TokenType.COLON, TokenType.LBRACE, TokenType.RBRACE):
+            before = before[:-1]
+        previous = before[-1].type if before else None
+        keyword = before[-2].type if len(before) >= 2 else None
+        
+        if previous == TokenType.TO:
+            return self._items((service.name for service, _ in self._known_services(document)), KIND_CLASS)
+        if previous == TokenType.VIA:
+            return self._items(PROTOCOLS, KIND_ENUM_MEMBER)
+        if previous == TokenType.ON and keyword != TokenType.DEPLOY:
+            return self._items(EVENT_TYPES, KIND_ENUM_MEMBER)
+        if previous == TokenType.COLON and keyword in VALUE_COMPLETIONS:
+            return self._items(VALUE_COMPLETIONS[keyword], KIND_ENUM_MEMBER)
+        if previous == TokenType.COLON and keyword == TokenType.RESPONSE:
+            types = {endpoint.response_type.rstrip("[]") for service, _ in document.services()
+                     for endpoint in service.endpoints if endpoint.response_type}
+            types.update(PRIMITIVE_TYPES)
+            return self._items(sorted(types), KIND_CLASS)
+        
+        if not scopes:
+            return self._items(TOP_LEVEL_KEYWORDS, KIND_KEYWORD)
+        if scopes[-1][0] == "endpoint":
+            return self._items(ENDPOINT_KEYWORDS, KIND_PROPERTY)
+        if scopes[-1][0] == "service":
+            return self._items(SERVICE_KEYWORDS, KIND_KEYWORD)
+        # Database settings are free-form
+        return []
+    
+    def _items(self, labels, kind: int) -> List[Dict[str, Any]]:
+        return [{"label": label, "kind": kind} for label in labels]
+    
+    def _imports(self, document: Document) -> List[Document]:
+        """Parse imported files (cached by modification time)"""
+        base = _uri_to_path(document.uri)
+        if base is None:
+            return []
+        result = []
+        for name in document.imports():
+            path = (base.parent / name).resolve()
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            cached = self._imported.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = self._imported[path] = (mtime, Document(path.as_uri(), path.read_text(encoding="utf-8")))
+            result.append(cached[1])
+        return result
+    
+    def _known_services(self, document: Document) -> List[Tuple[Service, Block]]:
+        services = document.services()
+        for other in self._imports(document):
+            services.extend(other.services())
+        return services
+    
+    def _service_summary(self, document: Document, name: str) -> str:
+        services = self._known_services(document)
+        service = next((s for s, _ in services if s.name == name), None)
+        if service is None:
+            return f"**{name}** (not defined in this project, treated as external)"
+        
+        model = build_service_model(service)
+        callers = sorted({s.name for s, _ in services for c in s.connections if c.target_service == name})
+        lines = [f"**service {name}**", ""]
+        lines.append(f"- port: {model.port}")
+        lines.append(f"- replicas: {model.replicas or 1}")
+        if model.database:
+            lines.append(f"- database: {model.database}")
+        lines.append(f"- endpoints: {len(model.endpoints)}")
+        if model.timeout_seconds is not None:
+            lines.append(f"- latency budget: {model.timeout_seconds:g}s")
+        if service.connections:
+            lines.append("- calls: " + ", ".join(f"{c.target_service} ({c.protocol})" for c in service.connections))
+        if callers:
+            lines.append("- called by: " + ", ".join(callers))
+        return "\n".join(lines)
+    
+    def _endpoint_summary(self, endpoint: Endpoint, service: Optional[Service]) -> str:
+        model = build_endpoint_model(endpoint)
+        replicas = (service.configs.get("replicas") if service else None) or 1
+        lines = [f"**{model.method} {model.path}**" + (f" → `{model.response_type}`" if model.response_type else ""), ""]
+        
+        if model.cache_seconds is not None:
+            lines.append(f"- cache: {_duration(endpoint.cache, model.cache_seconds)}")
+        else:
+            lines.append("- cache: off")
+        if model.rate_limit is not None:
+            lines.append(f"- rateLimit: {endpoint.rate_limit} ({model.rate_limit:.3g} req/s per replica, "
+                         f"{model.rate_limit * replicas:.3g} req/s across {replicas} replica(s))")
+        else:
+            lines.append("- rateLimit: unlimited")
+        if model.timeout_seconds is not None:
+            lines.append(f"- timeout: {_duration(endpoint.timeout, model.timeout_seconds)}")
+        else:
+            lines.append("- timeout: none")
+        lines.append(f"- auth: {endpoint.auth or 'none'}")
+        if endpoint.fallback:
+            lines.append(f"- fallback: {endpoint.fallback}")
+        if endpoint.compress:
+            lines.append(f"- compress: {endpoint.compress}")
+        if endpoint.page_size:
+            lines.append(f"- pageSize: {endpoint.page_size}")
+        return "\n".join(lines)
+
+
+def benchmark(session_path: Optional[str] = None, services: int = 600):
+    """Replay an edit session and report per-method latency.
+
+    Without a recorded session (see ``--record``), a synthetic one is
+    generated: typing into an endpoint of a ~20k-line document, with hover,
+    definition and completion requests along the way.
+    """
+    if session_path:
+        with open(session_path) as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+    else:
+        messages = _synthetic_session(services)
+    
+    server = LanguageServer()
+    timings: Dict[str, List[float]] = {}
+    for message in messages:
+        if message.get("method") == "exit":
+            break
+        start = time.perf_counter()
+        server.handle(message)
+        timings.setdefault(message.get("method"), []).append(time.perf_counter() - start)
+    
+    print(f"{'method':32} {'count':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for method, values in timings.items():
+        values.sort()
+        p50 = values[len(values) // 2]
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        print(f"{method:32} {len(values):>6} {p50 * 1000:8.2f} {p99 * 1000:8.2f} {values[-1] * 1000:8.2f}")
+
+
+def _synthetic_session(services: int) -> List[Dict[str, Any]]:
+    lines = []
+    for i in range(services):
+        lines.append(f"service Service{i} {{")
+        for j in range(6):
+            lines.extend([
+                f"    endpoint /resource{i}/items{j}/:id {{",
+                "        method: GET",
+                f"        response: Item{j}",
+                "        cache: 5m",
+                "        rateLimit: 100/m",
+                "        timeout: 3s",
+                "    }",
+            ])
+        lines.extend([f"    connect to Service{(i + 1) % services} via http", "    port: 8080",
+                      "    replicas: 3", "}", ""])
+    uri = "file:///benchmark/platform.cs"
+    messages = [
+        {"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}},
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen",
+         "params": {"textDocument": {"uri": uri, "languageId": "cloudscript", "version": 1, "text": "\n".join(lines)}}},
+    ]
+    
+    # Type "        auth: required" as a new line in the middle service's first endpoint
+    middle = (services // 2) * (len(lines) // services)
+    line = middle + 2
+    messages.append({"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {
+        "textDocument": {"uri": uri},
+        "contentChanges": [{"range": {"start": {"line": line, "character": 0},
+                                      "end": {"line": line, "character": 0}}, "text": "\n"}]}})
+    request_id = 1
+    for column, char in enumerate("        auth: required"):
+        messages.append({"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": uri},
+            "contentChanges": [{"range": {"start": {"line": line, "character": column},
+                                          "end": {"line": line, "character": column}}, "text": char}]}})
+        position = {"line": line, "character": column + 1}
+        for method in ("textDocument/completion", "textDocument/hover"):
+            messages.append({"jsonrpc": "2.0", "id": request_id, "method": method,
+                             "params": {"textDocument": {"uri": uri}, "position": position}})
+            request_id += 1
+    
+    # Jump to a connect target
+    connect_line = middle + 6 * 7 + 1
+    messages.append({"jsonrpc": "2.0", "id": request_id, "method": "textDocument/definition",
+                     "params": {"textDocument": {"uri": uri},
+                                "position": {"line": connect_line, "character": 16}}})
+    messages.append({"jsonrpc": "2.0", "id": request_id + 1, "method": "shutdown"})
+    messages.append({"jsonrpc": "2.0", "method": "exit"})
+    return messages
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="CloudScript language server (LSP over stdio)")
+    parser.add_argument("--record", metavar="FILE", help="Append every received message to FILE (JSON lines)")
+    parser.add_argument("--benchmark", action="store_true", help="Replay an edit session and report latencies")
+    parser.add_argument("--session", metavar="FILE", help="Recorded session to replay with --benchmark")
+    parser.add_argument("--services", type=int, default=600,
+                        help="Services in the synthetic benchmark document (default: 600, ~20k lines)")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark(args.session, args.services)
+        return
+    
+    record = open(args.record, "a") if args.record else None
+    try:
+        LanguageServer().serve(sys.stdin.buffer, sys.stdout.buffer, record)
+    finally:
+        if record is not None:
+            record.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,10 @@ class TokenType(Enum):
     TIMEOUT = auto()
     AUTH = auto()
     FALLBACK = auto()
+    COMPRESS = auto()
+    PAGESIZE = auto()
     EVENT_ON = auto()
+    IMPORT = auto()
     
     # HTTP Methods
     GET = auto()
@@ -74,6 +77,7 @@ class TokenType(Enum):
     # Special
     EOF = auto()
     NEWLINE = auto()
+    ERROR = auto()  # value holds the message
 
 
 @dataclass
@@ -82,6 +86,8 @@ class Token:
     value: str
     line: int
     column: int
+    end_column: int = 0
+    synthetic: bool = False  # made up by the parser, e.g. the EOF ending a partial token list
 
 
 class Lexer:
@@ -111,6 +117,9 @@ class Lexer:
             'timeout': TokenType.TIMEOUT,
             'auth': TokenType.AUTH,
             'fallback': TokenType.FALLBACK,
+            'compress': TokenType.COMPRESS,
+            'pageSize': TokenType.PAGESIZE,
+            'import': TokenType.IMPORT,
             # HTTP Methods
             'GET': TokenType.GET,
             'POST': TokenType.POST,
@@ -167,6 +176,7 @@ class Lexer:
     
     def read_string(self) -> str:
         result = ''
+        line, column = self.line, self.column
         self.advance()  # Skip opening quote
         while self.current_char() and self.current_char() != '"':
             if self.current_char() == '\\':
@@ -177,6 +187,8 @@ class Lexer:
             else:
                 result += self.current_char()
                 self.advance()
+        if self.current_char() is None:
+            self.add_token(TokenType.ERROR, "Unterminated string", line, column)
         self.advance()  # Skip closing quote
         return result
     
@@ -211,8 +223,15 @@ class Lexer:
             return num + unit
         return num
     
-    def add_token(self, token_type: TokenType, value: str):
-        self.tokens.append(Token(token_type, value, self.line, self.column))
+    def add_token(self, token_type: TokenType, value: str,
+                  line: Optional[int] = None, column: Optional[int] = None):
+        """Add a token that started at line:column and ends at the current position"""
+        self.tokens.append(Token(
+            token_type, value,
+            self.line if line is None else line,
+            self.column if column is None else column,
+            self.column
+        ))
     
     def tokenize(self) -> List[Token]:
         while self.position < len(self.source):
@@ -227,43 +246,43 @@ class Lexer:
                 break
             
             char = self.current_char()
-            col = self.column
+            line, col = self.line, self.column
             
             # Single character tokens
             if char == '{':
-                self.add_token(TokenType.LBRACE, char)
                 self.advance()
+                self.add_token(TokenType.LBRACE, char, line, col)
             elif char == '}':
-                self.add_token(TokenType.RBRACE, char)
                 self.advance()
+                self.add_token(TokenType.RBRACE, char, line, col)
             elif char == '[':
-                self.add_token(TokenType.LBRACKET, char)
                 self.advance()
+                self.add_token(TokenType.LBRACKET, char, line, col)
             elif char == ']':
-                self.add_token(TokenType.RBRACKET, char)
                 self.advance()
+                self.add_token(TokenType.RBRACKET, char, line, col)
             elif char == ':':
-                self.add_token(TokenType.COLON, char)
                 self.advance()
+                self.add_token(TokenType.COLON, char, line, col)
             elif char == ',':
-                self.add_token(TokenType.COMMA, char)
                 self.advance()
+                self.add_token(TokenType.COMMA, char, line, col)
             elif char == '(':
-                self.add_token(TokenType.LPAREN, char)
                 self.advance()
+                self.add_token(TokenType.LPAREN, char, line, col)
             elif char == ')':
-                self.add_token(TokenType.RPAREN, char)
                 self.advance()
+                self.add_token(TokenType.RPAREN, char, line, col)
             
             # Path (starts with /)
             elif char == '/' and self.peek_char() and (self.peek_char().isalpha() or self.peek_char() == ':'):
                 path = self.read_path()
-                self.add_token(TokenType.PATH, path)
+                self.add_token(TokenType.PATH, path, line, col)
             
             # String
             elif char == '"':
                 string = self.read_string()
-                self.add_token(TokenType.STRING, string)
+                self.add_token(TokenType.STRING, string, line, col)
             
             # Number or Duration
             elif char.isdigit():
@@ -272,19 +291,23 @@ class Lexer:
                 if self.current_char() and self.current_char() in 'smhd':
                     unit = self.current_char()
                     self.advance()
-                    self.add_token(TokenType.DURATION, num + unit)
+                    self.add_token(TokenType.DURATION, num + unit, line, col)
                 else:
-                    self.add_token(TokenType.NUMBER, num)
+                    self.add_token(TokenType.NUMBER, num, line, col)
             
             # Identifier or Keyword
             elif char.isalpha() or char == '_':
                 identifier = self.read_identifier()
                 token_type = self.keywords.get(identifier, TokenType.IDENTIFIER)
-                self.add_token(token_type, identifier)
+                self.add_token(token_type, identifier, line, col)
+            
+            elif char == '/':
+                # Skip standalone / (as in "rateLimit: 100 / m")
+                self.advance()
             
             else:
-                # Skip unknown characters (like standalone /)
                 self.advance()
+                self.add_token(TokenType.ERROR, f"Unexpected character '{char}'", line, col)
         
         self.add_token(TokenType.EOF, '')
         return self.tokens
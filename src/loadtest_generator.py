@@ -0,0 +1,334 @@
+"""
+Load Test Generator - Emits a self-contained asyncio load generator per service
+"""
+import pprint
+from ast_nodes import Service
+from ir import service_model
+from openapi_generator import OpenAPIGenerator
+from typing import Dict, Any, List
+
+
+LOAD_TEST_TEMPLATE = '''#!/usr/bin/env python3
+"""
+Load generator for __SERVICE__ - Auto-generated by CloudScript
+
+Open loop (constant arrival rate, latency measured from the intended send
+time so queueing in the client is not hidden):
+    python __SCRIPT__ --mode open --multiplier 1.5
+
+Closed loop (fixed number of concurrent workers):
+    python __SCRIPT__ --mode closed --concurrency 32
+
+Only the Python standard library is required.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from urllib.parse import urlsplit
+
+SERVICE = "__SERVICE__"
+DEFAULT_URL = "__URL__"
+DEFAULT_RATE = __DEFAULT_RATE__  # req/s for endpoints without a rateLimit
+ENDPOINTS = __ENDPOINTS__
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies in microseconds.
+
+    Values are grouped by power of two, each split into 128 linear buckets,
+    which bounds the relative error to 1/128.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.sum = 0
+
+    def record(self, seconds):
+        value = max(1, int(seconds * 1_000_000))
+        exponent = max(0, value.bit_length() - 8)
+        index = (exponent << 8) | (value >> exponent)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _bucket_value(self, index):
+        return (index & 0xFF) << (index >> 8)
+
+    def percentile(self, p):
+        if not self.total:
+            return None
+        target = max(1, math.ceil(p / 100.0 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "unit": "us",
+            "count": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.total if self.total else None,
+            "percentiles": {str(p): self.percentile(p) for p in (50, 90, 99, 99.9)},
+            "buckets": [[self._bucket_value(i), self.counts[i]] for i in sorted(self.counts)],
+        }
+
+
+class EndpointStats:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.histogram = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+
+    def to_dict(self):
+        return {
+            "operationId": self.endpoint["operationId"],
+            "method": self.endpoint["method"],
+            "path": self.endpoint["path"],
+            "rateLimit": self.endpoint["rateLimit"],
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "latency": self.histogram.to_dict(),
+        }
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = body.encode() if body else b""
+        head = (
+            f"{method} {path} HTTP/1.1\\r\\n"
+            f"Host: {self.host}:{self.port}\\r\\n"
+            "Connection: keep-alive\\r\\n"
+            "Accept: application/json\\r\\n"
+        )
+        if payload:
+            head += f"Content-Type: application/json\\r\\nContent-Length: {len(payload)}\\r\\n"
+        self.writer.write(head.encode() + b"\\r\\n" + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        length = 0
+        chunked = False
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\\r\\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class ConnectionPool:
+    def __init__(self, url, size):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.idle = asyncio.Queue()
+        for _ in range(size):
+            self.idle.put_nowait(Connection(self.host, self.port))
+
+    async def request(self, method, path, body):
+        connection = await self.idle.get()
+        try:
+            return await connection.request(method, self.prefix + path, body)
+        except Exception:
+            connection.close()
+            raise
+        finally:
+            self.idle.put_nowait(connection)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+def synthesize_path(endpoint):
+    path = endpoint["path"]
+    for param in endpoint["pathParams"]:
+        path = path.replace(":" + param, str(random.randint(1, 1000)))
+    return path
+
+
+async def send(pool, endpoint, stats, intended):
+    body = json.dumps({"loadtest": True}) if endpoint["hasBody"] else None
+    try:
+        status = await pool.request(endpoint["method"], synthesize_path(endpoint), body)
+        stats.statuses[str(status)] = stats.statuses.get(str(status), 0) + 1
+    except Exception:
+        stats.errors += 1
+    stats.histogram.record(time.perf_counter() - intended)
+
+
+def endpoint_rate(endpoint, args):
+    base = endpoint["rateLimit"] or args.rate or DEFAULT_RATE
+    return base * args.multiplier
+
+
+async def open_loop(pool, endpoint, stats, args, deadline):
+    interval = 1.0 / endpoint_rate(endpoint, args)
+    intended = time.perf_counter()
+    tasks = set()
+    while intended < deadline:
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(send(pool, endpoint, stats, intended))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        intended += interval
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def closed_loop(pool, endpoints, stats, deadline):
+    while time.perf_counter() < deadline:
+        endpoint = random.choice(endpoints)
+        await send(pool, endpoint, stats[endpoint["operationId"]], time.perf_counter())
+
+
+async def run(args):
+    endpoints = [e for e in ENDPOINTS if not args.endpoint or e["operationId"] in args.endpoint]
+    if not endpoints:
+        raise SystemExit("No endpoints selected")
+    stats = {e["operationId"]: EndpointStats(e) for e in endpoints}
+    pool = ConnectionPool(args.url, args.connections)
+    deadline = time.perf_counter() + args.duration
+    started = time.time()
+
+    if args.mode == "open":
+        await asyncio.gather(*(open_loop(pool, e, stats[e["operationId"]], args, deadline) for e in endpoints))
+    else:
+        await asyncio.gather(*(closed_loop(pool, endpoints, stats, deadline) for _ in range(args.concurrency)))
+    pool.close()
+
+    return {
+        "service": SERVICE,
+        "url": args.url,
+        "mode": args.mode,
+        "multiplier": args.multiplier,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "duration": args.duration,
+        "started": started,
+        "endpoints": [s.to_dict() for s in stats.values()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Load generator for {SERVICE}")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"Base URL (default: {DEFAULT_URL})")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open",
+                        help="open: constant arrival rate, closed: fixed concurrency")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="req/s for endpoints without a rateLimit")
+    parser.add_argument("--multiplier", type=float, default=1.0,
+                        help="Scale every endpoint rate, e.g. 1.5 to test beyond the rate limit")
+    parser.add_argument("--concurrency", type=int, default=16, help="Workers in closed-loop mode")
+    parser.add_argument("--connections", type=int, default=64, help="Keep-alive connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--endpoint", action="append", help="Only test this operationId (repeatable)")
+    parser.add_argument("--output", default=f"{SERVICE.lower()}-loadtest.json",
+                        help="JSON results file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for endpoint in results["endpoints"]:
+        latency = endpoint["latency"]["percentiles"]
+        print(f"{endpoint['method']:6} {endpoint['path']:40} "
+              f"p50={latency['50']}us p99={latency['99']}us "
+              f"statuses={endpoint['statuses']} errors={endpoint['errors']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+class LoadTestGenerator:
+    """Generates asyncio load generator scripts"""
+    
+    def __init__(self):
+        self.openapi = OpenAPIGenerator()
+    
+    def generate_load_test(self, service: Service) -> str:
+        """Generate a load generator script for a service"""
+        port = service_model(service).port
+        endpoints = self._endpoint_data(service)
+        default_rate = 10.0
+        
+        return (LOAD_TEST_TEMPLATE
+                .replace("__SCRIPT__", self.script_name(service))
+                .replace("__SERVICE__", service.name)
+                .replace("__URL__", f"http://localhost:{port}")
+                .replace("__DEFAULT_RATE__", repr(default_rate))
+                .replace("__ENDPOINTS__", pprint.pformat(endpoints, sort_dicts=False)))
+    
+    def script_name(self, service: Service) -> str:
+        return f"{service_model(service).slug}_loadtest.py"
+    
+    def _endpoint_data(self, service: Service) -> List[Dict[str, Any]]:
+        """Collect request data from the OpenAPI operation for each endpoint"""
+        endpoints = []
+        for endpoint in service_model(service).endpoints:
+            operation = self.openapi._generate_operation(endpoint.endpoint, service)
+            endpoints.append({
+                "operationId": operation["operationId"],
+                "method": endpoint.method,
+                "path": endpoint.path,
+                "pathParams": [p["name"] for p in operation["parameters"] if p["in"] == "path"],
+                "hasBody": "requestBody" in operation,
+                "rateLimit": endpoint.rate_limit,
+            })
+        return endpoints
@@ -0,0 +1,250 @@
+"""
+Service Mesh Configuration Generator (Istio)
+"""
+import math
+import re
+from ast_nodes import Program, Service, Endpoint
+from ir import EndpointModel, service_model
+from typing import Any, Dict, Optional
+from kubernetes_generator import to_yaml
+
+
+# Methods that are safe for the proxy to retry on upstream 5xx errors
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+
+
+class MeshGenerator:
+    """Generates Istio VirtualService and DestinationRule manifests"""
+    
+    pool_request_seconds = 15.0  # assumed request time for sizing pools of endpoints without a timeout
+    retry_attempts = 2
+    retry_budget_ratio = 0.2    # share of concurrent requests that may be retries
+    
+    def generate_virtual_service(self, service: Service) -> str:
+        """Generate VirtualService with per-route timeouts and retries"""
+        model = service_model(service)
+        host = model.slug
+        
+        # Istio takes the first matching route, so literal paths go before patterns that cover them
+        endpoints = sorted(model.endpoints, key=self._specificity)
+        routes = [self._generate_route(endpoint, host) for endpoint in endpoints]
+        
+        # Catch-all route for paths not declared in the spec (e.g. /health)
+        routes.append({
+            'name': 'default',
+            'route': [{'destination': {'host': host}}]
+        })
+        
+        virtual_service = {
+            'apiVersion': 'networking.istio.io/v1beta1',
+            'kind': 'VirtualService',
+            'metadata': {
+                'name': host,
+                'labels': {
+                    'app': host,
+                    'generated-by': 'cloudscript'
+                }
+            },
+            'spec': {
+                'hosts': [host],
+                'http': routes
+            }
+        }
+        
+        return to_yaml(virtual_service)
+    
+    def _generate_route(self, endpoint: EndpointModel, host: str) -> Dict[str, Any]:
+        """Generate one HTTP route for an endpoint"""
+        method = endpoint.method
+        timeout = endpoint.timeout_seconds
+        
+        route = {
+            'name': f"{method.lower()}-{self._route_name(endpoint)}",
+            'match': [{
+                'uri': self._uri_match(endpoint),
+                'method': {'exact': method}
+            }],
+            'route': [{'destination': {'host': host}}],
+        }
+        # Istio routes have no timeout unless one is set
+        if timeout:
+            route['timeout'] = self._format_seconds(timeout)
+        route['retries'] = self._generate_retries(endpoint.endpoint, method, timeout)
+        
+        return route
+    
+    def _generate_retries(self, endpoint: Endpoint, method: str, timeout: Optional[float]) -> Dict[str, Any]:
+        """Generate the retry policy for a route.
+
+        Endpoints with a ``fallback:`` fail fast so the application can serve
+        its fallback instead of waiting on proxy retries. Tries share the
+        route timeout; without one they are left to Istio's defaults.
+        """
+        if endpoint.fallback:
+            return {'attempts': 0}
+        
+        if method in IDEMPOTENT_METHODS:
+            retry_on = 'connect-failure,refused-stream,unavailable,gateway-error'
+        else:
+            # Only retry when the request never reached the upstream
+            retry_on = 'connect-failure,refused-stream'
+        
+        retries = {'attempts': self.retry_attempts}
+        if timeout:
+            retries['perTryTimeout'] = self._format_seconds(timeout / (self.retry_attempts + 1))
+        retries['retryOn'] = retry_on
+        return retries
+    
+    def generate_destination_rule(self, service: Service) -> str:
+        """Generate DestinationRule with connection pool limits and outlier detection"""
+        model = service_model(service)
+        host = model.slug
+        max_requests = self._max_concurrent_requests(service)
+        
+        destination_rule = {
+            'apiVersion': 'networking.istio.io/v1beta1',
+            'kind': 'DestinationRule',
+            'metadata': {
+                'name': host,
+                'labels': {
+                    'app': host,
+                    'generated-by': 'cloudscript'
+                }
+            },
+            'spec': {
+                'host': host,
+                'trafficPolicy': {
+                    'connectionPool': {
+                        'tcp': {
+                            'maxConnections': max_requests,
+                            'connectTimeout': '1s'
+                        },
+                        'http': {
+                            'http1MaxPendingRequests': max_requests,
+                            'http2MaxRequests': max_requests,
+                            'maxRequestsPerConnection': 0,
+                            # Retry budget: cap concurrent retries across all replicas
+                            'maxRetries': max(1, math.ceil(max_requests * self.retry_budget_ratio))
+                        }
+                    }
+                }
+            }
+        }
+        
+        # Ejecting from a single replica (or none) would leave nothing to route to
+        declared = 3 if model.replicas is None else model.replicas
+        if declared > 1:
+            destination_rule['spec']['trafficPolicy']['outlierDetection'] = {
+                'consecutive5xxErrors': 5,
+                'interval': '10s',
+                'baseEjectionTime': '30s',
+                # Always keep at least one replica in the load balancing pool
+                'maxEjectionPercent': (declared - 1) * 100 // declared
+            }
+        
+        return to_yaml(destination_rule)
+    
+    def _max_concurrent_requests(self, service: Service) -> int:
+        """Estimate the concurrency limit for a service.
+
+        Uses Little's law over the declared rate limits (requests/second times
+        the route timeout). Services without rate limits get 100 concurrent
+        requests per replica.
+        """
+        model = service_model(service)
+        replicas = model.replicas or 3
+        in_flight = 0.0
+        limited = False
+        
+        for endpoint in model.endpoints:
+            rate = endpoint.rate_limit
+            if rate is None:
+                continue
+            limited = True
+            timeout = endpoint.timeout_seconds or self.pool_request_seconds
+            in_flight += rate * replicas * timeout
+        
+        if not limited:
+            return 100 * replicas
+        return max(replicas, math.ceil(in_flight))
+    
+    def _uri_match(self, endpoint: EndpointModel) -> Dict[str, str]:
+        """Convert an endpoint path to an Istio URI match"""
+        if not endpoint.path_params:
+            return {'exact': endpoint.path}
+        pattern = "".join(
+            "/[^/]+" if segment.startswith(':') else "/" + re.escape(segment)
+            for segment in endpoint.segments
+        )
+        return {'regex': f'^{pattern}$'}
+    
+    def _specificity(self, endpoint: EndpointModel):
+        """Sort key placing exact paths first, then patterns with literals before parameters"""
+        params = [segment.startswith(':') for segment in endpoint.segments]
+        return any(params), params
+    
+    def _route_name(self, endpoint: EndpointModel) -> str:
+        """Convert an endpoint path to a route name"""
+        name = "-".join(endpoint.segments).replace(':', '').replace('_', '-').lower()
+        return name or 'root'
+    
+    def _format_seconds(self, seconds: float) -> str:
+        """Format seconds as an Istio duration"""
+        if seconds == int(seconds):
+            return f'{int(seconds)}s'
+        return f'{int(seconds * 1000)}ms'
+    
+    def generate_all_manifests(self, service: Service) -> str:
+        """Generate all mesh manifests in one file"""
+        manifests = [
+            "# Istio manifests for " + service.name,
+            "# Generated by CloudScript",
+            "",
+            self.generate_virtual_service(service),
+            "---",
+            "",
+            self.generate_destination_rule(service)
+        ]
+        
+        return "\n".join(manifests)
+
+
+def main():
+    from lexer import Lexer
+    from parser import Parser
+    
+    code = """
+    service UserService {
+        endpoint /users {
+            method: GET
+            response: User[]
+            rateLimit: 100/m
+            timeout: 3s
+        }
+
+        endpoint /users/:id {
+            method: GET
+            response: User
+            timeout: 2s
+            fallback: defaultUser
+        }
+
+        replicas: 3
+    }
+    """
+    
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    parser = Parser(tokens)
+    ast = parser.parse()
+    
+    generator = MeshGenerator()
+    
+    if ast.services:
+        service = ast.services[0]
+        print("=== Istio Manifests ===")
+        print(generator.generate_all_manifests(service))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+CloudScript Module Loader - Multi-file specs with imports and a parse cache
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from ast_nodes import Program
+from diagnostics import ParseError
+from ast_serializer import ASTFormatError, COMPILED_SUFFIX, FORMAT_VERSION, dumps_ast, load_ast, loads_ast
+from lexer import Lexer
+from parser import Parser
+
+
+# Bump when the cached format changes so stale entries are ignored
+CACHE_VERSION = 2
+
+SOURCE_SUFFIX = ".cs"
+
+
+class ModuleError(Exception):
+    """Raised when a module cannot be found, parsed or merged"""
+    pass
+
+
+@dataclass
+class Module:
+    """One parsed source file"""
+    path: Path
+    source_hash: str
+    program: Program
+    cached: bool = False
+
+
+@dataclass
+class Project:
+    """All modules reachable from an entry file or directory, merged"""
+    program: Program
+    modules: List[Module] = field(default_factory=list)
+    module_of: Dict[str, Path] = field(default_factory=dict)  # service name -> file
+    unresolved: List[str] = field(default_factory=list)
+    
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for module in self.modules if module.cached)
+
+
+def parse_source(source: str) -> Program:
+    """Lex and parse one module (runs in worker processes)"""
+    return Parser(Lexer(source).tokenize()).parse()
+
+
+class ModuleLoader:
+    """Loads a multi-file CloudScript project.
+
+    Each file is lexed and parsed on its own, so an edit only re-parses the
+    files that changed: parsed modules are cached in ``cache_dir`` keyed by
+    the hash of their source. Files that miss the cache are parsed in
+    parallel across ``workers`` processes. ``connect to`` targets are
+    resolved against the merged program once every module is loaded.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+    
+    def load(self, entry: str) -> Project:
+        """Load a file and everything it imports, or every .cs file in a directory.
+
+        Precompiled ``.csc`` files can be loaded or imported like sources.
+        """
+        entry_path = Path(entry)
+        if entry_path.is_dir():
+            pending = sorted(entry_path.rglob(f"*{SOURCE_SUFFIX}"))
+            if not pending:
+                raise ModuleError(f"No {SOURCE_SUFFIX} files in '{entry}'")
+        elif entry_path.is_file():
+            pending = [entry_path]
+        else:
+            raise ModuleError(f"File '{entry}' not found")
+        
+        modules: List[Module] = []
+        seen = {path.resolve() for path in pending}
+        executor = None
+        
+        try:
+            # Load breadth-first: each wave is the set of newly discovered imports
+            while pending:
+                wave, executor = self._load_wave(pending, executor)
+                modules.extend(wave)
+                pending = []
+                for module in wave:
+                    for name in module.program.imports:
+                        path = self._resolve_import(module.path, name)
+                        if path.resolve() not in seen:
+                            seen.add(path.resolve())
+                            pending.append(path)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return self._link(modules)
+    
+    def _load_wave(self, paths: List[Path], executor):
+        modules: List[Optional[Module]] = []
+        misses = []
+        
+        for path in paths:
+            if path.suffix == COMPILED_SUFFIX:
+                program = self._result(lambda: load_ast(path), path)
+                modules.append(Module(path, "", program, cached=True))
+                continue
+            source = path.read_text(encoding="utf-8")
+            key = self._cache_key(source)
+            program = self._read_cache(key)
+            if program is None:
+                misses.append((len(modules), path, key, source))
+            modules.append(Module(path, key, program, cached=program is not None))
+        
+        if len(misses) > 1 and self.workers > 1:
+            if executor is None:
+                # Imported here: it pulls in multiprocessing, which most loads never use
+                from concurrent.futures import ProcessPoolExecutor
+                executor = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [executor.submit(parse_source, source) for _, _, _, source in misses]
+            results = [self._result(future.result, path) for future, (_, path, _, _) in zip(futures, misses)]
+        else:
+            results = [self._result(lambda: parse_source(source), path) for _, path, _, source in misses]
+        
+        for (index, _, key, _), program in zip(misses, results):
+            modules[index].program = program
+            self._write_cache(key, program)
+        
+        return modules, executor
+    
+    def _result(self, get_program, path: Path) -> Program:
+        try:
+            return get_program()
+        except ParseError as e:
+            raise ModuleError(e.format(str(path)))
+        except (SyntaxError, ASTFormatError) as e:
+            raise ModuleError(f"{path}: {e}")
+    
+    def _resolve_import(self, importer: Path, name: str) -> Path:
+        path = Path(name)
+        if not path.is_absolute():
+            path = importer.parent / path
+        if not path.is_file():
+            raise ModuleError(f"{importer}: cannot import '{name}': file not found")
+        return path
+    
+    def _link(self, modules: List[Module]) -> Project:
+        """Merge modules into one program and resolve cross-file references"""
+        project = Project(program=Program(), modules=modules)
+        
+        for module in modules:
+            for service in module.program.services:
+                if service.name in project.module_of:
+                    raise ModuleError(
+                        f"Service '{service.name}' is defined in both "
+                        f"{project.module_of[service.name]} and {module.path}"
+                    )
+                project.module_of[service.name] = module.path
+                project.program.services.append(service)
+        
+        unresolved = {}
+        for service in project.program.services:
+            for conn in service.connections:
+                if conn.target_service not in project.module_of:
+                    unresolved[conn.target_service] = None
+        project.unresolved = list(unresolved)
+        
+        return project
+    
+    def _cache_key(self, source: str) -> str:
+        return hashlib.sha256(f"{CACHE_VERSION}.{FORMAT_VERSION}:".encode() + source.encode()).hexdigest()
+    
+    def _read_cache(self, key: str) -> Optional[Program]:
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f"{key}{COMPILED_SUFFIX}"
+        if not path.is_file():
+            return None
+        try:
+            return loads_ast(path.read_bytes())
+        except ASTFormatError:
+            return None
+    
+    def _write_cache(self, key: str, program: Program):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}{COMPILED_SUFFIX}"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(dumps_ast(program))
+        os.replace(tmp_path, path)
+
+
+def main():
+    # Load a small two-file project from a temporary directory
+    import tempfile
+    import time
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "auth.cs").write_text("""
+        service AuthService {
+            endpoint /auth/login { method: POST response: Token }
+        }
+        """)
+        (root / "users.cs").write_text("""
+        import "auth.cs"
+
+        service UserService {
+            endpoint /users { method: GET response: User[] }
+            connect to AuthService via http
+        }
+        """)
+        
+        loader = ModuleLoader(cache_dir=root / ".cache")
+        for attempt in ("cold", "warm"):
+            start = time.perf_counter()
+            project = loader.load(str(root / "users.cs"))
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{attempt}: {len(project.modules)} module(s), {project.cache_hits} from cache, {elapsed:.2f}ms")
+        
+        for name, path in project.module_of.items():
+            print(f"  {name:15} {path.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,282 @@
 OpenAPI/Swagger Documentation Generator
 """
 from ast_nodes import Program, Service, Endpoint
+from ir import MAX_PAGE_SIZE, service_model
+import gzip
+import hashlib
 import json
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, IO, Iterable, List
+
+
+# Primitive CloudScript types
+TYPE_MAPPING = {
+    "string": {"type": "string"},
+    "int": {"type": "integer"},
+    "float": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "object": {"type": "object"}
+}
+# Shared gateway component names for the generic error responses
+ERROR_RESPONSE_NAMES = {
+    "400": "BadRequest",
+    "500": "InternalServerError"
+}
+
+SECURITY_SCHEMES = {
+    "BearerAuth": {
+        "type": "http",
+        "scheme": "bearer",
+        "bearerFormat": "JWT"
+    },
+    "ApiKeyAuth": {
+        "type": "apiKey",
+        "in": "header",
+        "name": "X-API-Key"
+    }
+}
 
 
 class OpenAPIGenerator:
     """Generates OpenAPI 3.0 specification"""
     
-    def generate_openapi(self, service: Service) -> str:
+    def __init__(self):
+        # Schemas are shared between operations; treat cached values as read-only
+        self._schema_cache: Dict[str, Dict[str, Any]] = {}
+    
+    def generate_openapi(self, service: Service, compact: bool = False) -> str:
         """Generate complete OpenAPI specification"""
-        port = service.configs.get('port', 8080)
+        spec = self.build_spec(service)
+        if compact:
+            return json.dumps(spec, separators=(',', ':'))
+        return json.dumps(spec, indent=2)
+    
+    def write_openapi(self, service: Service, fp: IO[str], compact: bool = False):
+        """Stream the OpenAPI specification to a file object.
+        
+        Paths are serialized one at a time as they are generated, so the full
+        document is never held in memory as a string. The output is identical
+        to ``generate_openapi`` with the same ``compact`` setting.
+        """
+        spec = self._spec_header(service)
+        paths = spec.pop("paths")
+        components = spec.pop("components")
+        newline = "" if compact else "\n"
+        colon = ":" if compact else ": "
+        
+        fp.write("{")
+        for key, value in spec.items():
+            fp.write(f"{newline}{self._indent(1, compact)}{json.dumps(key)}{colon}"
+                     f"{self._dump(value, 1, compact)},")
+        
+        fp.write(f"{newline}{self._indent(1, compact)}\"paths\"{colon}")
+        first = True
+        for path, operations in self._iter_paths(service):
+            fp.write("{" if first else ",")
+            fp.write(f"{newline}{self._indent(2, compact)}{json.dumps(path)}{colon}"
+                     f"{self._dump(operations, 2, compact)}")
+            first = False
+        fp.write("{}" if first else f"{newline}{self._indent(1, compact)}}}")
+        
+        components["schemas"] = self._generate_schemas(service)
+        fp.write(f",{newline}{self._indent(1, compact)}\"components\"{colon}"
+                 f"{self._dump(components, 1, compact)}{newline}}}")
+    
+    def _dump(self, value: Any, level: int, compact: bool) -> str:
+        """Serialize a value nested ``level`` objects deep"""
+        if compact:
+            return json.dumps(value, separators=(',', ':'))
+        return json.dumps(value, indent=2).replace("\n", "\n" + self._indent(level, compact))
+    
+    def _indent(self, level: int, compact: bool) -> str:
+        return "" if compact else "  " * level
+    
+    def build_spec(self, service: Service) -> Dict[str, Any]:
+        """Build the OpenAPI specification as a dict"""
+        spec = self._spec_header(service)
+        
+        # Generate paths from endpoints
+        for path, operations in self._iter_paths(service):
+            spec["paths"][path] = operations
+        
+        # Generate example schemas
+        spec["components"]["schemas"] = self._generate_schemas(service)
+        
+        return spec
+    
+    def generate_gateway_openapi(self, program: Program, compact: bool = False) -> str:
+        """Generate one OpenAPI specification covering every service"""
+        spec = self.build_gateway_spec(program)
+        if compact:
+            return json.dumps(spec, separators=(',', ':'))
+        return json.dumps(spec, indent=2)
+    
+    def build_gateway_spec(self, program: Program) -> Dict[str, Any]:
+        """Build an API gateway specification for all services.
+        
+        Paths are tagged with their service. A path and method declared by more
+        than one service is prefixed with the service slug. Schemas, parameters
+        responses and request bodies are deduplicated by structural hash into
+        shared components and referenced with ``$ref``; a type name that several
+        services define identically is emitted once, and distinct names with
+        the same structure become ``$ref`` aliases of one schema.
+        """
+        spec = {
+            "openapi": "3.0.3",
+            "info": {
+                "title": "API Gateway",
+                "description": "Auto-generated API documentation for all services",
+                "version": "1.0.0"
+            },
+            "servers": [
+                {
+                    "url": "https://api.example.com",
+                    "description": "API gateway"
+                }
+            ],
+            "tags": [],
+            "paths": {},
+            "components": {
+                "schemas": {},
+                "parameters": {},
+                "responses": {},
+                "requestBodies": {},
+                "securitySchemes": {}
+            }
+        }
+        components = spec["components"]
+        schema_by_hash: Dict[str, str] = {}
+        parameter_by_hash: Dict[str, str] = {}
+        response_by_hash: Dict[str, str] = {}
+        request_body_by_hash: Dict[str, str] = {}
+        operation_ids = set()
+        
+        owners: Dict[str, int] = {}
+        for service in program.services:
+            for endpoint in service_model(service).endpoints:
+                owners[endpoint.route_key] = owners.get(endpoint.route_key, 0) + 1
+        
+        for service in program.services:
+            spec["tags"].append({
+                "name": service.name,
+                "description": f"Endpoints served by {service.name}"
+            })
+            
+            # Register this service's schemas, renaming on conflicting definitions
+            renames: Dict[str, str] = {}
+            for name, schema in self._generate_schemas(service).items():
+                digest = self._structural_hash(schema)
+                existing = components["schemas"].get(name)
+                if digest in schema_by_hash:
+                    canonical = schema_by_hash[digest]
+                    if existing is None:
+                        components["schemas"][name] = {"$ref": f"#/components/schemas/{canonical}"}
+                    elif self._resolve(components["schemas"], name) != canonical:
+                        renames[name] = canonical
+                    continue
+                if existing is not None:
+                    renames[name] = name = f"{service.name}{name}"
+                components["schemas"][name] = schema
+                schema_by_hash[digest] = name
+            
+            for path, operations in self._iter_paths(service):
+                for method, operation in operations.items():
+                    gateway_path = path
+                    if owners[f"{method.upper()} {path}"] > 1:
+                        gateway_path = f"/{service_model(service).slug}{path}"
+                    
+                    operation = self._rewrite_refs(operation, renames)
+                    if operation["operationId"] in operation_ids:
+                        operation["operationId"] = service.name[0].lower() + service.name[1:] + \
+                            operation["operationId"][0].upper() + operation["operationId"][1:]
+                    operation_ids.add(operation["operationId"])
+                    
+                    operation["parameters"] = [
+                        self._shared_component(components["parameters"], parameter_by_hash,
+                                               parameter, parameter["name"] + parameter["in"].capitalize(),
+                                               "parameters")
+                        for parameter in operation["parameters"]
+                    ]
+                    operation["responses"] = {
+                        status: self._shared_component(
+                            components["responses"], response_by_hash, response,
+                            ERROR_RESPONSE_NAMES.get(status) or self._content_label(response, "Response"),
+                            "responses")
+                        for status, response in operation["responses"].items()
+                    }
+                    if "requestBody" in operation:
+                        operation["requestBody"] = self._shared_component(
+                            components["requestBodies"], request_body_by_hash, operation["requestBody"],
+                            self._content_label(operation["requestBody"], "Body"), "requestBodies")
+                    
+                    if "security" in operation:
+                        components["securitySchemes"] = dict(SECURITY_SCHEMES)
+                    spec["paths"].setdefault(gateway_path, {})[method] = operation
+        
+        return spec
+    
+    def _shared_component(self, section: Dict[str, Any], by_hash: Dict[str, str],
+                          value: Dict[str, Any], name: str, kind: str) -> Dict[str, str]:
+        """Store a value in a components section once and return a $ref to it"""
+        digest = self._structural_hash(value)
+        if digest not in by_hash:
+            unique = name
+            counter = 2
+            while unique in section:
+                unique = f"{name}{counter}"
+                counter += 1
+            section[unique] = value
+            by_hash[digest] = unique
+        return {"$ref": f"#/components/{kind}/{by_hash[digest]}"}
+    
+    def _content_label(self, value: Dict[str, Any], suffix: str) -> str:
+        """Name a response or request body component after its JSON schema"""
+        schema = value.get("content", {}).get("application/json", {}).get("schema", {})
+        if "items" in schema:
+            schema = schema["items"]
+            suffix = "List" + suffix
+        name = schema.get("$ref", "").rsplit("/", 1)[-1] or schema.get("type", "Empty")
+        return name[0].upper() + name[1:] + suffix
+    
+    def _resolve(self, schemas: Dict[str, Any], name: str) -> str:
+        """Follow schema aliases to the name holding the definition"""
+        ref = schemas[name].get("$ref", "")
+        while ref.startswith("#/components/schemas/"):
+            name = ref.rsplit("/", 1)[1]
+            ref = schemas[name].get("$ref", "")
+        return name
+    
+    def _structural_hash(self, value: Any) -> str:
+        return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+    
+    def _rewrite_refs(self, value: Any, renames: Dict[str, str]) -> Any:
+        """Copy a value, pointing schema refs at renamed schemas"""
+        if isinstance(value, dict):
+            ref = value.get("$ref")
+            if ref is not None and len(value) == 1:
+                name = ref.rsplit("/", 1)[1]
+                return {"$ref": f"#/components/schemas/{renames.get(name, name)}"}
+            return {key: self._rewrite_refs(item, renames) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._rewrite_refs(item, renames) for item in value]
+        return value
+    
+    def _iter_paths(self, service: Service) -> Iterable:
+        """Yield (path, operations) pairs in first-declaration order"""
+        grouped: Dict[str, List[Endpoint]] = {}
+        for endpoint in service_model(service).endpoints:
+            grouped.setdefault(endpoint.path, []).append(endpoint)
+        
+        for path, endpoints in grouped.items():
+            operations = {}
+            for endpoint in endpoints:
+                operations[endpoint.method.lower()] = self._generate_operation(endpoint.endpoint, service)
+            yield path, operations
+    
+    def _spec_header(self, service: Service) -> Dict[str, Any]:
+        """Build the specification without paths and schemas"""
+        model = service_model(service)
+        port = model.port
         
         spec = {
             "openapi": "3.0.3",
@@ -34,7 +300,7 @@ class OpenAPIGenerator:
                     "description": "Development server"
                 },
                 {
-                    "url": f"https://{service.name.lower()}.example.com",
+                    "url": f"https://{model.slug}.example.com",
                     "description": "Production server"
                 }
             ],
@@ -45,47 +311,23 @@ class OpenAPIGenerator:
             }
         }
         
-        # Generate paths from endpoints
-        for endpoint in service.endpoints:
-            path = endpoint.path
-            method = (endpoint.method or "GET").lower()
-            
-            if path not in spec["paths"]:
-                spec["paths"][path] = {}
-            
-            operation = self._generate_operation(endpoint, service)
-            spec["paths"][path][method] = operation
-        
         # Add security schemes if any endpoint requires auth
         has_auth = any(e.auth == "required" for e in service.endpoints)
         if has_auth:
-            spec["components"]["securitySchemes"] = {
-                "BearerAuth": {
-                    "type": "http",
-                    "scheme": "bearer",
-                    "bearerFormat": "JWT"
-                },
-                "ApiKeyAuth": {
-                    "type": "apiKey",
-                    "in": "header",
-                    "name": "X-API-Key"
-                }
-            }
-        
-        # Generate example schemas
-        spec["components"]["schemas"] = self._generate_schemas(service)
+            spec["components"]["securitySchemes"] = dict(SECURITY_SCHEMES)
         
-        return json.dumps(spec, indent=2)
+        return spec
     
     def _generate_operation(self, endpoint: Endpoint, service: Service) -> Dict[str, Any]:
         """Generate OpenAPI operation object"""
-        method = (endpoint.method or "GET").upper()
+        model = service_model(service).endpoint(endpoint)
+        method = model.method
         response_type = endpoint.response_type or "object"
         
         operation = {
             "summary": f"{method} {endpoint.path}",
             "description": f"Endpoint for {endpoint.path}",
-            "operationId": self._generate_operation_id(method, endpoint.path),
+            "operationId": model.operation_id,
             "tags": [service.name],
             "parameters": [],
             "responses": {
@@ -107,18 +349,44 @@ class OpenAPIGenerator:
         }
         
         # Add path parameters
-        if ':' in endpoint.path:
-            parts = endpoint.path.split('/')
-            for part in parts:
-                if part.startswith(':'):
-                    param_name = part[1:]
-                    operation["parameters"].append({
-                        "name": param_name,
-                        "in": "path",
-                        "required": True,
-                        "schema": {"type": "string"},
-                        "description": f"The {param_name} identifier"
-                    })
+        for param_name in model.path_params:
+            operation["parameters"].append({
+                "name": param_name,
+                "in": "path",
+                "required": True,
+                "schema": {"type": "string"},
+                "description": f"The {param_name} identifier"
+            })
+        
+        # Array GETs are paged by an opaque cursor, or streamed whole as NDJSON
+        if model.paginated:
+            operation["parameters"].extend([
+                {
+                    "name": "cursor",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "string"},
+                    "description": "next_cursor of the previous page; omit for the first page"
+                },
+                {
+                    "name": "limit",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 1, "maximum": max(MAX_PAGE_SIZE, model.page_size),
+                               "default": model.page_size},
+                    "description": "Items per page"
+                }
+            ])
+            operation["responses"]["200"]["content"] = {
+                "application/json": {
+                    "schema": {"$ref": f"#/components/schemas/{model.base_type}Page"}
+                },
+                "application/x-ndjson": {
+                    "schema": self._type_to_schema(model.base_type)
+                }
+            }
+            operation["responses"]["200"]["description"] = \
+                "A page of items, or with Accept: application/x-ndjson every item after the cursor, one per line"
         
         # Add request body for POST/PUT/PATCH
         if method in ["POST", "PUT", "PATCH"]:
@@ -142,9 +410,32 @@ class OpenAPIGenerator:
         if endpoint.rate_limit:
             operation["x-rate-limit"] = endpoint.rate_limit
         
-        # Add caching info
-        if endpoint.cache:
-            operation["x-cache-duration"] = endpoint.cache
+        # Cached GETs carry validators and answer conditional requests with 304
+        if model.cache_seconds and method == "GET":
+            max_age = int(model.cache_seconds)
+            visibility = "private" if endpoint.auth == "required" else "public"
+            cache_headers = {
+                "Cache-Control": {
+                    "description": f"Cacheable for {endpoint.cache}",
+                    "schema": {"type": "string", "example": f"{visibility}, max-age={max_age}"}
+                },
+                "ETag": {
+                    "description": "Validator for If-None-Match",
+                    "schema": {"type": "string", "example": '"9b2c1f0e4d7a6c35"'}
+                }
+            }
+            operation["parameters"].append({
+                "name": "If-None-Match",
+                "in": "header",
+                "required": False,
+                "schema": {"type": "string"},
+                "description": "ETag of a cached copy; answered with 304 if it is still current"
+            })
+            operation["responses"]["200"]["headers"] = cache_headers
+            operation["responses"]["304"] = {
+                "description": "Not modified",
+                "headers": cache_headers
+            }
         
         # Add timeout info
         if endpoint.timeout:
@@ -154,57 +445,52 @@ class OpenAPIGenerator:
     
     def _type_to_schema(self, type_name: str) -> Dict[str, Any]:
         """Convert CloudScript type to OpenAPI schema"""
+        schema = self._schema_cache.get(type_name)
+        if schema is not None:
+            return schema
+        
         if type_name.endswith('[]'):
             base_type = type_name[:-2]
-            return {
+            schema = {
                 "type": "array",
                 "items": self._type_to_schema(base_type)
             }
+        elif type_name in TYPE_MAPPING:
+            # Primitive types
+            schema = TYPE_MAPPING[type_name]
+        else:
+            # Custom types - reference to schema
+            schema = {"$ref": f"#/components/schemas/{type_name}"}
         
-        # Primitive types
-        type_mapping = {
-            "string": {"type": "string"},
-            "int": {"type": "integer"},
-            "float": {"type": "number"},
-            "bool": {"type": "boolean"},
-            "object": {"type": "object"}
-        }
-        
-        if type_name in type_mapping:
-            return type_mapping[type_name]
-        
-        # Custom types - reference to schema
-        return {"$ref": f"#/components/schemas/{type_name}"}
-    
-    def _generate_operation_id(self, method: str, path: str) -> str:
-        """Generate unique operation ID"""
-        # Convert path to camelCase
-        parts = path.strip('/').replace(':', '').split('/')
-        if not parts or parts == ['']:
-            return method.lower() + 'Root'
-        
-        operation_id = method.lower()
-        for part in parts:
-            operation_id += part.capitalize()
-        
-        return operation_id
+        self._schema_cache[type_name] = schema
+        return schema
     
     def _generate_schemas(self, service: Service) -> Dict[str, Any]:
         """Generate example schemas for custom types"""
         schemas = {}
         
-        # Extract unique response types
-        types = set()
-        for endpoint in service.endpoints:
-            if endpoint.response_type:
-                base_type = endpoint.response_type.rstrip('[]')
-                if base_type not in ['string', 'int', 'float', 'bool', 'object']:
-                    types.add(base_type)
-        
-        # Generate example schemas
-        for type_name in types:
+        # Generate example schemas for custom response types (in declaration order)
+        for type_name in service_model(service).custom_types:
             schemas[type_name] = self._generate_example_schema(type_name)
         
+        # Pages of paginated array responses
+        for type_name in dict.fromkeys(e.base_type for e in service_model(service).paginated_endpoints):
+            schemas[f"{type_name}Page"] = {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "items": {"$ref": f"#/components/schemas/{type_name}"}
+                    },
+                    "next_cursor": {
+                        "type": "string",
+                        "nullable": True,
+                        "description": "Pass as cursor to get the next page; null on the last page"
+                    }
+                },
+                "required": ["items", "next_cursor"]
+            }
+        
         # Add common error schema
         schemas["Error"] = {
             "type": "object",
@@ -313,6 +599,35 @@ class OpenAPIGenerator:
         return html
 
 
+def precompress(path: Path, encodings: Iterable[str]) -> List[Path]:
+    """Write pre-compressed siblings (``.gz``, ``.br``) of a generated file.
+    
+    Brotli output requires the optional ``brotli`` package and is skipped
+    when it is not installed.
+    """
+    data = Path(path).read_bytes()
+    written = []
+    
+    for encoding in encodings:
+        if encoding == 'gzip':
+            target = Path(f"{path}.gz")
+            # mtime=0 keeps the output reproducible between compiles
+            target.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        elif encoding == 'br':
+            try:
+                import brotli
+            except ImportError:
+                print(f"   ⚠️  brotli is not installed, skipping {path}.br")
+                continue
+            target = Path(f"{path}.br")
+            target.write_bytes(brotli.compress(data, quality=11))
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        written.append(target)
+    
+    return written
+
+
 def main():
     from lexer import Lexer
     from parser import Parser
@@ -1,13 +1,73 @@
 """
 CloudScript Parser - Builds AST from tokens
 """
-from typing import List, Optional
+from typing import List, Optional, Set
 from lexer import Token, TokenType, Lexer
 from ast_nodes import *
+from diagnostics import Diagnostic, ParseError
+
+
+HTTP_METHODS = {TokenType.GET, TokenType.POST, TokenType.PUT, TokenType.DELETE, TokenType.PATCH}
+PROTOCOLS = {TokenType.HTTP, TokenType.GRPC, TokenType.RABBITMQ, TokenType.KAFKA}
+PLATFORMS = {TokenType.DOCKER, TokenType.KUBERNETES, TokenType.AWS, TokenType.AZURE, TokenType.GCP}
+AUTH_LEVELS = {TokenType.REQUIRED, TokenType.OPTIONAL, TokenType.NONE}
+EVENT_TYPES = ("start", "shutdown", "error", "scale")
+COMPRESS_VALUES = ("auto", "gzip", "br", "zstd")  # or none
+ACTION_ARGS = {TokenType.STRING, TokenType.NUMBER, TokenType.DURATION, TokenType.IDENTIFIER}
+
+# Tokens where error recovery resumes, per nesting level
+TOP_LEVEL_SYNC = {TokenType.SERVICE, TokenType.IMPORT}
+SERVICE_SYNC = {TokenType.RBRACE, TokenType.ENDPOINT, TokenType.CONNECT, TokenType.DEPLOY,
+                TokenType.PORT, TokenType.REPLICAS, TokenType.DATABASE, TokenType.ON}
+ENDPOINT_SYNC = {TokenType.RBRACE, TokenType.ENDPOINT, TokenType.METHOD, TokenType.RESPONSE,
+                 TokenType.CACHE, TokenType.RATELIMIT, TokenType.TIMEOUT, TokenType.AUTH,
+                 TokenType.FALLBACK, TokenType.COMPRESS, TokenType.PAGESIZE}
+
+TOKEN_NAMES = {
+    TokenType.LBRACE: "'{'",
+    TokenType.RBRACE: "'}'",
+    TokenType.LBRACKET: "'['",
+    TokenType.RBRACKET: "']'",
+    TokenType.COLON: "':'",
+    TokenType.LPAREN: "'('",
+    TokenType.RPAREN: "')'",
+    TokenType.IDENTIFIER: "a name",
+    TokenType.NUMBER: "a number",
+    TokenType.STRING: "a string",
+    TokenType.PATH: "a path",
+    TokenType.DURATION: "a duration (e.g. 5m)",
+}
+
+
+class _Recover(Exception):
+    """Unwinds to the nearest synchronization point after a syntax error"""
+    pass
 
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    """Recursive-descent parser with panic-mode error recovery.
+
+    Syntax errors are recorded in ``diagnostics`` and parsing resumes at
+    the next ``service``, ``endpoint``, statement or ``}``, so one pass
+    reports every error. With ``raise_on_error`` (the default) ``parse``
+    then raises a ``ParseError``; otherwise it returns the partial AST.
+    """
+    
+    def __init__(self, tokens: List[Token], raise_on_error: bool = True):
+        self.diagnostics: List[Diagnostic] = []
+        self.raise_on_error = raise_on_error
+        
+        # Lexical errors arrive as ERROR tokens
+        if any(token.type == TokenType.ERROR for token in tokens):
+            for token in tokens:
+                if token.type == TokenType.ERROR:
+                    self.error(token, token.value)
+            tokens = [token for token in tokens if token.type != TokenType.ERROR]
+        if not tokens or tokens[-1].type != TokenType.EOF:
+            last = tokens[-1] if tokens else None
+            tokens = tokens + [Token(TokenType.EOF, '', last.line if last else 1,
+                                     last.end_column if last else 1, synthetic=True)]
+        
         self.tokens = tokens
         self.position = 0
     
@@ -23,33 +83,89 @@ class Parser:
         return None
     
     def advance(self):
-        self.position += 1
+        # Never move past EOF
+        if self.tokens[self.position].type != TokenType.EOF:
+            self.position += 1
     
     def expect(self, token_type: TokenType) -> Token:
-        token = self.current_token()
-        if not token or token.type != token_type:
-            raise SyntaxError(
-                f"Expected {token_type.name}, got {token.type.name if token else 'EOF'} "
-                f"at line {token.line if token else 'end'}"
-            )
+        token = self.tokens[self.position]
+        if token.type != token_type:
+            self.error(token, f"Expected {self.describe_type(token_type)}, got {self.describe(token)}")
+            raise _Recover()
         self.advance()
         return token
     
     def match(self, *token_types: TokenType) -> bool:
-        token = self.current_token()
-        return token and token.type in token_types
+        return self.tokens[self.position].type in token_types
+    
+    def error(self, token: Token, message: str, severity: str = "error"):
+        self.diagnostics.append(Diagnostic(
+            line=token.line,
+            column=token.column,
+            end_line=token.line,
+            end_column=max(token.end_column, token.column + 1),
+            message=message,
+            severity=severity,
+            synthetic=token.synthetic
+        ))
+    
+    def describe(self, token: Token) -> str:
+        if token.type == TokenType.EOF:
+            return "end of file"
+        if token.type == TokenType.STRING:
+            return f'"{token.value}"'
+        return f"'{token.value}'"
+    
+    def describe_type(self, token_type: TokenType) -> str:
+        return TOKEN_NAMES.get(token_type, f"'{token_type.name.lower()}'")
+    
+    def synchronize(self, stop: Set[TokenType]):
+        """Skip tokens until one in ``stop`` at the current nesting depth.
+
+        Braced groups are skipped whole so their ``}`` does not end the
+        enclosing block. ``service`` and end of file always stop.
+        """
+        depth = 0
+        tokens = self.tokens
+        while True:
+            token_type = tokens[self.position].type
+            if token_type == TokenType.EOF or token_type == TokenType.SERVICE:
+                return
+            if depth == 0 and token_type in stop:
+                return
+            if token_type == TokenType.LBRACE:
+                depth += 1
+            elif token_type == TokenType.RBRACE and depth > 0:
+                depth -= 1
+            self.position += 1
     
     def parse(self) -> Program:
         """Parse the entire program"""
         program = Program()
         
-        while self.current_token() and self.current_token().type != TokenType.EOF:
-            if self.match(TokenType.SERVICE):
-                service = self.parse_service()
-                program.services.append(service)
-            else:
-                self.advance()
+        while not self.match(TokenType.EOF):
+            try:
+                if self.match(TokenType.SERVICE):
+                    service = self.parse_service()
+                    program.services.append(service)
+                elif self.match(TokenType.IMPORT):
+                    self.advance()
+                    path = self.expect(TokenType.STRING)
+                    program.imports.append(path.value)
+                else:
+                    token = self.current_token()
+                    self.error(token, f"Expected 'service' or 'import', got {self.describe(token)}")
+                    raise _Recover()
+            except _Recover:
+                # Never skip a `service`: it is where recovery resumes
+                if not self.match(TokenType.SERVICE):
+                    self.advance()
+                self.synchronize(TOP_LEVEL_SYNC)
         
+        # Lexical errors were recorded first
+        self.diagnostics.sort(key=lambda d: (d.line, d.column))
+        if self.raise_on_error and any(d.severity == "error" for d in self.diagnostics):
+            raise ParseError(self.diagnostics, program)
         return program
     
     def parse_service(self) -> Service:
@@ -60,117 +176,174 @@ class Parser:
         
         self.expect(TokenType.LBRACE)
         
-        while not self.match(TokenType.RBRACE):
-            if self.match(TokenType.ENDPOINT):
-                endpoint = self.parse_endpoint()
-                service.endpoints.append(endpoint)
-            
-            elif self.match(TokenType.CONNECT):
-                connection = self.parse_connection()
-                service.connections.append(connection)
-            
-            elif self.match(TokenType.DEPLOY):
-                self.parse_deploy_config(service)
-            
-            elif self.match(TokenType.PORT):
-                self.expect(TokenType.PORT)
-                self.expect(TokenType.COLON)
-                port = self.expect(TokenType.NUMBER)
-                service.configs['port'] = int(port.value)
-            
-            elif self.match(TokenType.REPLICAS):
-                self.expect(TokenType.REPLICAS)
-                self.expect(TokenType.COLON)
-                replicas = self.expect(TokenType.NUMBER)
-                service.configs['replicas'] = int(replicas.value)
-            
-            elif self.match(TokenType.DATABASE):
-                self.parse_database_config(service)
-            
-            else:
-                # Skip unknown tokens
+        while True:
+            token = self.current_token()
+            if token.type == TokenType.RBRACE:
                 self.advance()
+                break
+            if token.type in (TokenType.EOF, TokenType.SERVICE):
+                self.error(token, f"Expected '}}' to close service '{service.name}', got {self.describe(token)}")
+                break
+            
+            try:
+                if token.type == TokenType.ENDPOINT:
+                    endpoint = self.parse_endpoint()
+                    if endpoint is not None:
+                        service.endpoints.append(endpoint)
+                
+                elif token.type == TokenType.CONNECT:
+                    connection = self.parse_connection()
+                    service.connections.append(connection)
+                
+                elif token.type == TokenType.DEPLOY:
+                    self.parse_deploy_config(service)
+                
+                elif token.type == TokenType.PORT:
+                    self.expect(TokenType.PORT)
+                    self.expect(TokenType.COLON)
+                    port = self.expect(TokenType.NUMBER)
+                    service.configs['port'] = int(float(port.value))
+                
+                elif token.type == TokenType.REPLICAS:
+                    self.expect(TokenType.REPLICAS)
+                    self.expect(TokenType.COLON)
+                    replicas = self.expect(TokenType.NUMBER)
+                    service.configs['replicas'] = int(float(replicas.value))
+                
+                elif token.type == TokenType.DATABASE:
+                    self.parse_database_config(service)
+                
+                elif token.type == TokenType.ON:
+                    event = self.parse_event()
+                    if event is not None:
+                        service.events.append(event)
+                
+                else:
+                    self.error(token, f"Unexpected {self.describe(token)} in service '{service.name}'")
+                    raise _Recover()
+            except _Recover:
+                self.synchronize(SERVICE_SYNC)
         
-        self.expect(TokenType.RBRACE)
         return service
     
-    def parse_endpoint(self) -> Endpoint:
-        """Parse an endpoint definition"""
+    def parse_endpoint(self) -> Optional[Endpoint]:
+        """Parse an endpoint definition; returns None if it has no valid path"""
         self.expect(TokenType.ENDPOINT)
-        path_token = self.expect(TokenType.PATH)
-        endpoint = Endpoint(path=path_token.value)
+        path_token = self.current_token()
+        if path_token.type == TokenType.PATH:
+            self.advance()
+        else:
+            # Still parse the body so its errors are reported
+            self.error(path_token, f"Expected a path, got {self.describe(path_token)}")
+            path_token = None
+        endpoint = Endpoint(path=path_token.value if path_token else "")
         
         self.expect(TokenType.LBRACE)
         
-        while not self.match(TokenType.RBRACE):
-            if self.match(TokenType.METHOD):
-                self.expect(TokenType.METHOD)
-                self.expect(TokenType.COLON)
-                method_token = self.current_token()
-                if self.match(TokenType.GET, TokenType.POST, TokenType.PUT, 
-                            TokenType.DELETE, TokenType.PATCH):
-                    endpoint.method = method_token.value
-                    self.advance()
-            
-            elif self.match(TokenType.RESPONSE):
-                self.expect(TokenType.RESPONSE)
-                self.expect(TokenType.COLON)
-                response_token = self.expect(TokenType.IDENTIFIER)
-                # Handle arrays (User[])
-                if self.match(TokenType.LBRACKET):
-                    self.advance()
-                    self.expect(TokenType.RBRACKET)
-                    endpoint.response_type = response_token.value + "[]"
-                else:
-                    endpoint.response_type = response_token.value
-            
-            elif self.match(TokenType.CACHE):
-                self.expect(TokenType.CACHE)
-                self.expect(TokenType.COLON)
-                cache_token = self.expect(TokenType.DURATION)
-                endpoint.cache = cache_token.value
+        while True:
+            token = self.current_token()
+            if token.type == TokenType.RBRACE:
+                self.advance()
+                break
+            if token.type in (TokenType.EOF, TokenType.SERVICE, TokenType.ENDPOINT):
+                self.error(token, f"Expected '}}' to close endpoint {endpoint.path}, got {self.describe(token)}")
+                break
             
-            elif self.match(TokenType.RATELIMIT):
-                self.expect(TokenType.RATELIMIT)
-                self.expect(TokenType.COLON)
-                # Parse rate limit (e.g., 100/m)
-                num = self.expect(TokenType.NUMBER)
-                # Skip slash if present
-                if self.current_token() and self.current_token().value == '/':
-                    self.advance()
-                unit = self.current_token()
-                if unit and unit.type == TokenType.IDENTIFIER:
-                    endpoint.rate_limit = f"{num.value}/{unit.value}"
-                    self.advance()
+            try:
+                if token.type == TokenType.METHOD:
+                    self.expect(TokenType.METHOD)
+                    self.expect(TokenType.COLON)
+                    endpoint.method = self.expect_one_of(HTTP_METHODS, "an HTTP method")
+                
+                elif token.type == TokenType.RESPONSE:
+                    self.expect(TokenType.RESPONSE)
+                    self.expect(TokenType.COLON)
+                    response_token = self.expect(TokenType.IDENTIFIER)
+                    # Handle arrays (User[])
+                    if self.match(TokenType.LBRACKET):
+                        self.advance()
+                        self.expect(TokenType.RBRACKET)
+                        endpoint.response_type = response_token.value + "[]"
+                    else:
+                        endpoint.response_type = response_token.value
+                
+                elif token.type == TokenType.CACHE:
+                    self.expect(TokenType.CACHE)
+                    self.expect(TokenType.COLON)
+                    cache_token = self.expect(TokenType.DURATION)
+                    endpoint.cache = cache_token.value
+                
+                elif token.type == TokenType.RATELIMIT:
+                    self.expect(TokenType.RATELIMIT)
+                    self.expect(TokenType.COLON)
+                    # Parse rate limit (e.g., 100/m)
+                    num = self.expect(TokenType.NUMBER)
+                    unit = self.current_token()
+                    if unit.type == TokenType.IDENTIFIER:
+                        endpoint.rate_limit = f"{num.value}/{unit.value}"
+                        self.advance()
+                    elif unit.type == TokenType.PATH:
+                        # The lexer reads "/m" as a path token
+                        endpoint.rate_limit = f"{num.value}{unit.value}"
+                        self.advance()
+                    else:
+                        endpoint.rate_limit = num.value
+                
+                elif token.type == TokenType.TIMEOUT:
+                    self.expect(TokenType.TIMEOUT)
+                    self.expect(TokenType.COLON)
+                    timeout_token = self.expect(TokenType.DURATION)
+                    endpoint.timeout = timeout_token.value
+                
+                elif token.type == TokenType.AUTH:
+                    self.expect(TokenType.AUTH)
+                    self.expect(TokenType.COLON)
+                    endpoint.auth = self.expect_one_of(AUTH_LEVELS, "required, optional or none")
+                
+                elif token.type == TokenType.FALLBACK:
+                    self.expect(TokenType.FALLBACK)
+                    self.expect(TokenType.COLON)
+                    fallback_token = self.expect(TokenType.IDENTIFIER)
+                    endpoint.fallback = fallback_token.value
+                
+                elif token.type == TokenType.COMPRESS:
+                    self.expect(TokenType.COMPRESS)
+                    self.expect(TokenType.COLON)
+                    value = self.current_token()
+                    if value.type == TokenType.NONE or value.value in COMPRESS_VALUES:
+                        endpoint.compress = value.value
+                        self.advance()
+                    else:
+                        self.expect_one_of(set(), "auto, gzip, br, zstd or none")
+                
+                elif token.type == TokenType.PAGESIZE:
+                    self.expect(TokenType.PAGESIZE)
+                    self.expect(TokenType.COLON)
+                    value = self.current_token()
+                    if value.type == TokenType.NUMBER and value.value.isdigit() and int(value.value) > 0:
+                        endpoint.page_size = value.value
+                        self.advance()
+                    else:
+                        self.expect_one_of(set(), "a positive whole number of items")
+                
                 else:
-                    endpoint.rate_limit = num.value
-            
-            elif self.match(TokenType.TIMEOUT):
-                self.expect(TokenType.TIMEOUT)
-                self.expect(TokenType.COLON)
-                timeout_token = self.expect(TokenType.DURATION)
-                endpoint.timeout = timeout_token.value
-            
-            elif self.match(TokenType.AUTH):
-                self.expect(TokenType.AUTH)
-                self.expect(TokenType.COLON)
-                auth_token = self.current_token()
-                if self.match(TokenType.REQUIRED, TokenType.OPTIONAL, TokenType.NONE):
-                    endpoint.auth = auth_token.value
-                    self.advance()
-            
-            elif self.match(TokenType.FALLBACK):
-                self.expect(TokenType.FALLBACK)
-                self.expect(TokenType.COLON)
-                fallback_token = self.expect(TokenType.IDENTIFIER)
-                endpoint.fallback = fallback_token.value
-            
-            else:
-                # Skip unknown tokens
-                self.advance()
+                    self.error(token, f"Unexpected {self.describe(token)} in endpoint {endpoint.path}")
+                    raise _Recover()
+            except _Recover:
+                self.synchronize(ENDPOINT_SYNC)
         
-        self.expect(TokenType.RBRACE)
-        return endpoint
+        return endpoint if path_token else None
+    
+    def expect_one_of(self, token_types: Set[TokenType], description: str) -> Optional[str]:
+        """Consume a keyword value; an invalid one is reported and skipped"""
+        token = self.current_token()
+        if token.type in token_types:
+            self.advance()
+            return token.value
+        self.error(token, f"Expected {description}, got {self.describe(token)}")
+        if token.type in (TokenType.IDENTIFIER, TokenType.STRING, TokenType.NUMBER):
+            self.advance()
+        return None
     
     def parse_connection(self) -> Connection:
         """Parse a connection definition"""
@@ -181,24 +354,89 @@ class Parser:
         protocol = "http"  # default
         if self.match(TokenType.VIA):
             self.advance()
-            proto_token = self.current_token()
-            if self.match(TokenType.HTTP, TokenType.GRPC, TokenType.RABBITMQ, TokenType.KAFKA):
-                protocol = proto_token.value
-                self.advance()
+            protocol = self.expect_one_of(PROTOCOLS, "http, grpc, rabbitmq or kafka") or protocol
         
         return Connection(target_service=target.value, protocol=protocol)
     
+    def parse_event(self) -> Optional[Event]:
+        """Parse an event block; returns None if the event type is invalid.
+
+        Actions are kept as normalized source text, e.g. ``preload("numpy")``.
+        """
+        self.expect(TokenType.ON)
+        type_token = self.current_token()
+        event_type = type_token.value if type_token.value in EVENT_TYPES else None
+        if event_type is None:
+            self.error(type_token, f"Expected start, shutdown, error or scale, got {self.describe(type_token)}")
+            if type_token.type == TokenType.IDENTIFIER:
+                self.advance()
+        else:
+            self.advance()
+        event = Event(event_type=event_type or "")
+        recovered = False
+        
+        self.expect(TokenType.LBRACE)
+        
+        while True:
+            token = self.current_token()
+            if token.type == TokenType.RBRACE:
+                if not event.actions and event_type and not recovered:
+                    self.error(token, f"Expected an action in 'on {event_type}'")
+                self.advance()
+                break
+            if token.type in (TokenType.EOF, TokenType.SERVICE, TokenType.ENDPOINT):
+                self.error(token, f"Expected '}}' to close 'on {event.event_type}', got {self.describe(token)}")
+                break
+            
+            try:
+                event.actions.append(self.parse_action())
+            except _Recover:
+                recovered = True
+                # Resume at the next "name(" or the closing brace
+                if not self.match(TokenType.RBRACE, TokenType.SERVICE):
+                    self.advance()
+                while not self.match(TokenType.RBRACE, TokenType.EOF, TokenType.SERVICE, TokenType.ENDPOINT) and not (
+                        self.match(TokenType.IDENTIFIER) and self.peek_token().type == TokenType.LPAREN):
+                    self.advance()
+        
+        return event if event_type else None
+    
+    def parse_action(self) -> str:
+        """Parse ``name(arg, ...)`` into its normalized source text"""
+        token = self.current_token()
+        if token.type != TokenType.IDENTIFIER:
+            self.error(token, f"Expected an action such as warmPools(), got {self.describe(token)}")
+            raise _Recover()
+        self.advance()
+        self.expect(TokenType.LPAREN)
+        
+        args = []
+        while not self.match(TokenType.RPAREN):
+            if args:
+                self.expect(TokenType.COMMA)
+            arg = self.current_token()
+            # Keywords are fine as bare names: flush(kafka)
+            if arg.type not in ACTION_ARGS and not (arg.value.isidentifier() and arg.type not in TOP_LEVEL_SYNC
+                                                   and arg.type != TokenType.ENDPOINT):
+                self.error(arg, f"Expected a string, number, duration or name, got {self.describe(arg)}")
+                raise _Recover()
+            self.advance()
+            if arg.type == TokenType.STRING:
+                args.append('"' + arg.value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+            else:
+                args.append(arg.value)
+        self.advance()
+        return f"{token.value}({', '.join(args)})"
+    
     def parse_deploy_config(self, service: Service):
         """Parse deployment configuration"""
         self.expect(TokenType.DEPLOY)
         self.expect(TokenType.ON)
         self.expect(TokenType.COLON)
         
-        platform_token = self.current_token()
-        if self.match(TokenType.DOCKER, TokenType.KUBERNETES, TokenType.AWS, 
-                     TokenType.AZURE, TokenType.GCP):
-            service.configs['platform'] = platform_token.value
-            self.advance()
+        platform = self.expect_one_of(PLATFORMS, "docker, kubernetes, aws, azure or gcp")
+        if platform:
+            service.configs['platform'] = platform
     
     def parse_database_config(self, service: Service):
         """Parse database configuration"""
@@ -209,30 +447,45 @@ class Parser:
             'type': db_type.value,
             'settings': {}
         }
+        settings = service.configs['database']['settings']
         
         if self.match(TokenType.LBRACE):
             self.advance()
-            while not self.match(TokenType.RBRACE):
-                if self.match(TokenType.IDENTIFIER):
-                    key = self.expect(TokenType.IDENTIFIER)
+            while True:
+                token = self.current_token()
+                if token.type == TokenType.RBRACE:
+                    self.advance()
+                    break
+                if token.type in (TokenType.EOF, TokenType.SERVICE, TokenType.ENDPOINT):
+                    self.error(token, f"Expected '}}' to close database block, got {self.describe(token)}")
+                    break
+                
+                try:
+                    # Keys may be keywords too (port: 5432)
+                    if not token.value.isidentifier():
+                        self.error(token, f"Expected a setting name, got {self.describe(token)}")
+                        raise _Recover()
+                    self.advance()
                     self.expect(TokenType.COLON)
                     
                     value_token = self.current_token()
-                    if self.match(TokenType.STRING):
+                    if value_token.type == TokenType.STRING:
                         value = value_token.value
-                        self.advance()
-                    elif self.match(TokenType.NUMBER):
-                        value = int(value_token.value)
-                        self.advance()
+                    elif value_token.type == TokenType.NUMBER:
+                        value = float(value_token.value) if '.' in value_token.value else int(value_token.value)
                     else:
-                        value = None
-                        self.advance()
-                    
-                    service.configs['database']['settings'][key.value] = value
-                else:
+                        self.error(value_token, f"Expected a string or number, got {self.describe(value_token)}")
+                        raise _Recover()
                     self.advance()
-            
-            self.expect(TokenType.RBRACE)
+                    settings[token.value] = value
+                except _Recover:
+                    # Resume at the next "key:" pair or the closing brace
+                    if not self.match(TokenType.RBRACE, TokenType.SERVICE):
+                        self.advance()
+                    while not self.match(TokenType.RBRACE, TokenType.EOF, TokenType.SERVICE) and not (
+                            self.current_token().value.isidentifier()
+                            and self.peek_token().type == TokenType.COLON):
+                        self.advance()
 
 
 def main():
@@ -268,6 +521,32 @@ def main():
     
     print("AST:")
     print(print_ast(ast))
+    
+    # Benchmark: recovery must stay linear on error-heavy input
+    import time
+    valid = """
+    service Service{i} {{
+        endpoint /items{i}/:id {{ method: GET response: Item cache: 5m timeout: 3s }}
+        connect to Service{i} via http
+        port: 8080
+    }}"""
+    broken = """
+    service Service{i} {{
+        endpoint /items{i}/:id {{ method: FETCH response: [] cache: soon timeout: 3s
+        connect to Service{i} via smtp
+        port: "8080"
+        garbage ( ) here
+    """
+    print("\nParse time (tokens are lexed up front):")
+    for count in (100, 1000, 10000):
+        for label, template in (("valid", valid), ("errors", broken)):
+            tokens = Lexer("".join(template.format(i=i) for i in range(count))).tokenize()
+            start = time.perf_counter()
+            parser = Parser(tokens, raise_on_error=False)
+            parser.parse()
+            elapsed = time.perf_counter() - start
+            print(f"  {count:>6} services, {label:6}: {elapsed * 1000:8.2f}ms, "
+                  f"{elapsed / len(tokens) * 1e9:6.0f}ns/token, {len(parser.diagnostics)} diagnostics")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,263 @@
+"""
+CloudScript Query - Route trie and inverted indexes for querying a program
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+from ast_nodes import Program
+from ir import EndpointModel, ServiceModel, program_model
+
+
+# Endpoint filters answered from an inverted index
+ENDPOINT_KEYS = ("method", "auth", "cache", "rateLimit", "timeout", "response", "service", "compress",
+                 "pageSize")
+
+# Service filters; an endpoint matches if its service does
+SERVICE_KEYS = ("protocol", "database", "calls", "calledBy", "platform")
+
+
+class QueryError(ValueError):
+    """Raised for malformed query terms"""
+    pass
+
+
+@dataclass
+class EndpointRef:
+    """An endpoint together with the service that exposes it"""
+    service: ServiceModel
+    endpoint: EndpointModel
+    
+    def __str__(self) -> str:
+        return f"{self.service.name} {self.endpoint.route_key}"
+
+
+@dataclass
+class _RouteNode:
+    children: Dict[str, "_RouteNode"] = field(default_factory=dict)
+    param: Optional["_RouteNode"] = None
+    methods: Dict[str, List[int]] = field(default_factory=dict)
+
+
+class RouteTrie:
+    """Routes keyed by path segment, with ``:param`` segments as wildcards.
+
+    A lookup walks one node per segment. Literal children are tried before
+    the parameter child, so ``/users/me`` finds both ``/users/me`` and
+    ``/users/:id`` with the literal route first.
+    """
+    
+    def __init__(self):
+        self.root = _RouteNode()
+    
+    def insert(self, segments: List[str], method: str, value: int):
+        node = self.root
+        for segment in segments:
+            if segment.startswith(':'):
+                if node.param is None:
+                    node.param = _RouteNode()
+                node = node.param
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _RouteNode()
+                node = child
+        node.methods.setdefault(method, []).append(value)
+    
+    def match(self, segments: List[str], method: Optional[str] = None) -> List[int]:
+        """Values of routes matching a concrete path or a route pattern.
+
+        A ``:param`` segment in the query matches only parameter segments.
+        """
+        results: List[int] = []
+        self._match(self.root, segments, 0, method, results)
+        return results
+    
+    def _match(self, node: _RouteNode, segments: List[str], depth: int, method: Optional[str], results: List[int]):
+        if depth == len(segments):
+            if method is None:
+                for values in node.methods.values():
+                    results.extend(values)
+            else:
+                results.extend(node.methods.get(method, ()))
+            return
+        segment = segments[depth]
+        if not segment.startswith(':'):
+            child = node.children.get(segment)
+            if child is not None:
+                self._match(child, segments, depth + 1, method, results)
+        if node.param is not None:
+            self._match(node.param, segments, depth + 1, method, results)
+
+
+class ProgramIndex:
+    """Indexes every endpoint of a program for lookups by route and attribute.
+
+    Each attribute has an inverted index from value to the set of endpoint
+    numbers, so a query intersects a few sets instead of scanning every
+    service. Missing values are indexed as ``none``; ``cache``, ``rateLimit``
+    and ``timeout`` also index ``any`` for endpoints that set them.
+    """
+    
+    def __init__(self, program: Program):
+        model = program_model(program)
+        self.model = model
+        self.entries: List[EndpointRef] = []
+        self.routes = RouteTrie()
+        self.endpoint_index: Dict[str, Dict[str, Set[int]]] = {key: {} for key in ENDPOINT_KEYS}
+        self.service_index: Dict[str, Dict[str, Set[str]]] = {key: {} for key in SERVICE_KEYS}
+        self.endpoints_of: Dict[str, List[int]] = {}
+        
+        for service in model.services:
+            numbers = self.endpoints_of.setdefault(service.name, [])
+            for endpoint in service.endpoints:
+                number = len(self.entries)
+                self.entries.append(EndpointRef(service, endpoint))
+                numbers.append(number)
+                self.routes.insert(endpoint.segments, endpoint.method, number)
+                
+                raw = endpoint.endpoint
+                self._add(self.endpoint_index["method"], endpoint.method, number)
+                self._add(self.endpoint_index["auth"], raw.auth or "none", number)
+                self._add(self.endpoint_index["response"], endpoint.base_type or "none", number)
+                self._add(self.endpoint_index["service"], service.name, number)
+                self._add(self.endpoint_index["compress"], endpoint.compress, number)
+                for key, value in (("cache", raw.cache), ("rateLimit", raw.rate_limit), ("timeout", raw.timeout),
+                                   ("pageSize", raw.page_size)):
+                    self._add(self.endpoint_index[key], value or "none", number)
+                    if value:
+                        self._add(self.endpoint_index[key], "any", number)
+            
+            self._add(self.service_index["database"], service.database or "none", service.name)
+            self._add(self.service_index["platform"], service.service.configs.get("platform") or "none",
+                      service.name)
+            for conn in service.connections:
+                self._add(self.service_index["protocol"], conn.protocol, service.name)
+                self._add(self.service_index["calls"], conn.target_service, service.name)
+            for caller, _ in service.inbound:
+                self._add(self.service_index["calledBy"], caller, service.name)
+    
+    @staticmethod
+    def _add(index: Dict[str, Set], value: str, item):
+        index.setdefault(value, set()).add(item)
+    
+    def route(self, path: str, method: Optional[str] = None) -> List[EndpointRef]:
+        """Endpoints serving a path (``/users/42``) or route (``/users/:id``)"""
+        segments = [part for part in path.split('/') if part]
+        return [self.entries[n] for n in self.routes.match(segments, method.upper() if method else None)]
+    
+    def endpoints(self, **filters: str) -> List[EndpointRef]:
+        """Endpoints matching every filter, in declaration order.
+
+        Keys are those of ``ENDPOINT_KEYS`` and ``SERVICE_KEYS``, e.g.
+        ``endpoints(auth="required", cache="none")``.
+        """
+        sets = []
+        services = self._service_filter(filters)
+        if services is not None:
+            sets.append({n for name in services for n in self.endpoints_of[name]})
+        for key, value in filters.items():
+            if key in ENDPOINT_KEYS:
+                if key == "method":
+                    value = value.upper()
+                sets.append(self.endpoint_index[key].get(value, set()))
+        
+        if not sets:
+            return list(self.entries)
+        sets.sort(key=len)
+        numbers = sets[0].intersection(*sets[1:])
+        return [self.entries[n] for n in sorted(numbers)]
+    
+    def services(self, **filters: str) -> List[ServiceModel]:
+        """Services matching every service filter, in declaration order"""
+        if any(key in ENDPOINT_KEYS for key in filters):
+            names = {ref.service.name for ref in self.endpoints(**filters)}
+        else:
+            names = self._service_filter(filters)
+        if names is None:
+            return list(self.model.services)
+        return [service for service in self.model.services if service.name in names]
+    
+    def _service_filter(self, filters: Dict[str, str]) -> Optional[Set[str]]:
+        unknown = [key for key in filters if key not in ENDPOINT_KEYS and key not in SERVICE_KEYS]
+        if unknown:
+            raise QueryError(f"Unknown query key '{unknown[0]}' "
+                             f"(expected one of {', '.join(ENDPOINT_KEYS + SERVICE_KEYS)})")
+        sets = [self.service_index[key].get(value, set()) for key, value in filters.items() if key in SERVICE_KEYS]
+        if not sets:
+            return None
+        return set.intersection(*sets)
+
+
+def program_index(program: Program) -> ProgramIndex:
+    """Return the cached index for a program, building it on first use"""
+    index = program.__dict__.get('_index')
+    if index is None:
+        index = program.__dict__['_index'] = ProgramIndex(program)
+    return index
+
+
+def parse_filters(terms: Iterable[str]) -> Dict[str, str]:
+    """Parse ``key=value`` terms into filters"""
+    filters = {}
+    for term in terms:
+        key, sep, value = term.partition('=')
+        if not sep or not key or not value:
+            raise QueryError(f"Expected key=value, got '{term}'")
+        filters[key] = value
+    return filters
+
+
+def main():
+    # Benchmark: indexed lookups vs scanning every endpoint
+    import time
+    from ast_nodes import Service, Endpoint, Connection
+    
+    services = []
+    for i in range(600):
+        endpoints = [Endpoint(path=f"/resource{i}/items{j}/:id", method="GET" if j % 2 else "POST",
+                              cache="5m" if j % 3 else None, auth="required" if j % 4 else None)
+                     for j in range(10)]
+        services.append(Service(name=f"Service{i}", endpoints=endpoints,
+                                connections=[Connection(f"Service{(i + 1) % 600}", "kafka" if i % 5 else "http")]))
+    program = Program(services=services)
+    
+    start = time.perf_counter()
+    index = ProgramIndex(program)
+    print(f"Indexed {len(index.entries):,} endpoints in {(time.perf_counter() - start) * 1000:.2f}ms")
+    
+    def scan_route(path, method):
+        segments = [part for part in path.split('/') if part]
+        found = []
+        for service in program.services:
+            for endpoint in service.endpoints:
+                parts = [part for part in endpoint.path.split('/') if part]
+                if (endpoint.method == method and len(parts) == len(segments)
+                        and all(p.startswith(':') or p == s for p, s in zip(parts, segments))):
+                    found.append((service.name, endpoint.path))
+        return found
+    
+    def scan_filter(target):
+        return [(service.name, endpoint.path) for service in program.services for endpoint in service.endpoints
+                if endpoint.auth == "required" and not endpoint.cache
+                and any(conn.target_service == target for conn in service.connections)]
+    
+    queries = [(f"/resource{i}/items{i % 10}/42", "GET" if i % 2 else "POST") for i in range(0, 600, 7)]
+    targets = [f"Service{i}" for i in range(len(queries))]
+    for label, indexed, scanned in (
+        ("route", lambda: [index.route(path, method) for path, method in queries],
+         lambda: [scan_route(path, method) for path, method in queries]),
+        ("filter", lambda: [index.endpoints(auth="required", cache="none", calls=target) for target in targets],
+         lambda: [scan_filter(target) for target in targets]),
+    ):
+        start = time.perf_counter()
+        results = indexed()
+        indexed_time = (time.perf_counter() - start) / len(queries)
+        start = time.perf_counter()
+        expected = scanned()
+        scan_time = (time.perf_counter() - start) / len(queries)
+        assert [[(r.service.name, r.endpoint.path) for r in result] for result in results] == expected
+        print(f"{label:7} indexed {indexed_time * 1e6:9.2f}us  scan {scan_time * 1e6:9.2f}us  "
+              f"({scan_time / indexed_time:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
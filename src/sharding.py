@@ -0,0 +1,214 @@
+"""
+CloudScript Sharding - Split generation across CI nodes and merge their outputs
+"""
+import hashlib
+import json
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from ast_nodes import Program
+from ir import program_model
+
+
+# Work unit for the artifacts built from the whole program (docker-compose.yml, gateway spec)
+PROGRAM_UNIT = "<program>"
+
+# Written at the root of each shard's output directory
+MANIFEST_NAME = "shard-manifest.json"
+
+# Written by merge: measured seconds per unit, for --shard-timings on the next run
+TIMINGS_NAME = "shard-timings.json"
+
+MANIFEST_VERSION = 1
+
+
+class ShardError(ValueError):
+    """Raised for a malformed --shard, or shard outputs that cannot be merged"""
+    pass
+
+
+@dataclass
+class ShardPlan:
+    """Work units per shard; shard i (1-based) gets units[i - 1]"""
+    units: List[List[str]]
+    weights: Dict[str, float] = field(default_factory=dict)
+    
+    def units_for(self, index: int) -> List[str]:
+        return self.units[index - 1]
+    
+    @property
+    def digest(self) -> str:
+        """Identifies the plan, so merge can tell shards that were planned differently apart"""
+        return hashlib.sha256(json.dumps(self.units).encode()).hexdigest()[:16]
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """`2/4` -> (2, 4); shards are numbered from 1"""
+    index, _, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ShardError(f"Expected --shard INDEX/COUNT such as 1/4, got '{spec}'")
+    if count < 1 or not 1 <= index <= count:
+        raise ShardError(f"Shard index must be between 1 and {count}, got '{spec}'")
+    return index, count
+
+
+def stable_hash(name: str) -> int:
+    """The same on every machine and Python version, unlike hash()"""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big")
+
+
+def unit_weights(program: Program, timings: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Estimated cost of each unit: endpoint counts, or seconds measured by an earlier run.
+
+    Endpoints drive most generated output, and the program unit grows with
+    the number of services. With timings, units that were not measured
+    (new services) are scaled from the measured ones.
+    """
+    model = program_model(program)
+    weights = {service.name: len(service.endpoints) + 1.0 for service in model.services}
+    weights[PROGRAM_UNIT] = float(len(model.services))
+    if timings:
+        measured = {name: timings[name] for name in weights if name in timings}
+        estimated = sum(weights[name] for name in measured)
+        scale = sum(measured.values()) / estimated if estimated else 1.0
+        weights = {name: measured.get(name, weight * scale) for name, weight in weights.items()}
+    return weights
+
+
+def plan_shards(program: Program, count: int, timings: Optional[Dict[str, float]] = None) -> ShardPlan:
+    """Assign every unit to exactly one shard, heaviest first to the lightest shard.
+
+    Units are ordered by weight and then by stable hash, so every node
+    computes the same plan from the same program.
+    """
+    weights = unit_weights(program, timings)
+    loads = [0.0] * count
+    units: List[List[str]] = [[] for _ in range(count)]
+    for name in sorted(weights, key=lambda name: (-weights[name], stable_hash(name))):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        units[shard].append(name)
+        loads[shard] += weights[name]
+    return ShardPlan(units, weights)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clear_previous(output_dir: Path):
+    """Remove the files an earlier shard run recorded, so a new plan starts clean"""
+    try:
+        manifest = read_manifest(output_dir)
+    except ShardError:
+        return
+    for relative in manifest["files"]:
+        (output_dir / relative).unlink(missing_ok=True)
+
+
+def write_manifest(output_dir: Path, written: Iterable[Path], index: int, count: int, target: str,
+                   plan: ShardPlan, timings: Dict[str, float], total: float) -> Path:
+    """Record what a shard generated, with a hash of every file and its timings.
+
+    Only the files in ``written`` are listed: anything else in output_dir was
+    left by another compile and must not be merged.
+    """
+    files = {}
+    for path in sorted(set(written)):
+        files[path.relative_to(output_dir).as_posix()] = file_digest(path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "shard": index,
+        "shards": count,
+        "target": target,
+        "plan": plan.digest,
+        "units": plan.units_for(index),
+        "files": files,
+        "timings": {"units": timings, "total": total},
+    }
+    manifest_path = output_dir / MANIFEST_NAME
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def read_manifest(shard_dir: Path) -> Dict:
+    try:
+        with open(shard_dir / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ShardError(f"No {MANIFEST_NAME} in {shard_dir}; was it compiled with --shard?")
+    except ValueError as e:
+        raise ShardError(f"Unreadable {shard_dir / MANIFEST_NAME}: {e}")
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ShardError(f"{shard_dir / MANIFEST_NAME} has manifest version {manifest.get('version')}, "
+                         f"expected {MANIFEST_VERSION}")
+    return manifest
+
+
+def merge_shards(shard_dirs: Sequence[str], output_dir: str) -> Dict:
+    """Copy every shard's files into output_dir, checking the shards form one complete run.
+
+    Returns the measured timings, which are also written to
+    output_dir/shard-timings.json for balancing the next run.
+    """
+    manifests = [(Path(directory), read_manifest(Path(directory))) for directory in shard_dirs]
+    first, reference = manifests[0]
+    count = reference["shards"]
+    seen: Dict[int, Path] = {}
+    for directory, manifest in manifests:
+        if manifest["shards"] != count or manifest["target"] != reference["target"]:
+            raise ShardError(f"{directory} is shard {manifest['shard']}/{manifest['shards']} of target "
+                             f"'{manifest['target']}', but {first} is of {count} shards "
+                             f"of target '{reference['target']}'")
+        if manifest["plan"] != reference["plan"]:
+            raise ShardError(f"{directory} and {first} were planned differently; "
+                             f"were they compiled from the same source and --shard-timings?")
+        if manifest["shard"] in seen:
+            raise ShardError(f"{directory} and {seen[manifest['shard']]} are both shard {manifest['shard']}")
+        seen[manifest["shard"]] = directory
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    if missing:
+        raise ShardError(f"Missing shard(s) {', '.join(f'{i}/{count}' for i in missing)}")
+    
+    output = Path(output_dir)
+    owners: Dict[str, Tuple[Path, str]] = {}
+    for directory, manifest in sorted(manifests, key=lambda item: item[1]["shard"]):
+        for relative, digest in manifest["files"].items():
+            owner = owners.get(relative)
+            if owner is not None:
+                if owner[1] != digest:
+                    raise ShardError(f"{relative} differs between {owner[0]} and {directory}")
+                continue
+            source = directory / relative
+            if not source.is_file() or file_digest(source) != digest:
+                raise ShardError(f"{source} is missing or changed since its shard was compiled")
+            destination = output / relative
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, destination)
+            owners[relative] = (directory, digest)
+    
+    timings = {
+        "shards": {str(manifest["shard"]): manifest["timings"]["total"] for _, manifest in manifests},
+        "units": {unit: seconds for _, manifest in manifests
+                  for unit, seconds in manifest["timings"]["units"].items()},
+    }
+    output.mkdir(parents=True, exist_ok=True)
+    with open(output / TIMINGS_NAME, "w") as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+    return timings
+
+
+def read_timings(path: str) -> Dict[str, float]:
+    """Unit timings from a previous merge, for balancing by measured time"""
+    try:
+        with open(path) as f:
+            return json.load(f)["units"]
+    except (OSError, ValueError, KeyError) as e:
+        raise ShardError(f"Cannot read shard timings from {path}: {e}")
@@ -0,0 +1,419 @@
+"""
+CloudScript Performance Simulator - Discrete-event simulation of a service topology
+"""
+import heapq
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from ast_nodes import Program
+from ir import EndpointModel, program_model
+
+
+# Protocols where the caller waits for the callee's response
+SYNC_PROTOCOLS = {"http", "grpc"}
+
+# Event kinds
+ARRIVAL = 0
+SERVICE_DONE = 1
+COMPLETE = 2
+TIMEOUT = 3
+
+
+class Sampler:
+    """Draws service times in blocks to amortize per-sample overhead"""
+    
+    def __init__(self, rng: random.Random, mean: float, distribution: str = "exponential",
+                 block_size: int = 8192):
+        self.rng = rng
+        self.mean = mean
+        self.distribution = distribution
+        self.block_size = block_size
+        self.block: List[float] = []
+    
+    def __call__(self) -> float:
+        if not self.block:
+            self.block = self._draw_block()
+        return self.block.pop()
+    
+    def _draw_block(self) -> List[float]:
+        n = self.block_size
+        rand = self.rng.random
+        if self.distribution == "constant":
+            return [self.mean] * n
+        if self.distribution == "lognormal":
+            # sigma=1 gives a heavy tail with the requested mean
+            mu = math.log(self.mean) - 0.5
+            gauss = self.rng.gauss
+            return [math.exp(mu + gauss(0.0, 1.0)) for _ in range(n)]
+        mean = self.mean
+        log = math.log
+        return [-mean * log(1.0 - rand()) for _ in range(n)]
+
+
+class _Request:
+    __slots__ = ("service", "endpoint", "start", "parent", "pending", "done", "failed")
+    
+    def __init__(self, service: int, endpoint: int, start: float, parent: Optional["_Request"]):
+        self.service = service
+        self.endpoint = endpoint
+        self.start = start
+        self.parent = parent
+        self.pending = 0
+        self.done = False
+        self.failed = False
+
+
+@dataclass
+class ServiceStats:
+    """Per-service results for one simulation run"""
+    name: str
+    replicas: int
+    completed: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    busy_time: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    throughput: float = 0.0
+    utilization: float = 0.0
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(math.ceil(p / 100.0 * len(ordered))) - 1)
+        return ordered[max(index, 0)]
+
+
+@dataclass
+class SimulationResult:
+    """Results for one load factor"""
+    load_factor: float
+    services: Dict[str, ServiceStats]
+    events: int
+    wall_time: float
+
+
+class Simulator:
+    """Simulates request flow through a CloudScript topology.
+
+    Each endpoint receives Poisson arrivals at ``base_rate`` requests/second
+    (scaled by the load factor). Each replica serves one request at a time
+    with service times drawn from ``distribution``. ``rateLimit:`` is applied
+    per replica as a token bucket, ``cache:`` endpoints are answered from a
+    cache entry that lives for the cache duration, ``timeout:`` cuts requests
+    off, and synchronous ``connect to`` targets are called in parallel after
+    the local work finishes. Targets not defined in the spec are modelled as
+    external dependencies with unlimited capacity.
+    """
+    
+    def __init__(self, program: Program, base_rate: float = 10.0, service_time: float = 0.02,
+                 distribution: str = "exponential", duration: float = 60.0,
+                 hop_overhead: float = 0.001, cache_hit_time: float = 0.0005,
+                 saturation_threshold: float = 0.9, seed: int = 42):
+        self.program = program
+        self.base_rate = base_rate
+        self.service_time = service_time
+        self.distribution = distribution
+        self.duration = duration
+        self.hop_overhead = hop_overhead
+        self.cache_hit_time = cache_hit_time
+        self.saturation_threshold = saturation_threshold
+        self.seed = seed
+        
+        self.services = program_model(program).services
+        self.index = {service.name: i for i, service in enumerate(self.services)}
+        self.externals: Dict[str, int] = {}
+        self.calls: List[List[Tuple[int, bool]]] = []
+        
+        for service in self.services:
+            calls = []
+            for conn in service.connections:
+                target = self.index.get(conn.target_service)
+                if target is None:
+                    target = self._external(conn.target_service)
+                calls.append((target, conn.protocol in SYNC_PROTOCOLS))
+            self.calls.append(calls)
+    
+    def _external(self, name: str) -> int:
+        """Register an undefined connection target as an external dependency"""
+        if name not in self.externals:
+            self.externals[name] = len(self.services) + len(self.externals)
+        return self.externals[name]
+    
+    def run(self, load_factor: float = 1.0) -> SimulationResult:
+        """Run one simulation at the given multiple of the base arrival rate"""
+        rng = random.Random(self.seed)
+        sample = Sampler(rng, self.service_time, self.distribution)
+        external_sample = Sampler(rng, self.service_time, "exponential")
+        
+        services = self.services
+        n_services = len(services)
+        replicas = [s.replicas or 1 for s in services]
+        stats = [ServiceStats(name=s.name, replicas=r) for s, r in zip(services, replicas)]
+        busy = [0] * n_services
+        queues: List[List[_Request]] = [[] for _ in services]
+        queue_heads = [0] * n_services
+        
+        endpoints: List[List[EndpointModel]] = [s.endpoints for s in services]
+        next_endpoint = [0] * n_services
+        timeouts = [[e.timeout_seconds for e in eps] for eps in endpoints]
+        cache_ttl = [[e.cache_seconds if e.method == "GET" else None for e in eps] for eps in endpoints]
+        cache_expiry = [[-1.0] * len(eps) for eps in endpoints]
+        fallbacks = [[bool(e.endpoint.fallback) for e in eps] for eps in endpoints]
+        
+        # Token buckets per endpoint: [capacity, refill/s, tokens, last refill]
+        buckets: List[List[Optional[list]]] = []
+        for s, eps, r in zip(services, endpoints, replicas):
+            row = []
+            for e in eps:
+                rate = e.rate_limit
+                if rate is None:
+                    row.append(None)
+                else:
+                    capacity = max(1.0, rate * r)
+                    row.append([capacity, rate * r, capacity, 0.0])
+            buckets.append(row)
+        
+        heap: list = []
+        push = heapq.heappush
+        pop = heapq.heappop
+        seq = 0
+        now = 0.0
+        end = self.duration
+        rate = self.base_rate * load_factor
+        events = 0
+        
+        def complete(req: _Request, at: float, status: str):
+            if req.done:
+                return
+            req.done = True
+            service = req.service
+            if service < n_services:
+                st = stats[service]
+                if status == "ok":
+                    st.completed += 1
+                    st.latencies.append(at - req.start)
+                    ttl = cache_ttl[service][req.endpoint] if req.endpoint >= 0 else None
+                    if ttl:
+                        cache_expiry[service][req.endpoint] = at + ttl
+                elif status == "timeout":
+                    st.timeouts += 1
+                    st.latencies.append(at - req.start)
+                elif status == "rejected":
+                    st.rejected += 1
+                else:
+                    st.errors += 1
+            parent = req.parent
+            if parent is not None and not parent.done:
+                if status != "ok":
+                    parent.failed = True
+                parent.pending -= 1
+                if parent.pending == 0:
+                    nonlocal seq
+                    seq += 1
+                    push(heap, (at + self.hop_overhead, seq, COMPLETE, parent))
+        
+        def start(req: _Request, at: float):
+            nonlocal seq
+            service_time = sample()
+            stats[req.service].busy_time += min(service_time, end - at)
+            seq += 1
+            push(heap, (at + service_time, seq, SERVICE_DONE, req))
+        
+        def submit(req: _Request, at: float):
+            nonlocal seq
+            service = req.service
+            if service >= n_services:
+                # External dependency with unlimited capacity
+                seq += 1
+                push(heap, (at + external_sample(), seq, COMPLETE, req))
+                return
+            if not endpoints[service]:
+                req.endpoint = -1
+            else:
+                endpoint = req.endpoint
+                bucket = buckets[service][endpoint]
+                if bucket is not None:
+                    bucket[2] = min(bucket[0], bucket[2] + (at - bucket[3]) * bucket[1])
+                    bucket[3] = at
+                    if bucket[2] < 1.0:
+                        complete(req, at, "rejected")
+                        return
+                    bucket[2] -= 1.0
+                if cache_expiry[service][endpoint] > at:
+                    stats[service].cache_hits += 1
+                    seq += 1
+                    push(heap, (at + self.cache_hit_time, seq, COMPLETE, req))
+                    return
+                timeout = timeouts[service][endpoint]
+                if timeout:
+                    seq += 1
+                    push(heap, (at + timeout, seq, TIMEOUT, req))
+            if busy[service] < replicas[service]:
+                busy[service] += 1
+                start(req, at)
+            else:
+                queues[service].append(req)
+        
+        def call_downstream(req: _Request, at: float):
+            calls = self.calls[req.service]
+            # Set the pending count first: children can finish synchronously (rejections)
+            req.pending = sum(1 for _, sync in calls if sync)
+            if not req.pending:
+                complete(req, at, "ok")
+            for target, sync in calls:
+                if target < n_services and endpoints[target]:
+                    endpoint = next_endpoint[target]
+                    next_endpoint[target] = (endpoint + 1) % len(endpoints[target])
+                else:
+                    endpoint = 0
+                child = _Request(target, endpoint, at + self.hop_overhead, req if sync else None)
+                submit(child, at + self.hop_overhead)
+        
+        # Seed one arrival stream per endpoint
+        for service_index, eps in enumerate(endpoints):
+            for endpoint_index in range(len(eps)):
+                seq += 1
+                push(heap, (rng.expovariate(rate), seq, ARRIVAL, (service_index, endpoint_index)))
+        
+        wall_start = time.perf_counter()
+        while heap:
+            now, _, kind, payload = pop(heap)
+            if now > end:
+                break
+            events += 1
+            
+            if kind == ARRIVAL:
+                service_index, endpoint_index = payload
+                seq += 1
+                push(heap, (now + rng.expovariate(rate), seq, ARRIVAL, payload))
+                submit(_Request(service_index, endpoint_index, now, None), now)
+            
+            elif kind == SERVICE_DONE:
+                service = payload.service
+                queue = queues[service]
+                head = queue_heads[service]
+                # Skip queued requests that already timed out
+                while head < len(queue) and queue[head].done:
+                    head += 1
+                if head < len(queue):
+                    start(queue[head], now)
+                    head += 1
+                else:
+                    busy[service] -= 1
+                if head > 1024 and head * 2 > len(queue):
+                    del queue[:head]
+                    head = 0
+                queue_heads[service] = head
+                if not payload.done:
+                    call_downstream(payload, now)
+            
+            elif kind == COMPLETE:
+                status = "ok"
+                if payload.failed:
+                    fallback = payload.endpoint >= 0 and payload.service < n_services and \
+                        fallbacks[payload.service][payload.endpoint]
+                    status = "ok" if fallback else "error"
+                complete(payload, now, status)
+            
+            elif kind == TIMEOUT:
+                complete(payload, now, "timeout")
+        
+        wall_time = time.perf_counter() - wall_start
+        
+        results = {}
+        for st in stats:
+            st.throughput = st.completed / end
+            st.utilization = st.busy_time / (st.replicas * end)
+            results[st.name] = st
+        return SimulationResult(load_factor, results, events, wall_time)
+    
+    def sweep(self, load_factors: List[float]) -> List[SimulationResult]:
+        """Run the simulation at increasing load factors"""
+        return [self.run(factor) for factor in load_factors]
+    
+    def saturation_points(self, results: List[SimulationResult]) -> Dict[str, Optional[float]]:
+        """First load factor at which each service's utilization crosses the threshold"""
+        points: Dict[str, Optional[float]] = {service.name: None for service in self.services}
+        for result in results:
+            for name, st in result.services.items():
+                if points[name] is None and st.utilization >= self.saturation_threshold:
+                    points[name] = result.load_factor
+        return points
+    
+    def format_report(self, results: List[SimulationResult]) -> str:
+        """Format sweep results as a table per load factor"""
+        lines = []
+        for result in results:
+            rate = result.events / result.wall_time if result.wall_time else 0.0
+            lines.append(
+                f"Load {result.load_factor:g}x  "
+                f"({result.events:,} events in {result.wall_time:.2f}s, {rate * 60:,.0f} events/min)"
+            )
+            lines.append(
+                f"  {'Service':<24}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+                f"{'util':>8}{'hits':>8}{'rejected':>10}{'timeouts':>10}{'errors':>8}"
+            )
+            for st in result.services.values():
+                p50 = st.percentile(50)
+                p99 = st.percentile(99)
+                lines.append(
+                    f"  {st.name:<24}{st.throughput:>10.1f}"
+                    f"{self._format_ms(p50):>10}{self._format_ms(p99):>10}"
+                    f"{st.utilization:>8.0%}{st.cache_hits:>8}{st.rejected:>10}"
+                    f"{st.timeouts:>10}{st.errors:>8}"
+                )
+            lines.append("")
+        
+        lines.append("Saturation points:")
+        for name, factor in self.saturation_points(results).items():
+            if factor is None:
+                lines.append(f"  {name}: not saturated up to {results[-1].load_factor:g}x")
+            else:
+                lines.append(f"  {name}: saturates at {factor:g}x")
+        return "\n".join(lines)
+    
+    def _format_ms(self, seconds: Optional[float]) -> str:
+        if seconds is None:
+            return "-"
+        return f"{seconds * 1000:.1f}"
+
+
+def main():
+    from lexer import Lexer
+    from parser import Parser
+    
+    code = """
+    service OrderService {
+        endpoint /orders {
+            method: POST
+            timeout: 2s
+        }
+        connect to PaymentService via grpc
+        replicas: 2
+    }
+
+    service PaymentService {
+        endpoint /payments {
+            method: POST
+            rateLimit: 600/m
+        }
+        replicas: 1
+    }
+    """
+    
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    parser = Parser(tokens)
+    ast = parser.parse()
+    
+    simulator = Simulator(ast, duration=30.0)
+    print(simulator.format_report(simulator.sweep([1, 2, 3])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Stand-in Generator - Emits one asyncio process serving stand-ins for a service's dependencies
+"""
+import pprint
+from ast_nodes import Program, Service
+from ir import program_model, service_model
+from openapi_generator import OpenAPIGenerator
+from templates import TemplateLoader, default_loader
+from typing import Any, Dict, List, Optional
+
+
+# Values for string formats, so examples look like what the real service sends
+FORMAT_EXAMPLES = {
+    "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+    "email": "user@example.com",
+    "date-time": "2024-01-01T00:00:00Z",
+    "date": "2024-01-01",
+}
+
+# Items in an example array response
+ARRAY_EXAMPLE_ITEMS = 3
+
+# $refs followed inside one example
+MAX_REF_DEPTH = 4
+
+
+class StandInGenerator:
+    """Generates stand-in servers for the services a service calls over HTTP"""
+    
+    def __init__(self, loader: Optional[TemplateLoader] = None):
+        self.loader = loader or default_loader()
+        self.openapi = OpenAPIGenerator()
+    
+    def generate_standins(self, service: Service, program: Program) -> Optional[str]:
+        """Generate the stand-in script, if the service calls any service over HTTP"""
+        standins = self._standin_data(service, program)
+        if not standins:
+            return None
+        return self.loader.render("standins.py", service=service_model(service), script=self.script_name(service),
+                                  standins=pprint.pformat(standins, sort_dicts=False))
+    
+    def script_name(self, service: Service) -> str:
+        return f"{service_model(service).slug}_standins.py"
+    
+    def _standin_data(self, service: Service, program: Program) -> List[Dict[str, Any]]:
+        by_name = program_model(program).by_name
+        standins = {}
+        for conn in service_model(service).http_targets:
+            target = by_name.get(conn.target_service)
+            standins[conn.target_service] = {
+                "name": conn.target_service,
+                "env": f"{conn.target_service.upper()}_URL",
+                # A service outside the spec answers every request with {}
+                "routes": self._routes(target.service) if target is not None else [],
+            }
+        return list(standins.values())
+    
+    def _routes(self, service: Service) -> List[Dict[str, Any]]:
+        """Each endpoint with the example body of its 200 response"""
+        spec = self.openapi.build_spec(service)
+        schemas = spec["components"]["schemas"]
+        routes = []
+        for endpoint in service_model(service).endpoints:
+            operation = spec["paths"][endpoint.path][endpoint.method.lower()]
+            content = operation["responses"]["200"].get("content", {}).get("application/json", {})
+            routes.append({
+                "method": endpoint.method,
+                "path": endpoint.path,
+                "body": example(content.get("schema", {}), schemas),
+            })
+        return routes
+
+
+def example(schema: Dict[str, Any], schemas: Dict[str, Any], depth: int = 0) -> Any:
+    """An example value for an OpenAPI schema, resolving $refs into schemas"""
+    if depth > MAX_REF_DEPTH:
+        # A self-referencing schema
+        return None
+    ref = schema.get("$ref")
+    if ref is not None:
+        return example(schemas.get(ref.rsplit("/", 1)[-1], {}), schemas, depth + 1)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if kind == "array":
+        return [example(schema.get("items", {}), schemas, depth) for _ in range(ARRAY_EXAMPLE_ITEMS)]
+    if kind == "object":
+        return {name: None if prop.get("nullable") else example(prop, schemas, depth)
+                for name, prop in schema.get("properties", {}).items()}
+    if kind == "string":
+        return FORMAT_EXAMPLES.get(schema.get("format"), "example")
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return True
+    return None
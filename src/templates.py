@@ -0,0 +1,273 @@
+"""
+CloudScript Template Engine - Templates compiled once into Python functions
+"""
+import ast
+import builtins
+import hashlib
+import marshal
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+BUILTIN_TEMPLATE_DIR = Path(__file__).parent / "template_files"
+
+# Bump when the generated code changes so stale disk caches are ignored
+ENGINE_VERSION = 2
+
+TOKEN_RE = re.compile(r"({{.*?}}|{%.*?%}|{#.*?#})", re.S)
+
+
+class TemplateError(Exception):
+    """Raised when a template cannot be compiled"""
+    pass
+
+
+class _ContextNames(ast.NodeTransformer):
+    """Rewrites free variable names in an expression to context lookups.
+
+    A name that is also a builtin (``id``, ``type``, ``len``) is looked up in
+    the context first and falls back to the builtin.
+    """
+    
+    def __init__(self, local_names):
+        self.local_names = local_names
+    
+    def visit_Name(self, node):
+        if node.id in self.local_names:
+            return node
+        lookup = ast.Subscript(
+            value=ast.Name(id='__ctx', ctx=ast.Load()),
+            slice=ast.Constant(value=node.id),
+            ctx=node.ctx
+        )
+        if hasattr(builtins, node.id):
+            lookup = ast.IfExp(
+                test=ast.Compare(left=ast.Constant(value=node.id), ops=[ast.In()],
+                                 comparators=[ast.Name(id='__ctx', ctx=ast.Load())]),
+                body=lookup,
+                orelse=node
+            )
+        return ast.copy_location(lookup, node)
+
+
+class TemplateCompiler:
+    """Compiles template source into Python source for a render function.
+
+    Supported syntax:
+      {{ expr }}                   insert str(expr)
+      {% for x in expr %} {% endfor %}
+      {% if expr %} {% elif expr %} {% else %} {% endif %}
+      {# comment #}
+
+    As in Jinja's trim_blocks/lstrip_blocks mode, a block tag alone on a line
+    does not leave an empty line in the output.
+    """
+    
+    def compile_source(self, source: str, name: str) -> str:
+        lines = ["def render(__ctx):", "    __out = []", "    __w = __out.append"]
+        indent = 1
+        stack: List[str] = []
+        scopes: List[set] = [set()]
+        
+        for kind, text, lineno in self._tokenize(source):
+            pad = "    " * indent
+            if kind == "text":
+                if text:
+                    lines.append(f"{pad}__w({text!r})")
+            elif kind == "expr":
+                lines.append(f"{pad}__w(str({self._expr(text, scopes, name, lineno)}))")
+            else:
+                keyword, _, rest = text.partition(" ")
+                rest = rest.strip()
+                if keyword == "for":
+                    target, sep, iterable = rest.partition(" in ")
+                    if not sep:
+                        raise TemplateError(f"{name}:{lineno}: expected 'for x in items'")
+                    targets = {t.strip() for t in target.split(",")}
+                    iterable = self._expr(iterable, scopes, name, lineno)
+                    lines.append(f"{pad}for {target} in {iterable}:")
+                    scopes.append(scopes[-1] | targets)
+                    stack.append("for")
+                    indent += 1
+                elif keyword == "if":
+                    lines.append(f"{pad}if {self._expr(rest, scopes, name, lineno)}:")
+                    stack.append("if")
+                    indent += 1
+                elif keyword == "elif" and stack and stack[-1] == "if":
+                    lines.append(f"{'    ' * (indent - 1)}elif {self._expr(rest, scopes, name, lineno)}:")
+                elif keyword == "else" and stack and stack[-1] == "if":
+                    lines.append(f"{'    ' * (indent - 1)}else:")
+                elif keyword in ("endfor", "endif") and stack and stack[-1] == keyword[3:]:
+                    if keyword == "endfor":
+                        scopes.pop()
+                    stack.pop()
+                    indent -= 1
+                else:
+                    raise TemplateError(f"{name}:{lineno}: unexpected tag '{{% {text} %}}'")
+                if keyword in ("for", "if", "elif", "else"):
+                    # Keep empty blocks valid Python
+                    lines.append(f"{'    ' * indent}pass")
+        
+        if stack:
+            raise TemplateError(f"{name}: unclosed '{{% {stack[-1]} %}}'")
+        
+        lines.append("    return ''.join(__out)")
+        return "\n".join(lines) + "\n"
+    
+    def _expr(self, text: str, scopes: List[set], name: str, lineno: int) -> str:
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise TemplateError(f"{name}:{lineno}: invalid expression '{text.strip()}': {e.msg}")
+        # Names bound inside the expression itself (comprehensions, lambdas)
+        bound = {node.id for node in ast.walk(tree)
+                 if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+        bound |= {node.arg for node in ast.walk(tree) if isinstance(node, ast.arg)}
+        tree = _ContextNames(scopes[-1] | bound).visit(tree)
+        return ast.unparse(ast.fix_missing_locations(tree))
+    
+    def _tokenize(self, source: str):
+        """Yield (kind, text, line) tokens, applying block whitespace trimming"""
+        parts = TOKEN_RE.split(source)
+        lineno = 1
+        trim_next = False
+        
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                text = part
+                at_line_start = i == 0
+                if trim_next and text.startswith("\n"):
+                    text = text[1:]
+                    at_line_start = True
+                trim_next = False
+                # lstrip_blocks: drop indentation before a block tag that starts a line
+                if i + 1 < len(parts) and parts[i + 1][:2] in ("{%", "{#"):
+                    head, newline, tail = text.rpartition("\n")
+                    if not tail.strip() and (newline or at_line_start):
+                        text = head + newline
+                yield "text", text, lineno
+            elif part.startswith("{{"):
+                yield "expr", part[2:-2], lineno
+            elif part.startswith("{%"):
+                yield "block", part[2:-2].strip(), lineno
+                trim_next = True
+            else:
+                trim_next = True
+            lineno += part.count("\n")
+
+
+class TemplateLoader:
+    """Finds, compiles and caches templates.
+
+    Templates are looked up in ``search_path`` in order, so a directory of
+    organization-specific templates can override individual built-in ones.
+    Each template is compiled once per loader; with ``cache_dir`` set the
+    compiled bytecode is also cached on disk, keyed by the template source.
+    """
+    
+    def __init__(self, search_path: Optional[List[Path]] = None, cache_dir: Optional[Path] = None):
+        self.search_path = [Path(p) for p in (search_path or [])] + [BUILTIN_TEMPLATE_DIR]
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.compiler = TemplateCompiler()
+        self._templates: Dict[str, Callable[[Dict[str, Any]], str]] = {}
+    
+    def get(self, name: str) -> Callable[[Dict[str, Any]], str]:
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self._load(name)
+        return template
+    
+    def render(self, name: str, **context) -> str:
+        return self.get(name)(context)
+    
+    def precompile(self):
+        """Compile every available template up front"""
+        for directory in self.search_path:
+            if directory.is_dir():
+                for path in directory.glob("*.tmpl"):
+                    self.get(path.name[:-len(".tmpl")])
+    
+    def _find(self, name: str) -> Path:
+        for directory in self.search_path:
+            path = directory / f"{name}.tmpl"
+            if path.is_file():
+                return path
+        raise TemplateError(f"Template not found: {name}")
+    
+    def _load(self, name: str) -> Callable[[Dict[str, Any]], str]:
+        path = self._find(name)
+        source = path.read_text(encoding="utf-8")
+        code = None
+        
+        cache_path = None
+        if self.cache_dir is not None:
+            key = hashlib.sha256(
+                f"{ENGINE_VERSION}:{sys.version_info[:2]}:{name}:".encode() + source.encode()
+            ).hexdigest()
+            cache_path = self.cache_dir / f"{key}.pyc"
+            if cache_path.is_file():
+                try:
+                    code = marshal.loads(cache_path.read_bytes())
+                except (EOFError, ValueError, TypeError):
+                    code = None
+        
+        if code is None:
+            python_source = self.compiler.compile_source(source, name)
+            code = compile(python_source, str(path), "exec")
+            if cache_path is not None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(marshal.dumps(code))
+                os.replace(tmp_path, cache_path)
+        
+        namespace: Dict[str, Any] = {}
+        exec(code, namespace)
+        return namespace["render"]
+
+
+_default_loader: Optional[TemplateLoader] = None
+
+
+def default_loader() -> TemplateLoader:
+    """Loader shared by generators, honoring $CLOUDSCRIPT_TEMPLATES overrides"""
+    global _default_loader
+    if _default_loader is None:
+        overrides = os.environ.get("CLOUDSCRIPT_TEMPLATES")
+        search_path = [Path(p) for p in overrides.split(os.pathsep) if p] if overrides else []
+        cache_dir = os.environ.get("CLOUDSCRIPT_TEMPLATE_CACHE")
+        _default_loader = TemplateLoader(search_path, cache_dir)
+    return _default_loader
+
+
+def main():
+    # Benchmark: render app.py for services of increasing size
+    import time
+    from ast_nodes import Service, Endpoint
+    from ir import build_service_model
+    
+    loader = TemplateLoader()
+    start = time.perf_counter()
+    loader.precompile()
+    print(f"Compiled built-in templates in {(time.perf_counter() - start) * 1000:.2f}ms")
+    
+    template = loader.get("app.py")
+    for count in (1, 100, 10_000):
+        service = Service(name="BenchService", endpoints=[
+            Endpoint(path=f"/items{i}/:id", method="GET", response_type="Item")
+            for i in range(count)
+        ])
+        model = build_service_model(service)
+        runs = max(1, 10_000 // count)
+        start = time.perf_counter()
+        for _ in range(runs):
+            output = template({"service": model})
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{count:>6} endpoints: {elapsed * 1000:8.3f}ms per render, "
+              f"{elapsed / count * 1_000_000:6.2f}us per endpoint, {len(output):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 CloudScript Unit Tests
 """
+import os
 import unittest
 import sys
 sys.path.insert(0, '../src')
@@ -56,6 +57,17 @@ class TestLexer(unittest.TestCase):
         
         path_token = [t for t in tokens if t.type == TokenType.PATH][0]
         self.assertEqual(path_token.value, "/users/:id")
+    
+    def test_token_spans(self):
+        """Test tokens record where they start and end"""
+        tokens = Lexer('service A {\n  endpoint /users @ "x"').tokenize()
+        
+        path = tokens[4]
+        self.assertEqual((path.line, path.column, path.end_column), (2, 12, 18))
+        self.assertEqual(tokens[5].type, TokenType.ERROR)
+        self.assertEqual(tokens[5].column, 19)
+        self.assertEqual(tokens[6].type, TokenType.STRING)
+        self.assertEqual(tokens[6].column, 21)
 
 
 class TestParser(unittest.TestCase):
@@ -102,6 +114,24 @@ class TestParser(unittest.TestCase):
         self.assertEqual(endpoint.response_type, "User[]")
         self.assertEqual(endpoint.cache, "5m")
     
+    def test_rate_limit_parsing(self):
+        """Test parsing rate limits with a time unit"""
+        code = """
+        service API {
+            endpoint /users {
+                method: GET
+                rateLimit: 100/m
+            }
+        }
+        """
+        lexer = Lexer(code)
+        tokens = lexer.tokenize()
+        parser = Parser(tokens)
+        ast = parser.parse()
+        
+        endpoint = ast.services[0].endpoints[0]
+        self.assertEqual(endpoint.rate_limit, "100/m")
+    
     def test_connections(self):
         """Test parsing service connections"""
         code = """
@@ -159,6 +189,775 @@ class TestParser(unittest.TestCase):
         self.assertEqual(len(ast.services), 2)
         self.assertEqual(ast.services[0].name, "ServiceA")
         self.assertEqual(ast.services[1].name, "ServiceB")
+    
+    def test_event_blocks(self):
+        """Test event blocks parse into normalized actions"""
+        code = """
+        service Worker {
+            on start {
+                warmPools()
+                preload("numpy", "say \\"hi\\"")
+            }
+            on shutdown { drain(30s) flush(kafka) }
+            deploy on: docker
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        self.assertEqual([e.event_type for e in service.events], ["start", "shutdown"])
+        self.assertEqual(service.events[0].actions, ['warmPools()', 'preload("numpy", "say \\"hi\\"")'])
+        self.assertEqual(service.events[1].actions, ["drain(30s)", "flush(kafka)"])
+        self.assertEqual(service.configs["platform"], "docker")
+        
+        from ir import service_model
+        start = service_model(service).events["start"]
+        self.assertEqual(start[1].args, ["numpy", 'say "hi"'])
+        self.assertEqual(service_model(service).events["shutdown"][0].call, "lifecycle.drain(30.0)")
+        
+        parser = Parser(Lexer("service A { on boot { x() } on start { y( } on error { } port: 1 }").tokenize(),
+                        raise_on_error=False)
+        service = parser.parse().services[0]
+        self.assertEqual([d.message for d in parser.diagnostics], [
+            "Expected start, shutdown, error or scale, got 'boot'",
+            "Expected a string, number, duration or name, got '}'",
+            "Expected an action in 'on error'",
+        ])
+        self.assertEqual([e.event_type for e in service.events], ["start", "error"])
+        self.assertEqual(service.configs["port"], 1)
+    
+    def test_compress_directive(self):
+        """Test the per-endpoint compress directive"""
+        code = """
+        service Api {
+            endpoint /ping { method: GET compress: none }
+            endpoint /feed { method: GET compress: br }
+            endpoint /users { method: GET }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        self.assertEqual([e.compress for e in service.endpoints], ["none", "br", None])
+        
+        from ir import service_model
+        self.assertEqual([e.compress for e in service_model(service).endpoints], ["none", "br", "auto"])
+        self.assertEqual(service_model(service).compress_encodings, ["br", "gzip", "zstd"])
+        
+        parser = Parser(Lexer("service A { endpoint /x { compress: lz4 method: GET } }").tokenize(),
+                        raise_on_error=False)
+        endpoint = parser.parse().services[0].endpoints[0]
+        self.assertEqual([d.message for d in parser.diagnostics],
+                         ["Expected auto, gzip, br, zstd or none, got 'lz4'"])
+        self.assertEqual(endpoint.method, "GET")
+    
+    def test_page_size_directive(self):
+        """Test pageSize is parsed and arrays of objects are paginated"""
+        code = """
+        service Api {
+            endpoint /posts { method: GET response: Post[] pageSize: 20 }
+            endpoint /tags { method: GET response: string[] }
+            endpoint /posts { method: POST response: Post[] }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        self.assertEqual(service.endpoints[0].page_size, "20")
+        
+        from ir import service_model
+        model = service_model(service)
+        self.assertEqual([(e.paginated, e.page_size) for e in model.endpoints],
+                         [(True, 20), (False, 50), (False, 50)])
+        self.assertEqual(model.endpoints[0].collection, "posts")
+        
+        parser = Parser(Lexer("service A { endpoint /x { pageSize: 0 } endpoint /y { pageSize: 2.5 } }").tokenize(),
+                        raise_on_error=False)
+        parser.parse()
+        self.assertEqual([d.message for d in parser.diagnostics], [
+            "Expected a positive whole number of items, got '0'",
+            "Expected a positive whole number of items, got '2.5'",
+        ])
+
+
+class TestErrorRecovery(unittest.TestCase):
+    """Test that one parse reports every syntax error"""
+    
+    CODE = """
+    service UserService {
+        endpoint /users {
+            method: FETCH
+            response: User[]
+            cache: soon
+        }
+        endpoint /users/:id { method: GET }
+        connect to AuthService via smtp
+        port: "8080"
+        replicas: 2
+    }
+    garbage
+    service Broken {
+        endpoint /x {
+            method: GET
+    service AuthService {
+        endpoint /auth { method: POST }
+    }
+    """
+    
+    def test_all_errors_reported(self):
+        """Test diagnostics are collected with positions instead of stopping at the first"""
+        parser = Parser(Lexer(self.CODE).tokenize(), raise_on_error=False)
+        parser.parse()
+        
+        located = [(d.line, d.column, d.message) for d in parser.diagnostics]
+        self.assertEqual(located, [
+            (4, 21, "Expected an HTTP method, got 'FETCH'"),
+            (6, 20, "Expected a duration (e.g. 5m), got 'soon'"),
+            (9, 36, "Expected http, grpc, rabbitmq or kafka, got 'smtp'"),
+            (10, 15, "Expected a number, got \"8080\""),
+            (13, 5, "Expected 'service' or 'import', got 'garbage'"),
+            (17, 5, "Expected '}' to close endpoint /x, got 'service'"),
+            (17, 5, "Expected '}' to close service 'Broken', got 'service'"),
+        ])
+    
+    def test_partial_ast(self):
+        """Test the recovered program keeps everything that parsed"""
+        parser = Parser(Lexer(self.CODE).tokenize(), raise_on_error=False)
+        ast = parser.parse()
+        
+        self.assertEqual([s.name for s in ast.services], ["UserService", "Broken", "AuthService"])
+        users = ast.services[0]
+        self.assertEqual([e.path for e in users.endpoints], ["/users", "/users/:id"])
+        self.assertEqual(users.endpoints[0].response_type, "User[]")
+        self.assertEqual(users.connections[0].protocol, "http")
+        self.assertEqual(users.configs["replicas"], 2)
+        self.assertEqual(ast.services[2].endpoints[0].method, "POST")
+    
+    def test_parse_error(self):
+        """Test parse raises one ParseError carrying every diagnostic"""
+        from diagnostics import ParseError
+        
+        with self.assertRaises(ParseError) as context:
+            Parser(Lexer(self.CODE).tokenize()).parse()
+        self.assertEqual(len(context.exception.errors), 7)
+        self.assertIn("spec.cs:4:21: error:", context.exception.format("spec.cs"))
+        self.assertEqual(len(context.exception.program.services), 3)
+    
+    def test_unterminated_blocks(self):
+        """Test truncated input terminates with errors instead of hanging"""
+        for code in ("service A {", "service A { endpoint /x {", "service A { database pg {",
+                     "service", "endpoint /x }", 'service A { database pg { host: "x'):
+            parser = Parser(Lexer(code).tokenize(), raise_on_error=False)
+            parser.parse()
+            self.assertTrue(parser.diagnostics, code)
+    
+    def test_recovery_never_skips_service(self):
+        """Test a misplaced 'service' still starts the next service"""
+        for code, names in (("service\nservice A { }", ["A"]),
+                            ("service A { database pg { host: service B { } }", ["A", "B"])):
+            ast = Parser(Lexer(code).tokenize(), raise_on_error=False).parse()
+            self.assertEqual([s.name for s in ast.services], names, code)
+
+
+class TestIntermediateRepresentation(unittest.TestCase):
+    """Test the precomputed program model"""
+    
+    def test_program_model(self):
+        """Test derived values are computed once per program"""
+        from ir import build_program_model, service_model
+        
+        code = """
+        service UserService {
+            endpoint /users/:id/posts {
+                method: GET
+                response: Post[]
+                cache: 5m
+                timeout: 3s
+                rateLimit: 120/m
+            }
+            connect to AuthService via grpc
+            port: 8001
+        }
+        service AuthService {
+            endpoint /auth { method: POST response: Token }
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        model = build_program_model(ast)
+        
+        users = model.by_name["UserService"]
+        self.assertIs(service_model(ast.services[0]), users)
+        self.assertEqual(users.slug, "userservice")
+        self.assertEqual(users.port, 8001)
+        self.assertIsNone(users.replicas)
+        self.assertEqual(users.custom_types, ["Post"])
+        
+        endpoint = users.endpoint(ast.services[0].endpoints[0])
+        self.assertEqual(endpoint.segments, ["users", ":id", "posts"])
+        self.assertEqual(endpoint.path_params, ["id"])
+        self.assertEqual(endpoint.route_key, "GET /users/:id/posts")
+        self.assertEqual(endpoint.operation_id, "getUsersIdPosts")
+        self.assertEqual(endpoint.function_name, "users_id_posts")
+        self.assertTrue(endpoint.is_array)
+        self.assertEqual(endpoint.cache_seconds, 300)
+        self.assertEqual(endpoint.timeout_seconds, 3)
+        self.assertEqual(endpoint.rate_limit, 2)
+        
+        self.assertEqual(model.by_name["AuthService"].inbound, [("UserService", "grpc")])
+
+
+class TestModules(unittest.TestCase):
+    """Test multi-file projects"""
+    
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "shared").mkdir()
+        (self.root / "shared" / "auth.cs").write_text("""
+        service AuthService {
+            endpoint /auth { method: POST response: Token }
+        }
+        """)
+        (self.root / "orders.cs").write_text("""
+        import "users.cs"
+        service OrderService {
+            endpoint /orders { method: GET }
+            connect to UserService via http
+            connect to EmailService via kafka
+        }
+        """)
+        (self.root / "users.cs").write_text("""
+        import "shared/auth.cs"
+        import "orders.cs"
+        service UserService {
+            endpoint /users { method: GET }
+            connect to AuthService via grpc
+        }
+        """)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_import_parsing(self):
+        """Test import statements are collected on the program"""
+        ast = Parser(Lexer('import "a.cs"\nimport "lib/b.cs"').tokenize()).parse()
+        self.assertEqual(ast.imports, ["a.cs", "lib/b.cs"])
+    
+    def test_imports_resolve_across_files(self):
+        """Test imports are followed transitively and connections resolved after loading"""
+        from modules import ModuleLoader
+        from ir import build_program_model
+        
+        project = ModuleLoader(workers=1).load(str(self.root / "orders.cs"))
+        self.assertEqual([s.name for s in project.program.services],
+                         ["OrderService", "UserService", "AuthService"])
+        self.assertEqual(project.module_of["AuthService"].name, "auth.cs")
+        self.assertEqual(project.unresolved, ["EmailService"])
+        
+        model = build_program_model(project.program)
+        self.assertEqual(model.by_name["AuthService"].inbound, [("UserService", "grpc")])
+    
+    def test_project_directory_and_cache(self):
+        """Test directory mode parses in parallel and reuses cached modules"""
+        from modules import ModuleLoader
+        
+        cache = self.root / ".cache"
+        project = ModuleLoader(cache, workers=2).load(str(self.root))
+        self.assertEqual(len(project.modules), 3)
+        self.assertEqual(project.cache_hits, 0)
+        
+        # Only the edited file is parsed again
+        (self.root / "orders.cs").write_text("service OrderService { endpoint /v2/orders { method: GET } }")
+        project = ModuleLoader(cache, workers=2).load(str(self.root))
+        self.assertEqual(project.cache_hits, 2)
+        orders = [s for s in project.program.services if s.name == "OrderService"][0]
+        self.assertEqual(orders.endpoints[0].path, "/v2/orders")
+    
+    def test_module_errors(self):
+        """Test missing imports and duplicate services are reported"""
+        from modules import ModuleLoader, ModuleError
+        
+        (self.root / "broken.cs").write_text('import "missing.cs"')
+        with self.assertRaisesRegex(ModuleError, "missing.cs"):
+            ModuleLoader(workers=1).load(str(self.root / "broken.cs"))
+        
+        (self.root / "broken.cs").write_text("service UserService { }")
+        with self.assertRaisesRegex(ModuleError, "defined in both"):
+            ModuleLoader(workers=1).load(str(self.root))
+
+
+class TestASTSerializer(unittest.TestCase):
+    """Test the binary AST format"""
+    
+    CODE = """
+    import "shared.cs"
+    service UserService {
+        endpoint /users/:id {
+            method: GET
+            response: User
+            cache: 5m
+            rateLimit: 100/m
+            auth: required
+        }
+        connect to AuthService via grpc
+        port: 8001
+        replicas: 3
+        database postgres {
+            host: "localhost"
+            port: 5432
+        }
+    }
+    service AuthService {
+        endpoint /auth { method: POST }
+    }
+    """
+    
+    def test_round_trip(self):
+        """Test a program survives serialization unchanged"""
+        from ast_serializer import dumps_ast, loads_ast
+        from ast_nodes import Event
+        
+        ast = Parser(Lexer(self.CODE).tokenize()).parse()
+        ast.services[1].events.append(Event("start", ["warm_cache", "connect_db"]))
+        ast.services[1].configs["weights"] = [0.5, True, None]
+        
+        loaded = loads_ast(dumps_ast(ast))
+        self.assertEqual(loaded, ast)
+        self.assertEqual(loaded.services[0].configs["database"]["settings"]["host"], "localhost")
+    
+    def test_lazy_services(self):
+        """Test a single service can be decoded without the rest"""
+        import tempfile
+        from pathlib import Path
+        from ast_serializer import save_ast, load_ast
+        
+        ast = Parser(Lexer(self.CODE).tokenize()).parse()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "spec.csc"
+            save_ast(ast, path)
+            spec = load_ast(path, lazy=True)
+        
+        self.assertEqual(spec.service_names, ["UserService", "AuthService"])
+        self.assertEqual(spec.imports, ["shared.cs"])
+        self.assertEqual(spec.service("AuthService"), ast.services[1])
+        self.assertEqual(list(spec._services), [1])
+    
+    def test_format_errors(self):
+        """Test foreign, newer and truncated data is rejected"""
+        import struct
+        from ast_serializer import HEADER, dumps_ast, loads_ast, ASTFormatError
+        
+        data = dumps_ast(Parser(Lexer(self.CODE).tokenize()).parse())
+        with self.assertRaisesRegex(ASTFormatError, "Not a CloudScript"):
+            loads_ast(b"PK\x03\x04" + data[4:])
+        with self.assertRaisesRegex(ASTFormatError, "version"):
+            loads_ast(data[:4] + struct.pack("<H", 999) + data[6:])
+        with self.assertRaisesRegex(ASTFormatError, "version 0"):
+            loads_ast(data[:4] + struct.pack("<H", 0) + data[6:])
+        # Cut anywhere, or with any word out of range, the data is reported corrupt rather than crashing
+        for length in range(len(data)):
+            with self.assertRaises(ASTFormatError):
+                loads_ast(data[:length])
+        for offset in range(HEADER.size, len(data) - 3, 4):
+            for word in (0, 0xFFFFFFFF):
+                try:
+                    loads_ast(data[:offset] + struct.pack("<I", word) + data[offset + 4:])
+                except ASTFormatError:
+                    pass
+    
+    def test_little_endian_on_any_host(self):
+        """Test words are written little-endian whatever the host byte order"""
+        import struct
+        from unittest import mock
+        import ast_serializer
+        from ast_serializer import HEADER, dumps_ast, loads_ast
+        
+        ast = Parser(Lexer("service A { }").tokenize()).parse()
+        data = dumps_ast(ast)
+        # The first word after the header is the length of the string "A"
+        self.assertEqual(data[HEADER.size:HEADER.size + 4], struct.pack("<I", 1))
+        
+        # Writing and reading both honour the swap flag, so a swapped file still round-trips
+        with mock.patch.object(ast_serializer, "SWAP_BYTES", not ast_serializer.SWAP_BYTES):
+            swapped = dumps_ast(ast)
+            self.assertEqual(loads_ast(swapped), ast)
+        self.assertEqual(swapped[HEADER.size:HEADER.size + 4], struct.pack(">I", 1))
+    
+    def test_reads_version_1(self):
+        """Test files written before endpoints had a compress field still load"""
+        from unittest import mock
+        import ast_serializer
+        
+        ast = Parser(Lexer(self.CODE).tokenize()).parse()
+        with mock.patch.multiple(ast_serializer, FORMAT_VERSION=1,
+                                 ENDPOINT_FIELDS=ast_serializer.ENDPOINT_FIELDS[:8]):
+            data = ast_serializer.dumps_ast(ast)
+        self.assertEqual(ast_serializer.loads_ast(data), ast)
+        
+        ast.services[0].endpoints[0].compress = "gzip"
+        self.assertEqual(ast_serializer.loads_ast(ast_serializer.dumps_ast(ast)), ast)
+    
+    def test_load_faster_than_parse(self):
+        """Test loading a large spec is at least 10x faster than parsing it"""
+        import gc
+        import time
+        from ast_serializer import dumps_ast, loads_ast
+        
+        source = "\n".join(
+            f"service S{i} {{ endpoint /a{i}/:id {{ method: GET response: A timeout: 3s }} "
+            f"endpoint /b{i} {{ method: POST cache: 1m }} connect to S{i + 1} port: {8000 + i} }}"
+            for i in range(300)
+        )
+        # Keep collections of earlier tests' garbage out of the timings
+        gc.collect()
+        start = time.perf_counter()
+        ast = Parser(Lexer(source).tokenize()).parse()
+        parse_time = time.perf_counter() - start
+        
+        data = dumps_ast(ast)
+        import gc; print("GC", gc.get_count(), len(gc.get_objects()))
+        start = time.perf_counter()
+        loaded = loads_ast(data)
+        load_time = time.perf_counter() - start
+        
+        self.assertEqual(loaded, ast)
+        self.assertLess(load_time * 10, parse_time)
+
+
+class TestQuery(unittest.TestCase):
+    """Test the route trie and inverted indexes"""
+    
+    def setUp(self):
+        from query import ProgramIndex
+        code = """
+        service UserService {
+            endpoint /users/:id { method: GET response: User cache: 5m }
+            endpoint /users/me { method: GET response: User auth: required }
+            endpoint /users { method: POST response: User auth: required }
+            connect to AuditService via kafka
+            database postgres { host: "db" }
+        }
+        service AuditService {
+            endpoint /audit/:id/events { method: GET response: Event[] auth: required }
+        }
+        """
+        self.index = ProgramIndex(Parser(Lexer(code).tokenize()).parse())
+    
+    def routes(self, refs):
+        return [str(ref) for ref in refs]
+    
+    def test_route_lookup(self):
+        """Test concrete paths match literal routes before parameter routes"""
+        self.assertEqual(self.routes(self.index.route("/users/me", "get")),
+                         ["UserService GET /users/me", "UserService GET /users/:id"])
+        self.assertEqual(self.routes(self.index.route("/users/42")), ["UserService GET /users/:id"])
+        self.assertEqual(self.routes(self.index.route("/users/:id")), ["UserService GET /users/:id"])
+        self.assertEqual(self.routes(self.index.route("/audit/7/events")), ["AuditService GET /audit/:id/events"])
+        self.assertEqual(self.index.route("/users/42", "DELETE"), [])
+        self.assertEqual(self.index.route("/users/42/extra"), [])
+    
+    def test_filters(self):
+        """Test attribute filters intersect endpoint and service indexes"""
+        self.assertEqual(self.routes(self.index.endpoints(auth="required", cache="none")),
+                         ["UserService GET /users/me", "UserService POST /users", "AuditService GET /audit/:id/events"])
+        self.assertEqual(self.routes(self.index.endpoints(cache="any")), ["UserService GET /users/:id"])
+        self.assertEqual(self.routes(self.index.endpoints(protocol="kafka", method="post")),
+                         ["UserService POST /users"])
+        self.assertEqual([s.name for s in self.index.services(calledBy="UserService")], ["AuditService"])
+        self.assertEqual([s.name for s in self.index.services(database="postgres")], ["UserService"])
+        self.assertEqual([s.name for s in self.index.services(response="Event")], ["AuditService"])
+    
+    def test_unknown_key(self):
+        """Test unknown filter keys are rejected"""
+        from query import QueryError, parse_filters
+        with self.assertRaises(QueryError):
+            self.index.endpoints(colour="blue")
+        with self.assertRaises(QueryError):
+            parse_filters(["auth"])
+
+
+class TestTemplates(unittest.TestCase):
+    """Test the precompiled template engine"""
+    
+    def test_loops_and_conditionals(self):
+        """Test block tags compile to Python and leave no blank lines"""
+        from templates import TemplateCompiler
+        
+        source = (
+            "{# header #}\n"
+            "items:\n"
+            "{% for item in items %}\n"
+            "  {% if item == 'b' %}\n"
+            "  - {{ item.upper() }}!\n"
+            "  {% elif item %}\n"
+            "  - {{ [c for c in item][0] }}\n"
+            "  {% else %}\n"
+            "  - empty\n"
+            "  {% endif %}\n"
+            "{% endfor %}\n"
+            "total: {{ len(items) }}\n"
+        )
+        namespace = {}
+        exec(TemplateCompiler().compile_source(source, "test"), namespace)
+        output = namespace["render"]({"items": ["a", "b", ""]})
+        self.assertEqual(output, "items:\n  - a\n  - B!\n  - empty\ntotal: 3\n")
+        
+        # Context variables shadow builtins of the same name
+        namespace = {}
+        exec(TemplateCompiler().compile_source("{{ id }} {{ type(id).__name__ }} {{ len(filter) }}", "test"),
+             namespace)
+        self.assertEqual(namespace["render"]({"id": 7, "filter": "ab"}), "7 int 2")
+    
+    def test_template_errors(self):
+        """Test malformed templates are rejected with a location"""
+        from templates import TemplateCompiler, TemplateError
+        
+        with self.assertRaisesRegex(TemplateError, "unclosed"):
+            TemplateCompiler().compile_source("{% for x in y %}", "test")
+        with self.assertRaisesRegex(TemplateError, "test:2"):
+            TemplateCompiler().compile_source("ok\n{% endif %}", "test")
+    
+    def test_overrides_and_disk_cache(self):
+        """Test user templates override built-ins and compiled code is cached"""
+        import tempfile
+        from pathlib import Path
+        from templates import TemplateLoader
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service UserService {
+            endpoint /users { method: GET }
+            port: 8001
+            replicas: 2
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            overrides = Path(tmp) / "org"
+            overrides.mkdir()
+            (overrides / "Dockerfile.tmpl").write_text("FROM org/python\nEXPOSE {{ service.port }}\n")
+            cache = Path(tmp) / "cache"
+            
+            generator = DockerGenerator(TemplateLoader([overrides], cache))
+            self.assertEqual(generator.generate_dockerfile(ast.services[0]), "FROM org/python\nEXPOSE 8001\n")
+            # Templates without an override fall back to the built-ins
+            self.assertIn("@app.get(\"/users\")", generator.generate_app_py(ast.services[0]))
+            self.assertEqual(len(list(cache.glob("*.pyc"))), 2)
+            
+            # A fresh loader reuses the cached bytecode
+            loader = TemplateLoader([overrides], cache)
+            loader.compiler = None
+            self.assertIn("EXPOSE 8001", DockerGenerator(loader).generate_dockerfile(ast.services[0]))
+    
+    def test_compose_deploy_under_service(self):
+        """Test replicas are configured on the service, not its database"""
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service UserService {
+            endpoint /users { method: GET }
+            replicas: 3
+            database postgres { host: "localhost" }
+        }
+        """
+        compose = DockerGenerator().generate_docker_compose(Parser(Lexer(code).tokenize()).parse())
+        service_block = compose.split("userservice_db:")[0]
+        self.assertIn("replicas: 3", service_block)
+        self.assertIn("image: postgres:15-alpine", compose)
+    
+    def test_compose_load_balancer(self):
+        """Test replicated services sit behind nginx with edge caching and rate limits"""
+        import yaml
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service UserService {
+            endpoint /users/:id { method: GET cache: 2m }
+            endpoint /users/search { method: GET rateLimit: 100/m }
+            endpoint /users { method: GET rateLimit: 5/s }
+            endpoint /users { method: POST rateLimit: 1000/h }
+            replicas: 3
+            port: 8001
+        }
+        service OrderService {
+            endpoint /orders { method: POST }
+            connect to UserService via http
+            port: 8002
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        generator = DockerGenerator()
+        services = yaml.safe_load(generator.generate_docker_compose(ast))["services"]
+        self.assertNotIn("ports", services["userservice"])
+        self.assertEqual(services["userservice"]["expose"], ["8001"])
+        self.assertEqual(services["userservice_lb"]["ports"], ["8001:8001"])
+        self.assertEqual(services["userservice_lb"]["depends_on"], ["userservice"])
+        self.assertEqual(services["orderservice"]["ports"], ["8002:8002"])
+        self.assertIn("USERSERVICE_URL=http://userservice_lb:8001", services["orderservice"]["environment"])
+        self.assertIn("RATE_LIMIT_TRUSTED_PROXIES=1", services["userservice"]["environment"])
+        self.assertNotIn("RATE_LIMIT_TRUSTED_PROXIES=1", services["orderservice"]["environment"])
+        self.assertEqual((services["orderservice"]["cpus"], services["orderservice"]["mem_limit"]), ("0.2", "256m"))
+        self.assertNotIn("orderservice_lb", services)
+        self.assertIsNone(generator.generate_nginx_conf(ast.services[1]))
+        
+        conf = generator.generate_nginx_conf(ast.services[0])
+        self.assertIn("least_conn;", conf)
+        self.assertIn("keepalive 64;", conf)
+        self.assertIn('proxy_set_header Connection "";', conf)
+        self.assertIn("location ~ ^/users/[^/]+$ {\n        proxy_cache userservice_cache;\n        proxy_cache_valid 200 120s;", conf)
+        self.assertIn("zone=userservice_get_users_search:10m rate=100r/m;", conf)
+        self.assertIn("zone=userservice_get_users:10m rate=5r/s;", conf)
+        self.assertIn("zone=userservice_post_users:10m rate=17r/m;", conf)
+        users = conf[conf.index("location = /users {"):]
+        self.assertIn("limit_req zone=userservice_get_users burst=5 nodelay;\n"
+                      "        limit_req zone=userservice_post_users burst=1000 nodelay;", users)
+        self.assertNotIn("proxy_cache ", users[:users.index("}")])
+        # Neither callers with credentials nor NDJSON streams are cached at the edge
+        self.assertIn("~application/x-ndjson 1;", conf)
+        self.assertIn("proxy_no_cache $http_authorization $http_x_api_key $userservice_ndjson;", conf)
+        self.assertIn("proxy_cache_bypass $http_authorization $http_x_api_key $userservice_ndjson;", conf)
+        # Braces must balance for nginx to load the file
+        self.assertEqual(conf.count("{"), conf.count("}"))
+
+
+class TestLanguageServer(unittest.TestCase):
+    """Test the language server's incremental parse and editor features"""
+    
+    URI = "file:///project/shop.cs"
+    CODE = """service UserService {
+    endpoint /users {
+        method: GET
+        response: User[]
+        cache: 5m
+        rateLimit: 120/m
+    }
+    replicas: 2
+}
+
+service OrderService {
+    endpoint /orders {
+        method: POST
+        timeout: 3s
+    }
+    connect to UserService via http
+}
+"""
+    
+    def setUp(self):
+        from language_server import LanguageServer
+        self.server = LanguageServer()
+        self.server.handle({"method": "textDocument/didOpen",
+                            "params": {"textDocument": {"uri": self.URI, "text": self.CODE}}})
+    
+    def request(self, method, line, character):
+        return self.server.handle({"id": 1, "method": method, "params": {
+            "textDocument": {"uri": self.URI}, "position": {"line": line, "character": character}}})
+    
+    def edit(self, start, end, text):
+        self.server.handle({"method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": self.URI},
+            "contentChanges": [{"range": {"start": {"line": start[0], "character": start[1]},
+                                          "end": {"line": end[0], "character": end[1]}}, "text": text}]}})
+    
+    def test_incremental_matches_full_parse(self):
+        """Test edits re-parse only their service yet match a full parse"""
+        document = self.server.documents[self.URI]
+        untouched = document.blocks[-1]
+        
+        self.edit((3, 18), (3, 24), "Account[")      # response: Account[  (broken)
+        self.edit((12, 16), (12, 20), "GET")         # method: GET
+        self.edit((10, 0), (10, 7), "")              # removes a `service` keyword
+        self.edit((10, 0), (10, 0), "service ")
+        
+        parser = Parser(Lexer(document.text).tokenize(), raise_on_error=False)
+        program = parser.parse()
+        self.assertEqual([s for s, _ in document.services()], program.services)
+        self.assertEqual(
+            [(d["range"]["start"]["line"] + 1, d["range"]["start"]["character"] + 1, d["message"])
+             for d in document.diagnostics()],
+            [(d.line, d.column, d.message) for d in parser.diagnostics])
+        self.assertEqual(len(parser.diagnostics), 1)
+        self.assertIsNot(document.blocks[-1], untouched)
+    
+    def test_error_at_block_end_matches_full_parse(self):
+        """Test only the EOF a block's parser made up moves onto the next service"""
+        from language_server import Document
+        
+        def located(diagnostics):
+            return [(d["range"]["start"]["line"] + 1, d["range"]["start"]["character"] + 1, d["message"])
+                    for d in diagnostics]
+        
+        def full_parse(text):
+            parser = Parser(Lexer(text).tokenize(), raise_on_error=False)
+            parser.parse()
+            return [(d.line, d.column, d.message) for d in parser.diagnostics]
+        
+        # A stray character right after the closing brace sits where the block's EOF goes
+        self.edit((8, 1), (8, 1), "#")
+        document = self.server.documents[self.URI]
+        self.assertEqual(located(document.diagnostics()), [(9, 2, "Unexpected character '#'")])
+        self.assertEqual(located(document.diagnostics()), full_parse(document.text))
+        self.assertEqual(located(Document(self.URI, document.text).diagnostics()), full_parse(document.text))
+        # An unclosed service still reports the `service` that follows it
+        self.edit((8, 0), (8, 2), "")
+        self.assertEqual(located(document.diagnostics()), full_parse(document.text))
+        self.assertIn("got 'service'", document.diagnostics()[0]["message"])
+    
+    def test_unterminated_string_spans_blocks(self):
+        """Test a quote opened by an edit is lexed through later services"""
+        document = self.server.documents[self.URI]
+        self.edit((7, 14), (7, 14), '"')
+        self.assertEqual([s.name for s, _ in document.services()], ["UserService"])
+        self.edit((7, 14), (7, 15), "")
+        self.assertEqual([s.name for s, _ in document.services()], ["UserService", "OrderService"])
+        self.assertEqual(document.diagnostics(), [])
+    
+    def test_hover(self):
+        """Test hover shows effective limits for endpoints and services"""
+        text = self.request("textDocument/hover", 4, 10)["contents"]["value"]
+        self.assertIn("**GET /users**", text)
+        self.assertIn("cache: 5m (300s)", text)
+        self.assertIn("2 req/s per replica, 4 req/s across 2 replica(s)", text)
+        self.assertIn("timeout: none", text)
+        
+        text = self.request("textDocument/hover", 15, 16)["contents"]["value"]
+        self.assertIn("**service UserService**", text)
+        self.assertIn("called by: OrderService", text)
+        self.assertIsNone(self.request("textDocument/hover", 9, 0))
+    
+    def test_definition(self):
+        """Test go-to-definition on a connect target"""
+        location = self.request("textDocument/definition", 15, 20)
+        self.assertEqual(location["uri"], self.URI)
+        self.assertEqual(location["range"]["start"], {"line": 0, "character": 8})
+        self.assertIsNone(self.request("textDocument/definition", 2, 10))
+    
+    def test_completion(self):
+        """Test completions follow the cursor's context"""
+        labels = lambda line, character: [item["label"] for item in
+                                          self.request("textDocument/completion", line, character)]
+        self.assertIn("POST", labels(2, 16))
+        self.assertIn("User", labels(3, 18))
+        self.assertIn("rateLimit:", labels(5, 8))
+        self.assertIn("connect to", labels(7, 4))
+        self.assertEqual(labels(9, 0), ["service", "import"])
+        self.assertIn("UserService", labels(15, 15))
+        self.assertIn("grpc", labels(15, 31))
+        self.assertIn("on", labels(7, 4))
+    
+    def test_failing_notification_keeps_serving(self):
+        """Test a notification that fails is logged, and only requests get error replies"""
+        import contextlib
+        import io
+        sent = []
+        self.server.send = sent.append
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.server.handle({"method": "textDocument/didChange", "params": {
+                "textDocument": {"uri": "file:///never-opened.cs"}, "contentChanges": []}})
+            self.server.handle({"id": 2, "method": "textDocument/hover", "params": {
+                "textDocument": {"uri": "file:///never-opened.cs"}, "position": {"line": 0, "character": 0}}})
+        self.assertIn("KeyError", stderr.getvalue())
+        self.assertEqual(sent[0]["method"], "window/logMessage")
+        self.assertIn("textDocument/didChange failed", sent[0]["params"]["message"])
+        self.assertEqual(sent[1]["error"]["code"], -32603)
+        self.assertIn("UserService", self.request("textDocument/hover", 15, 16)["contents"]["value"])
 
 
 class TestCodeGeneration(unittest.TestCase):
@@ -193,6 +992,796 @@ class TestCodeGeneration(unittest.TestCase):
         self.assertIn("EXPOSE 8080", dockerfile)
         self.assertIn("CMD", dockerfile)
     
+    def test_messaging_scaffolding(self):
+        """Test broker connections get async clients, brokers and requirements"""
+        from docker_generator import DockerGenerator
+        from ir import build_program_model
+        
+        code = """
+        service OrderService {
+            endpoint /orders { method: POST }
+            connect to NotificationService via kafka
+            connect to AuditService via rabbitmq
+            connect to PaymentService via http
+        }
+        service NotificationService { endpoint /notifications { method: GET } }
+        service PaymentService { endpoint /payments { method: POST } }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        build_program_model(ast)
+        order, notifications, payments = ast.services
+        generator = DockerGenerator()
+        
+        requirements = generator.generate_requirements_txt(order)
+        self.assertIn("aiokafka", requirements)
+        self.assertIn("aio-pika", requirements)
+        self.assertNotIn("kafka-python", requirements)
+        self.assertNotIn("\npika", requirements)
+        self.assertIn("aiokafka", generator.generate_requirements_txt(notifications))
+        
+        self.assertIsNone(generator.generate_messaging_py(payments))
+        self.assertIn("await messaging.stop()", generator.generate_app_py(order))
+        self.assertIn("@messaging.on_message", generator.generate_app_py(notifications))
+        
+        compose = generator.generate_docker_compose(ast)
+        self.assertIn("KAFKA_BOOTSTRAP_SERVERS=kafka:9092", compose)
+        self.assertIn("  rabbitmq:\n    image: rabbitmq", compose)
+    
+    def test_generated_messaging_runs(self):
+        """Test generated producers and consumers over the in-process broker"""
+        import asyncio
+        from docker_generator import DockerGenerator
+        from ir import build_program_model
+        
+        code = """
+        service OrderService { endpoint /orders { method: POST } connect to NotificationService via kafka }
+        service NotificationService { endpoint /notifications { method: GET } }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        build_program_model(ast)
+        self._load_tracing(ast.services[0])
+        modules = []
+        for service in ast.services:
+            namespace = {"__name__": service.name}
+            exec(compile(DockerGenerator().generate_messaging_py(service), "messaging.py", "exec"), namespace)
+            modules.append(namespace)
+        order, notifications = modules
+        
+        async def run():
+            broker = order["MemoryBroker"]()
+            producer = order["Messaging"](broker=broker, queue_size=100)
+            consumer = notifications["Messaging"](broker=broker)
+            received = []
+            consumer.on_message(lambda message: asyncio.sleep(0, received.append(message["n"])))
+            
+            await producer.start()
+            await consumer.start()
+            # Nothing is sent until the flusher runs, so the bounded queue fills up
+            accepted = sum(producer.try_publish("NotificationService", {"n": n}) for n in range(150))
+            for n in range(150, 1000):
+                await producer.publish("NotificationService", {"n": n})
+            with self.assertRaises(ValueError):
+                await producer.publish("PaymentService", {})
+            await producer.stop()
+            
+            while len(received) < 100 + 850:
+                await asyncio.sleep(0.01)
+            await consumer.stop()
+            return accepted, received, producer.stats
+        
+        accepted, received, stats = asyncio.run(run())
+        self.assertEqual(accepted, 100)
+        self.assertEqual(sorted(received), list(range(100)) + list(range(150, 1000)))
+        self.assertEqual(stats["sent"], 950)
+    
+    def test_failed_messages_are_not_lost(self):
+        """Test failing handlers dead-letter their message, and a batch that cannot be is redelivered"""
+        import asyncio
+        import json
+        from docker_generator import DockerGenerator
+        from ir import build_program_model
+        
+        code = """
+        service OrderService { endpoint /orders { method: POST } connect to NotificationService via kafka }
+        service NotificationService { endpoint /notifications { method: GET } }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        build_program_model(ast)
+        self._load_tracing(ast.services[1])
+        namespace = {"__name__": "messaging"}
+        exec(compile(DockerGenerator().generate_messaging_py(ast.services[1]), "messaging.py", "exec"), namespace)
+        namespace["REDELIVERY_DELAY"] = 0
+        
+        async def run():
+            broker = namespace["MemoryBroker"]()
+            consumer = namespace["Messaging"](broker=broker)
+            attempts = []
+            
+            @consumer.on_message
+            async def handle(message):
+                attempts.append(message["n"])
+                if message["n"] % 2:
+                    raise RuntimeError("odd")
+            
+            await consumer.start()
+            transport = consumer.transports["kafka"]
+            send_batch = transport.send_batch
+            # The dead-letter send fails once
+            failures = [ConnectionError("broker unavailable")]
+            
+            async def flaky_send(topic, bodies):
+                if failures:
+                    raise failures.pop()
+                await send_batch(topic, bodies)
+            transport.send_batch = flaky_send
+            
+            for n in range(4):
+                broker.topic("notificationservice").put_nowait(json.dumps({"n": n}).encode())
+            while consumer.stats["handled"] + consumer.stats["dead_lettered"] < 4:
+                await asyncio.sleep(0.01)
+            await consumer.stop()
+            dead = broker.topic(namespace["DEAD_LETTER_TOPIC"])
+            return attempts, sorted(json.loads(dead.get_nowait())["n"] for _ in range(dead.qsize())), consumer.stats
+        
+        attempts, dead, stats = asyncio.run(run())
+        self.assertEqual(dead, [1, 3])
+        self.assertEqual(stats["handled"], 2)
+        self.assertEqual(stats["dead_lettered"], 2)
+        # The whole first batch was redelivered after the dead-letter send failed
+        self.assertEqual(sorted(attempts), [0, 0, 1, 1, 2, 2, 3, 3])
+    
+    def test_lifecycle_events(self):
+        """Test event blocks become the lifespan, with readiness and draining"""
+        import asyncio
+        import yaml
+        from docker_generator import DockerGenerator
+        from kubernetes_generator import KubernetesGenerator
+        
+        code = """
+        service CatalogService {
+            endpoint /products { method: GET response: Product[] cache: 5m }
+            endpoint /products/:id { method: GET response: Product cache: 5m }
+            endpoint /favorites { method: GET response: Product[] cache: 5m auth: required }
+            on start { warmPools() preload("json") primeCache() loadModels("v2") }
+            on shutdown { drain(30s) flush() }
+            on error { sendAlert("ops@example.com") }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = DockerGenerator()
+        app = generator.generate_app_py(service)
+        compile(app, "app.py", "exec")
+        self.assertIn("app = FastAPI(title=\"CatalogService\", lifespan=lifespan)", app)
+        self.assertNotIn("on_event", app)
+        start = app.index("await lifecycle.warm_pools()")
+        self.assertLess(start, app.index("await loadModels('v2')"))
+        self.assertLess(app.index("await loadModels('v2')"), app.index("lifecycle.ready = True"))
+        # The drain runs on SIGTERM while uvicorn still accepts connections, not in the lifespan
+        self.assertNotIn("lifecycle.drain(", app)
+        self.assertLess(app.index("yield"), app.index("await lifecycle.flush()"))
+        self.assertIn("    run(\n        app,", app)
+        self.assertIn("async def loadModels(*args):", app)
+        self.assertIn("await sendAlert('ops@example.com')", app)
+        self.assertIn('@app.get("/ready")', app)
+        
+        deployment = yaml.safe_load(KubernetesGenerator().generate_deployment(service))
+        container = deployment["spec"]["template"]["spec"]["containers"][0]
+        self.assertEqual(container["readinessProbe"]["httpGet"]["path"], "/ready")
+        self.assertEqual(container["livenessProbe"]["httpGet"]["path"], "/health")
+        # 5s for load balancers to stop routing + drain(30s) + 10s for the shutdown actions
+        self.assertEqual(deployment["spec"]["template"]["spec"]["terminationGracePeriodSeconds"], 45)
+        self.assertIn("stop_grace_period: 45s", generator.generate_docker_compose(
+            Parser(Lexer(code).tokenize()).parse()))
+        
+        namespace = {"__name__": "lifecycle"}
+        exec(compile(generator.generate_lifecycle_py(service), "lifecycle.py", "exec"), namespace)
+        self.assertEqual(namespace["CACHE_PATHS"], ["/products"])
+        self.assertEqual(namespace["DRAIN_TIMEOUT"], 30.0)
+        
+        class App:
+            """Minimal ASGI app: each request takes 50ms"""
+            def add_middleware(self, middleware, **options):
+                self.handle = middleware(self.respond, **options)
+            
+            async def respond(self, scope, receive, send):
+                await asyncio.sleep(0.05)
+        
+        async def run():
+            lifecycle = namespace["Lifecycle"]()
+            app = App()
+            lifecycle.bind(app)
+            opened = []
+            lifecycle.warmer(lambda: asyncio.sleep(0, opened.append("db")))
+            await lifecycle.warm_pools()
+            await lifecycle.preload("json", "no_such_module_xyz")
+            lifecycle.ready = True
+            
+            requests = [asyncio.ensure_future(app.handle({"type": "http"}, None, None)) for _ in range(5)]
+            await asyncio.sleep(0)
+            inflight = lifecycle.inflight
+            drain = asyncio.ensure_future(lifecycle.drain(timeout=2, delay=0.1))
+            await asyncio.sleep(0.02)
+            # Requests arriving before load balancers catch up are still served
+            ready = lifecycle.ready
+            requests.append(asyncio.ensure_future(app.handle({"type": "http"}, None, None)))
+            await drain
+            return opened, inflight, ready, lifecycle, all(request.done() for request in requests)
+        
+        opened, inflight, ready, lifecycle, finished = asyncio.run(run())
+        self.assertEqual(opened, ["db"])
+        self.assertEqual(inflight, 5)
+        self.assertFalse(ready)
+        self.assertTrue(finished)
+        self.assertEqual(lifecycle.inflight, 0)
+        self.assertFalse(lifecycle.ready)
+    
+    def _load_generated(self, name, source):
+        """Run a generated module, registered so the generated modules importing it can"""
+        import types
+        module = types.ModuleType(name)
+        exec(compile(source, f"{name}.py", "exec"), module.__dict__)
+        sys.modules[name] = module
+        self.addCleanup(sys.modules.pop, name, None)
+        return module.__dict__
+    
+    def _load_tracing(self, service):
+        """Load the generated tracing module, exporting nowhere"""
+        import os
+        from unittest import mock
+        from docker_generator import DockerGenerator
+        self._load_generated("compression", DockerGenerator().generate_compression_py(service))
+        with mock.patch.dict(os.environ, {"OTEL_TRACES_EXPORTER": "none"}):
+            return self._load_generated("tracing", DockerGenerator().generate_tracing_py(service))
+    
+    def test_response_cache_coalesces(self):
+        """Test cached endpoints share handler calls under a thundering herd"""
+        import asyncio
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service CatalogService {
+            endpoint /products { method: GET response: Product[] cache: 5m }
+            endpoint /products/:id { method: GET response: Product cache: 1m }
+            endpoint /products { method: POST response: Product }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = DockerGenerator()
+        self.assertIn("app.add_middleware(ResponseCacheMiddleware)", generator.generate_app_py(service))
+        self.assertIn("redis==", generator.generate_requirements_txt(service))
+        self._load_tracing(service)
+        self._load_generated("compression", generator.generate_compression_py(service))
+        namespace = self._load_generated("response_cache", generator.generate_response_cache_py(service))
+        self.assertEqual(namespace["CACHED_ROUTES"], [("/products", 300.0), ("/products/:id", 60.0)])
+        
+        calls = []
+        
+        async def backend(scope, receive, send):
+            calls.append(scope["path"])
+            await asyncio.sleep(0.01)
+            status = 404 if scope["path"] == "/products/missing" else 200
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": scope["path"].encode()})
+        
+        def herd(**settings):
+            cache = namespace["ResponseCache"](max_ttl=0.05, **settings)
+            app = namespace["ResponseCacheMiddleware"](backend, cache)
+            return asyncio.run(namespace["thundering_herd"](app, "/products/7", cache, clients=50,
+                                                            waves=6, interval=0.03))
+        
+        plain = herd(coalesce=False, stale_ratio=0, beta=0)
+        single_flight = herd(coalesce=True, stale_ratio=0, beta=0)
+        revalidating = herd(stale_ratio=5)
+        self.assertGreaterEqual(plain["handler_calls"], 100)
+        self.assertLessEqual(single_flight["handler_calls"], 6)
+        self.assertEqual(single_flight["waited"], plain["waited"])
+        # Only the cold first wave waits; later expiries are served stale
+        self.assertEqual(revalidating["waited"], 50)
+        
+        async def requests():
+            cache = namespace["ResponseCache"]()
+            app = namespace["ResponseCacheMiddleware"](backend, cache)
+            bodies = []
+            
+            async def get(path, headers=()):
+                async def send(message):
+                    if message["type"] == "http.response.body":
+                        bodies.append(message["body"])
+                scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": list(headers)}
+                await app(scope, None, send)
+            
+            calls.clear()
+            await asyncio.gather(get("/products/missing"), get("/products/missing"))
+            await get("/products/missing")
+            await get("/products", [(b"authorization", b"Bearer a")])
+            await get("/products", [(b"authorization", b"Bearer b")])
+            await get("/products", [(b"authorization", b"Bearer a")])
+            await get("/products", [(b"x-api-key", b"key-a")])
+            await get("/products", [(b"x-api-key", b"key-b")])
+            await get("/products", [(b"x-api-key", b"key-a")])
+            return bodies
+        
+        bodies = asyncio.run(requests())
+        # Errors are coalesced but not cached; callers never share responses, whichever credential they send
+        self.assertEqual(calls, ["/products/missing"] * 2 + ["/products"] * 4)
+        self.assertEqual(bodies[-1], b"/products")
+    
+    def test_compression(self):
+        """Test responses are compressed by negotiation, and cache entries only once"""
+        import asyncio
+        import gzip
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service FeedService {
+            endpoint /posts { method: GET response: Post[] cache: 5m }
+            endpoint /ping { method: GET response: string compress: none }
+            endpoint /search { method: GET response: Post[] }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = DockerGenerator()
+        self.assertIn("app.add_middleware(CompressionMiddleware)", generator.generate_app_py(service))
+        self.assertIn("brotli==", generator.generate_requirements_txt(service))
+        self._load_tracing(service)
+        compression = self._load_generated("compression", generator.generate_compression_py(service))
+        cache_module = self._load_generated("response_cache", generator.generate_response_cache_py(service))
+        self.assertEqual(compression["ROUTE_POLICIES"], [("GET", "/ping", "none")])
+        # Literal segments match only themselves; parameters match one segment
+        pattern = compression["route_pattern"]("/v1.0/files/:name")
+        self.assertTrue(pattern.match("/v1.0/files/a.txt"))
+        self.assertFalse(pattern.match("/v100/files/a.txt"))
+        self.assertFalse(pattern.match("/v1.0/files/a/b"))
+        
+        negotiate = compression["negotiate"]
+        self.assertEqual(negotiate("gzip, br;q=0.5", ["br", "gzip"]), "gzip")
+        self.assertEqual(negotiate("gzip, br", ["br", "gzip"]), "br")
+        self.assertEqual(negotiate("*;q=0.1, gzip;q=0", ["gzip", "zstd"]), "zstd")
+        self.assertIsNone(negotiate("identity", ["gzip"]))
+        
+        payload = b"[" + b", ".join(b'{"id": %d, "title": "post"}' % i for i in range(200)) + b"]"
+        calls = []
+        
+        async def backend(scope, receive, send):
+            calls.append(scope["path"])
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json"), (b"etag", b'"v1"')]})
+            if scope["path"] == "/search":
+                # Streamed in two chunks
+                await send({"type": "http.response.body", "body": payload[:100], "more_body": True})
+                await send({"type": "http.response.body", "body": payload[100:]})
+            else:
+                await send({"type": "http.response.body", "body": payload})
+        
+        cache = cache_module["ResponseCache"]()
+        app = compression["CompressionMiddleware"](cache_module["ResponseCacheMiddleware"](backend, cache))
+        compression["SUPPORTED"][:] = ["gzip"]
+        
+        async def get(path, *headers):
+            sent = []
+            
+            async def send(message):
+                sent.append(message)
+            await app({"type": "http", "method": "GET", "path": path, "query_string": b"",
+                       "headers": list(headers)}, None, send)
+            return sent[0]["status"], dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+        
+        async def requests():
+            accept = (b"accept-encoding", b"gzip, deflate")
+            responses = [await get("/posts", accept) for _ in range(5)]
+            responses.append(await get("/posts"))
+            responses.append(await get("/posts", accept, (b"if-none-match", responses[0][1][b"etag"])))
+            responses.append(await get("/ping", accept))
+            responses.append(await get("/search", accept))
+            return responses
+        
+        responses = asyncio.run(requests())
+        compressed, plain, revalidated, ping, search = responses[0], responses[5], responses[6], responses[7], responses[8]
+        self.assertEqual(compressed[1][b"content-encoding"], b"gzip")
+        self.assertEqual(compressed[1][b"vary"], b"Accept-Encoding")
+        self.assertEqual(compressed[1][b"etag"], b'"v1-gzip"')
+        self.assertEqual(int(compressed[1][b"content-length"]), len(compressed[2]))
+        self.assertEqual(gzip.decompress(compressed[2]), payload)
+        # One handler call and one compression for every hit
+        self.assertEqual(calls, ["/posts", "/ping", "/search"])
+        self.assertEqual(cache.stats["compressions"], 1)
+        self.assertTrue(all(response[2] == compressed[2] for response in responses[1:5]))
+        self.assertEqual((plain[2], plain[1][b"vary"]), (payload, b"Accept-Encoding"))
+        self.assertNotIn(b"content-encoding", plain[1])
+        self.assertEqual(revalidated[0], 304)
+        self.assertEqual((ping[2], ping[1].get(b"content-encoding")), (payload, None))
+        self.assertEqual(search[1][b"content-encoding"], b"gzip")
+        self.assertNotIn(b"content-length", search[1])
+        self.assertEqual(gzip.decompress(search[2]), payload)
+    
+    def test_pagination(self):
+        """Test array endpoints page by keyset cursor and stream as NDJSON"""
+        import asyncio
+        import json
+        from docker_generator import DockerGenerator
+        from openapi_generator import OpenAPIGenerator
+        
+        code = """
+        service FeedService {
+            endpoint /posts { method: GET response: Post[] pageSize: 20 }
+            endpoint /posts/:id { method: GET response: Post }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = DockerGenerator()
+        self.assertIn("limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)", generator.generate_app_py(service))
+        pagination = self._load_generated("pagination", generator.generate_pagination_py(service))
+        pagination["TABLES"]["posts"] = [{"id": i, "title": f"post {i}"} for i in reversed(range(45))]
+        key = ("id",)
+        
+        async def pages():
+            result, cursor = [], None
+            while True:
+                after = pagination["decode_cursor"](cursor, key)
+                rows = pagination["keyset_batches"]("posts", key, after, 21, batch=8)
+                page = await pagination["page"](rows, 20, key)
+                result.append([row["id"] for row in page["items"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return result
+        
+        async def stream(cursor):
+            after = pagination["decode_cursor"](cursor, key)
+            rows = pagination["keyset_batches"]("posts", key, after, batch=8)
+            return [chunk async for chunk in pagination["ndjson"](rows)]
+        
+        self.assertEqual(asyncio.run(pages()), [list(range(20)), list(range(20, 40)), list(range(40, 45))])
+        chunks = asyncio.run(stream(pagination["encode_cursor"]({"id": 29}, key)))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([json.loads(line)["id"] for line in b"".join(chunks).splitlines()], list(range(30, 45)))
+        for cursor in ("not base64!", pagination["encode_cursor"]({"id": 1, "at": 2}, ("id", "at"))):
+            with self.assertRaises(pagination["InvalidCursor"]):
+                pagination["decode_cursor"](cursor, key)
+        
+        # Databases get a keyset query: a row comparison, never OFFSET
+        service.configs["database"] = {"type": "postgres", "settings": {}}
+        service.__dict__.pop("_model")
+        postgres = self._load_generated("pagination", generator.generate_pagination_py(service))
+        sql, params = postgres["keyset_query"]("posts", ("created_at", "id"), ["2024-01-01", 7], 21)
+        self.assertEqual(sql, 'SELECT * FROM "posts" WHERE ("created_at", "id") > (:after0, :after1) '
+                              'ORDER BY "created_at", "id" LIMIT :limit')
+        self.assertEqual(params, {"after0": "2024-01-01", "after1": 7, "limit": 21})
+        
+        spec = json.loads(OpenAPIGenerator().generate_openapi(service))
+        operation = spec["paths"]["/posts"]["get"]
+        self.assertEqual([p["name"] for p in operation["parameters"]], ["cursor", "limit"])
+        self.assertEqual(operation["parameters"][1]["schema"]["default"], 20)
+        content = operation["responses"]["200"]["content"]
+        self.assertEqual(content["application/json"]["schema"], {"$ref": "#/components/schemas/PostPage"})
+        self.assertIn("application/x-ndjson", content)
+        self.assertEqual(spec["components"]["schemas"]["PostPage"]["required"], ["items", "next_cursor"])
+    
+    def test_response_cache_validators(self):
+        """Test cached responses carry ETag/Cache-Control and answer If-None-Match with 304"""
+        import asyncio
+        import json
+        from docker_generator import DockerGenerator
+        from openapi_generator import OpenAPIGenerator
+        
+        code = """
+        service CatalogService {
+            endpoint /products { method: GET response: Product[] cache: 10m }
+            endpoint /orders { method: GET response: Order[] cache: 1m auth: required }
+            endpoint /products { method: POST response: Product cache: 10m }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        self._load_tracing(service)
+        self._load_generated("compression", DockerGenerator().generate_compression_py(service))
+        namespace = self._load_generated("response_cache", DockerGenerator().generate_response_cache_py(service))
+        calls = []
+        
+        async def backend(scope, receive, send):
+            calls.append(scope["path"])
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'[{"id": 1}]'})
+        
+        async def requests():
+            app = namespace["ResponseCacheMiddleware"](backend, namespace["ResponseCache"]())
+            responses = []
+            
+            async def get(path, *headers):
+                sent = []
+                
+                async def send(message):
+                    sent.append(message)
+                await app({"type": "http", "method": "GET", "path": path, "query_string": b"",
+                           "headers": list(headers)}, None, send)
+                responses.append((sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]))
+            
+            await get("/products")
+            etag = responses[0][1][b"etag"]
+            await get("/products", (b"if-none-match", b'W/"stale", ' + etag))
+            await get("/products", (b"if-none-match", b'"stale"'))
+            await get("/orders", (b"authorization", b"Bearer a"))
+            return responses
+        
+        first, revalidated, changed, private = asyncio.run(requests())
+        self.assertEqual(calls, ["/products", "/orders"])
+        status, headers, body = first
+        self.assertEqual((status, body), (200, b'[{"id": 1}]'))
+        self.assertRegex(headers[b"etag"].decode(), r'^"[0-9a-f]{16}"$')
+        self.assertRegex(headers[b"cache-control"].decode(), r"^public, max-age=(599|600), stale-while-revalidate=300$")
+        self.assertEqual(revalidated[0], 304)
+        self.assertEqual(revalidated[2], b"")
+        self.assertEqual(set(revalidated[1]), {b"etag", b"cache-control"})
+        self.assertEqual(changed[:1] + changed[2:], (200, b'[{"id": 1}]'))
+        self.assertTrue(private[1][b"cache-control"].startswith(b"private, max-age="))
+        
+        spec = json.loads(OpenAPIGenerator().generate_openapi(service))
+        get, post = spec["paths"]["/products"]["get"], spec["paths"]["/products"]["post"]
+        self.assertNotIn("x-cache-duration", get)
+        self.assertEqual(set(get["responses"]["200"]["headers"]), {"Cache-Control", "ETag"})
+        self.assertIn("304", get["responses"])
+        self.assertIn("If-None-Match", [p["name"] for p in get["parameters"]])
+        self.assertEqual(get["responses"]["200"]["headers"]["Cache-Control"]["schema"]["example"],
+                         "public, max-age=600")
+        self.assertNotIn("304", post["responses"])
+        self.assertIn("private", json.dumps(spec["paths"]["/orders"]["get"]["responses"]["304"]))
+    
+    def test_tracing(self):
+        """Test spans nest and propagate, sample by trace id, and never block on export"""
+        import asyncio
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service CatalogService {
+            endpoint /products/:id { method: GET response: Product cache: 5m }
+            endpoint /products { method: POST response: Product }
+            connect to PricingService via http
+        }
+        service PricingService { endpoint /prices { method: GET } }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        service = ast.services[0]
+        generator = DockerGenerator()
+        app = generator.generate_app_py(service)
+        self.assertLess(app.index("add_middleware(CompressionMiddleware)"), app.index("add_middleware(TracingMiddleware)"))
+        self.assertIn("await close_http_clients()", app)
+        clients = generator.generate_http_clients_py(service, ast)
+        self.assertIn('pricingservice = ServiceClient("PricingService", '
+                      'os.getenv("PRICINGSERVICE_URL", "http://pricingservice:8080"))', clients)
+        self.assertIsNone(generator.generate_http_clients_py(ast.services[1], ast))
+        self.assertIn("OTEL_SERVICE_NAME=CatalogService", generator.generate_docker_compose(ast))
+        
+        tracing = self._load_tracing(service)
+        self._load_generated("compression", generator.generate_compression_py(service))
+        cache = self._load_generated("response_cache", generator.generate_response_cache_py(service))
+        
+        class Collect:
+            def __init__(self):
+                self.spans = []
+            
+            def on_end(self, span):
+                self.spans.append(span)
+            
+            def shutdown(self, timeout=5):
+                pass
+        
+        collected = Collect()
+        tracer = tracing["Tracer"](collected, ratio=1.0)
+        with tracer.start_span("parent") as parent:
+            with tracer.start_span("child", tracing["CLIENT"]) as child:
+                header = child.traceparent
+            with self.assertRaises(KeyError):
+                with tracer.start_span("failing"):
+                    raise KeyError("x")
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertEqual(tracing["parse_traceparent"](header), (parent.trace_id, child.span_id, True))
+        self.assertEqual(collected.spans[1].status, tracing["STATUS_ERROR"])
+        self.assertIsNone(tracing["parse_traceparent"]("00-" + "0" * 32 + "-" + "1" * 16 + "-01"))
+        
+        # New traces are sampled by ratio; a caller's decision is always followed
+        unsampled = tracing["Tracer"](collected, ratio=0.0)
+        self.assertFalse(any(unsampled.start_span("root").sampled for _ in range(100)))
+        self.assertTrue(unsampled.start_span("server", traceparent=header).sampled)
+        self.assertFalse(unsampled.start_span("server", traceparent=header[:-2] + "00").sampled)
+        half = tracing["Tracer"](collected, ratio=0.5)
+        kept = sum(half.start_span("root").sampled for _ in range(2000))
+        self.assertTrue(800 < kept < 1200)
+        
+        exported = []
+        processor = tracing["BatchSpanProcessor"](type("Exporter", (), {"export": lambda self, spans: exported.extend(spans)})(),
+                                                  max_queue_size=10, schedule_delay=60)
+        for span in collected.spans[:3] * 5:
+            processor.on_end(span)
+        self.assertEqual(processor.stats["dropped"], 5)
+        processor.shutdown()
+        self.assertEqual(len(exported), 10)
+        
+        document = tracing["otlp_json"](collected.spans[:1])
+        span_json = document["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(span_json["parentSpanId"], parent.span_id)
+        self.assertEqual(span_json["kind"], 3)
+        
+        collected.spans.clear()
+        
+        async def backend(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b"{}"})
+        
+        async def requests():
+            app = tracing["TracingMiddleware"](cache["ResponseCacheMiddleware"](backend, cache["ResponseCache"]()), tracer)
+            
+            async def send(message):
+                pass
+            for path in ("/products/1", "/products/1", "/unknown"):
+                await app({"type": "http", "method": "GET", "path": path, "query_string": b"",
+                           "headers": [(b"traceparent", header.encode())]}, None, send)
+        
+        asyncio.run(requests())
+        miss, hit, unknown = collected.spans
+        self.assertEqual((miss.name, unknown.name), ("GET /products/{id}", "GET"))
+        self.assertEqual((miss.trace_id, miss.parent_id), (parent.trace_id, child.span_id))
+        self.assertEqual(miss.attributes["http.route"], "/products/{id}")
+        self.assertEqual(miss.attributes["http.response.status_code"], 200)
+        self.assertEqual((miss.attributes["cache.status"], hit.attributes["cache.status"]), ("miss", "hit"))
+    
+    def test_route_specificity(self):
+        """Test literal route segments win over :params in every route table, whatever the declaration order"""
+        from docker_generator import DockerGenerator
+        
+        with open("../examples/ecommerce.cs") as f:
+            ast = Parser(Lexer(f.read()).tokenize()).parse()
+        service = next(service for service in ast.services if service.name == "ProductService")
+        generator = DockerGenerator()
+        tracing = self._load_tracing(service)
+        cache = self._load_generated("response_cache", generator.generate_response_cache_py(service))
+        rate_limit = self._load_generated("rate_limit", generator.generate_rate_limit_py(service))
+        
+        # /products/:id is declared first, with a longer TTL
+        middleware = cache["ResponseCacheMiddleware"](None, cache["ResponseCache"]())
+        self.assertEqual((middleware.ttl_for("/products/search"), middleware.ttl_for("/products/7")), (300, 900))
+        traced = tracing["TracingMiddleware"](None)
+        self.assertEqual(traced.route_for("GET", "/products/search"), "/products/search")
+        self.assertEqual(traced.route_for("GET", "/products/7"), "/products/{id}")
+        limiter = rate_limit["RateLimitMiddleware"](None, limits=[("GET", "/products/:id", 1.0, 1),
+                                                                  ("GET", "/products/search", 5.0, 5)])
+        self.assertEqual(limiter.limit_for("GET", "/products/search"), ("/products/search", 5.0, 5))
+        
+        code = """
+        service FeedService {
+            endpoint /posts/:id { method: GET compress: none }
+            endpoint /posts/latest { method: GET compress: gzip }
+        }
+        """
+        feed = Parser(Lexer(code).tokenize()).parse().services[0]
+        compression = self._load_generated("compression", generator.generate_compression_py(feed))
+        self.assertEqual(compression["encodings_for"]("GET", "/posts/latest"), ["gzip"])
+        self.assertEqual(compression["encodings_for"]("GET", "/posts/7"), [])
+    
+    def test_rate_limit(self):
+        """Test token buckets per client answer 429 once the burst is spent"""
+        import asyncio
+        import time
+        from docker_generator import DockerGenerator
+        
+        code = """
+        service CatalogService {
+            endpoint /products/:id { method: GET rateLimit: 3/s }
+            endpoint /products { method: POST }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = DockerGenerator()
+        tracing = self._load_tracing(service)
+        namespace = self._load_generated("rate_limit", generator.generate_rate_limit_py(service))
+        self.assertEqual(namespace["RATE_LIMITS"], [("GET", "/products/:id", 3.0, 3)])
+        self.assertIn("app.add_middleware(RateLimitMiddleware)", generator.generate_app_py(service))
+        plain = Parser(Lexer("service S { endpoint /a { method: GET } }").tokenize()).parse().services[0]
+        self.assertIsNone(generator.generate_rate_limit_py(plain))
+        self.assertNotIn("RateLimitMiddleware", generator.generate_app_py(plain))
+        
+        async def backend(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        
+        limiter = namespace["RateLimitMiddleware"](backend)
+        spans = []
+        tracer = tracing["Tracer"](type("Collect", (), {"on_end": lambda self, span: spans.append(span)})())
+        
+        async def get(path, client):
+            sent = []
+            
+            async def send(message):
+                sent.append(message)
+            with tracer.start_span("request"):
+                await limiter({"type": "http", "method": "GET", "path": path, "client": (client, 1234),
+                               "headers": []}, None, send)
+            return sent[0]
+        
+        async def requests():
+            first = [await get(f"/products/{n}", "10.0.0.1") for n in range(5)]
+            other = await get("/products/1", "10.0.0.2")
+            return first, other
+        
+        first, other = asyncio.run(requests())
+        self.assertEqual([start["status"] for start in first], [200, 200, 200, 429, 429])
+        self.assertEqual(dict(first[3]["headers"])[b"retry-after"], b"1")
+        self.assertEqual(other["status"], 200)
+        self.assertEqual([span.attributes["ratelimit.decision"] for span in spans],
+                         ["allow"] * 3 + ["reject"] * 2 + ["allow"])
+        self.assertEqual(limiter.stats, {"allowed": 4, "rejected": 2})
+        # Tokens refill at the declared rate
+        self.assertTrue(limiter.take(("/products/:id", "10.0.0.1"), 3.0, 3, time.monotonic() + 1)[0])
+        
+        # A client rotating X-Forwarded-For keeps its bucket, directly and behind one proxy
+        def key(client, *headers, proxies=0):
+            limiter.trusted_proxies = proxies
+            return limiter.client_key({"client": (client, 1234), "headers": list(headers)})
+        self.assertEqual({key("10.0.0.1", (b"x-forwarded-for", f"1.2.3.{n}".encode())) for n in range(3)},
+                         {"10.0.0.1"})
+        self.assertEqual({key("10.0.0.5", (b"x-forwarded-for", f"1.2.3.{n}, 10.0.0.1".encode()), proxies=1)
+                          for n in range(3)}, {"10.0.0.1"})
+        self.assertEqual(key("10.0.0.5", (b"x-forwarded-for", b"10.0.0.1"), proxies=2), "10.0.0.1")
+        # API keys identify callers like Authorization, without the two ever sharing a bucket
+        self.assertEqual(key("10.0.0.1", (b"x-api-key", b"a")), key("10.0.0.2", (b"x-api-key", b"a")))
+        self.assertNotEqual(key("10.0.0.1", (b"x-api-key", b"a")), key("10.0.0.1", (b"x-api-key", b"b")))
+        self.assertNotEqual(key("10.0.0.1", (b"x-api-key", b"a")), key("10.0.0.1", (b"authorization", b"a")))
+    
+    def test_grpc_scaffolding(self):
+        """Test grpc connections get a .proto, a grpc.aio server and pooled clients"""
+        import yaml
+        from docker_generator import DockerGenerator
+        from grpc_generator import GrpcGenerator
+        from kubernetes_generator import KubernetesGenerator
+        from ir import build_program_model
+        
+        code = """
+        service OrderService {
+            endpoint /orders { method: POST }
+            connect to PaymentService via grpc
+            connect to FraudService via grpc
+        }
+        service PaymentService {
+            endpoint /payments { method: POST response: Payment }
+            endpoint /payments/:id { method: GET response: Payment timeout: 2s }
+            endpoint /payments/:id/status { method: GET response: string }
+            endpoint /payments/recent { method: GET response: Payment[] }
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        build_program_model(ast)
+        order, payments = ast.services
+        generator = GrpcGenerator()
+        
+        proto = generator.generate_proto(payments)
+        self.assertIn("service PaymentService {", proto)
+        self.assertIn("rpc GetPaymentsId (GetPaymentsIdRequest) returns (google.protobuf.Struct);", proto)
+        self.assertIn("returns (google.protobuf.StringValue);", proto)
+        self.assertIn("returns (google.protobuf.ListValue);", proto)
+        self.assertIn("  string id = 1;", proto)
+        self.assertIn("  google.protobuf.Struct body = 1;", proto)
+        
+        # Only the callee serves; FraudService is external, so it has no .proto
+        self.assertIsNone(generator.generate_server_py(order))
+        self.assertEqual([s.name for s in generator.protos_for(order, ast)], ["PaymentService"])
+        server = generator.generate_server_py(payments)
+        clients = generator.generate_clients_py(order, ast)
+        compile(server, "grpc_server.py", "exec")
+        compile(clients, "grpc_clients.py", "exec")
+        self.assertIn("class PaymentServiceServicer(pb2_grpc.PaymentServiceServicer):", server)
+        self.assertIn("async def get_payments_id(self, id: str, timeout: float = 2.0):", clients)
+        self.assertNotIn("FraudService", clients)
+        
+        docker = DockerGenerator()
+        self.assertIn("grpcio", docker.generate_requirements_txt(payments))
+        self.assertIn("grpc_tools.protoc", docker.generate_dockerfile(order))
+        self.assertIn("await grpc_server.start()", docker.generate_app_py(payments))
+        self.assertIn("await close_clients()", docker.generate_app_py(order))
+        
+        kubernetes = KubernetesGenerator()
+        config = yaml.safe_load(kubernetes.generate_configmap(order))["data"]
+        self.assertEqual(config["PAYMENTSERVICE_URL"], "dns:///paymentservice:50051")
+        ports = yaml.safe_load(kubernetes.generate_service(payments))["spec"]["ports"]
+        self.assertEqual([p["name"] for p in ports], ["http", "grpc"])
+    
     def test_kubernetes_generation(self):
         """Test Kubernetes manifest generation"""
         from kubernetes_generator import KubernetesGenerator
@@ -215,6 +1804,390 @@ class TestCodeGeneration(unittest.TestCase):
         self.assertEqual(spec['openapi'], '3.0.3')
         self.assertEqual(spec['info']['title'], 'TestService')
         self.assertIn('/test', spec['paths'])
+    
+    def test_openapi_streaming_and_compact(self):
+        """Test the streaming writer matches the in-memory output"""
+        from openapi_generator import OpenAPIGenerator, precompress
+        import gzip
+        import io
+        import json
+        import tempfile
+        from pathlib import Path
+        
+        code = """
+        service UserService {
+            endpoint /users { method: GET response: User[] cache: 5m }
+            endpoint /users { method: POST response: User auth: required }
+            endpoint /users/:id { method: GET response: User }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        generator = OpenAPIGenerator()
+        
+        for compact in (False, True):
+            stream = io.StringIO()
+            generator.write_openapi(service, stream, compact=compact)
+            self.assertEqual(stream.getvalue(), generator.generate_openapi(service, compact=compact))
+        
+        compact_json = generator.generate_openapi(service, compact=True)
+        self.assertNotIn("\n", compact_json)
+        self.assertEqual(json.loads(compact_json), json.loads(generator.generate_openapi(service)))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "userservice-openapi.json"
+            path.write_text(compact_json)
+            written = precompress(path, ["gzip"])
+            self.assertEqual(gzip.decompress(written[0].read_bytes()).decode(), compact_json)
+        
+        # The CLI rejects unknown encodings before anything is written
+        import argparse
+        from cloudscript import encoding_list
+        self.assertEqual(encoding_list("gzip,br"), ("gzip", "br"))
+        with self.assertRaisesRegex(argparse.ArgumentTypeError, "gz"):
+            encoding_list("gzip,gz")
+    
+    def test_gateway_openapi(self):
+        """Test the aggregated gateway spec shares components across services"""
+        from openapi_generator import OpenAPIGenerator
+        import json
+        
+        code = """
+        service UserService {
+            endpoint /users/:id { method: GET response: User }
+            endpoint /health { method: GET response: string }
+        }
+        service AdminService {
+            endpoint /admin/users/:id { method: GET response: User }
+            endpoint /health { method: GET response: string }
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        spec = json.loads(OpenAPIGenerator().generate_gateway_openapi(ast))
+        
+        self.assertEqual([t["name"] for t in spec["tags"]], ["UserService", "AdminService"])
+        # The same path and method in two services is prefixed per service
+        self.assertIn("/userservice/health", spec["paths"])
+        self.assertIn("/adminservice/health", spec["paths"])
+        self.assertEqual(len({op["operationId"] for path in spec["paths"].values()
+                              for op in path.values()}), 4)
+        
+        self.assertEqual(set(spec["components"]["schemas"]), {"User", "Error"})
+        user = spec["paths"]["/admin/users/:id"]["get"]
+        self.assertEqual(user["responses"]["200"], {"$ref": "#/components/responses/UserResponse"})
+        self.assertEqual(user["parameters"], [{"$ref": "#/components/parameters/idPath"}])
+        
+        # Components are named after where the parameter goes
+        paged = Parser(Lexer("""
+        service FeedService {
+            endpoint /feeds/:limit/posts { method: GET response: Post[] }
+        }
+        """).tokenize()).parse()
+        spec = json.loads(OpenAPIGenerator().generate_gateway_openapi(paged))
+        self.assertEqual(set(spec["components"]["parameters"]), {"limitPath", "cursorQuery", "limitQuery"})
+    
+    def test_mesh_generation(self):
+        """Test Istio manifest generation"""
+        from mesh_generator import MeshGenerator
+        import yaml
+        
+        code = """
+        service UserService {
+            endpoint /users/:id {
+                method: GET
+                response: User
+                timeout: 3s
+                rateLimit: 60/m
+            }
+            replicas: 2
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        
+        generator = MeshGenerator()
+        virtual_service = yaml.safe_load(generator.generate_virtual_service(service))
+        route = virtual_service['spec']['http'][0]
+        self.assertEqual(route['timeout'], '3s')
+        self.assertEqual(route['match'][0]['uri'], {'regex': '^/users/[^/]+$'})
+        self.assertEqual(route['retries']['attempts'], 2)
+        
+        destination_rule = yaml.safe_load(generator.generate_destination_rule(service))
+        pool = destination_rule['spec']['trafficPolicy']['connectionPool']
+        # 1 request/second * 2 replicas * 3s timeout
+        self.assertEqual(pool['http']['http2MaxRequests'], 6)
+        self.assertEqual(destination_rule['spec']['trafficPolicy']['outlierDetection']['maxEjectionPercent'], 50)
+        # With one replica or none there is nothing to eject to
+        for replicas in (0, 1):
+            single = Parser(Lexer(f"service S {{ endpoint /a {{ method: GET }} replicas: {replicas} }}")
+                            .tokenize()).parse().services[0]
+            policy = yaml.safe_load(generator.generate_destination_rule(single))['spec']['trafficPolicy']
+            self.assertNotIn('outlierDetection', policy)
+    
+    def test_mesh_route_order(self):
+        """Test literal routes precede the parameter routes that would capture them"""
+        from mesh_generator import MeshGenerator
+        import yaml
+        
+        code = """
+        service ProductService {
+            endpoint /products/:id { method: GET response: Product timeout: 2s }
+            endpoint /products/:id/reviews { method: GET response: Review[] }
+            endpoint /products/search { method: GET response: Product[] timeout: 5s }
+            endpoint /products/:id/related { method: GET response: Product[] }
+            endpoint /products/featured/related { method: GET response: Product[] }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        
+        routes = yaml.safe_load(MeshGenerator().generate_virtual_service(service))['spec']['http']
+        self.assertEqual([route['name'] for route in routes], [
+            'get-products-search', 'get-products-featured-related', 'get-products-id',
+            'get-products-id-reviews', 'get-products-id-related', 'default'])
+        self.assertEqual(routes[0]['timeout'], '5s')
+        
+        # Without a declared timeout the route keeps Istio's default of none
+        reviews = routes[3]
+        self.assertNotIn('timeout', reviews)
+        self.assertNotIn('perTryTimeout', reviews['retries'])
+    
+    
+    def test_loadtest_generation(self):
+        """Test load generator script generation"""
+        from loadtest_generator import LoadTestGenerator
+        
+        code = """
+        service UserService {
+            endpoint /users/:id {
+                method: PUT
+                response: User
+                rateLimit: 120/m
+            }
+        }
+        """
+        service = Parser(Lexer(code).tokenize()).parse().services[0]
+        script = LoadTestGenerator().generate_load_test(service)
+        
+        namespace = {"__name__": "loadtest"}
+        exec(compile(script, "userservice_loadtest.py", "exec"), namespace)
+        endpoint = namespace["ENDPOINTS"][0]
+        self.assertEqual(endpoint["operationId"], "putUsersId")
+        self.assertEqual(endpoint["pathParams"], ["id"])
+        self.assertTrue(endpoint["hasBody"])
+        self.assertEqual(endpoint["rateLimit"], 2.0)
+        
+        histogram = namespace["LatencyHistogram"]()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertAlmostEqual(histogram.percentile(99), 990000, delta=990000 / 128)
+    
+    def test_standin_generation(self):
+        """Test stand-ins answer with schema examples, injected latency, errors and a throughput cap"""
+        import asyncio
+        import json
+        import time
+        from standin_generator import StandInGenerator
+        
+        code = """
+        service OrderService {
+            endpoint /orders { method: POST }
+            connect to UserService via http
+            connect to BankAPI via http
+            connect to AuditService via kafka
+        }
+        service UserService {
+            endpoint /users { method: GET response: User[] }
+            endpoint /users/:id { method: GET response: User }
+            endpoint /users/:id { method: DELETE response: bool }
+        }
+        """
+        ast = Parser(Lexer(code).tokenize()).parse()
+        generator = StandInGenerator()
+        self.assertIsNone(generator.generate_standins(ast.services[1], ast))
+        script = generator.generate_standins(ast.services[0], ast)
+        compile(script, "orderservice_standins.py", "exec")
+        namespace = {"__name__": "standins"}
+        exec(compile(script, "orderservice_standins.py", "exec"), namespace)
+        users, bank = namespace["STANDINS"]
+        self.assertEqual([(s["name"], s["env"]) for s in (users, bank)],
+                         [("UserService", "USERSERVICE_URL"), ("BankAPI", "BANKAPI_URL")])
+        self.assertEqual(bank["routes"], [])
+        page, user, deleted = (route["body"] for route in users["routes"])
+        self.assertEqual(user["email"], "user@example.com")
+        self.assertEqual(page, {"items": [user] * 3, "next_cursor": None})
+        self.assertIs(deleted, True)
+        
+        latency = namespace["Latency"]("lognormal:20:100")
+        samples = sorted(latency.sample() for _ in range(20000))
+        self.assertAlmostEqual(sum(samples) / len(samples), 0.02, delta=0.003)
+        self.assertAlmostEqual(samples[int(0.99 * len(samples))], 0.1, delta=0.02)
+        
+        settings = {
+            "defaults": {"latency": "constant:30", "error_rate": 0, "max_rps": 0, "max_queue_ms": 1000},
+            "UserService": {"max_rps": 100, "max_queue_ms": 45,
+                            "routes": {"DELETE /users/:id": {"error_rate": 1}}},
+        }
+        standins = [namespace["StandIn"](spec, settings) for spec in namespace["STANDINS"]]
+        
+        async def request(standin, method, path):
+            reader, writer = await asyncio.open_connection(standin.host, standin.port)
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b"\r\n\r\n")
+            return int(head.split()[1]), body
+        
+        async def run():
+            for standin in standins:
+                await standin.start()
+            try:
+                started = time.perf_counter()
+                status, body = await request(standins[0], "GET", "/users/7")
+                elapsed = time.perf_counter() - started
+                results = [(status, json.loads(body))]
+                results.append(await request(standins[0], "DELETE", "/users/7"))
+                results.append(await request(standins[0], "GET", "/orders"))
+                results.append(await request(standins[1], "POST", "/charges"))
+                # Ten at once: 100/s admits one per 10ms, and the queue holds 45ms
+                burst = await asyncio.gather(*(request(standins[0], "GET", "/users") for _ in range(10)))
+                return elapsed, results, sorted(status for status, _ in burst)
+            finally:
+                for standin in standins:
+                    await standin.stop()
+        
+        elapsed, results, burst = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 0.03)
+        self.assertEqual(results[0], (200, user))
+        self.assertEqual([status for status, _ in results[1:]], [503, 404, 200])
+        self.assertEqual(results[3][1], b"{}")
+        self.assertEqual(burst, [200] * 5 + [503] * 5)
+        self.assertEqual(standins[0].stats["rejected"], 5)
+
+
+class TestSemanticAnalysis(unittest.TestCase):
+    """Test the latency budget analysis"""
+    
+    def analyze(self, code, hop_overhead=0.01):
+        from analyzer import LatencyAnalyzer
+        
+        ast = Parser(Lexer(code).tokenize()).parse()
+        return LatencyAnalyzer(hop_overhead).analyze(ast)
+    
+    def test_budget_violation(self):
+        """Test a caller whose timeout is shorter than its callee chain"""
+        report = self.analyze("""
+        service Gateway {
+            endpoint /orders { method: POST timeout: 5s }
+            connect to OrderService via http
+        }
+        service OrderService {
+            endpoint /orders { method: POST timeout: 3s }
+            connect to PaymentService via grpc
+            connect to NotificationService via kafka
+        }
+        service PaymentService {
+            endpoint /payments { method: POST timeout: 2s }
+        }
+        """)
+        
+        self.assertEqual([v.service for v in report.violations], ["Gateway"])
+        self.assertAlmostEqual(report.violations[0].required, 5.02)
+        self.assertEqual(report.critical_path, ["Gateway", "OrderService", "PaymentService"])
+        self.assertEqual(report.summary().strip(),
+                         "Critical path: Gateway -> OrderService -> PaymentService (5.02s worst case)")
+        self.assertEqual(report.unresolved, [])
+    
+    def test_cycle_detection(self):
+        """Test call cycles are reported"""
+        report = self.analyze("""
+        service A { connect to B via http }
+        service B { connect to C via http }
+        service C { connect to A via http }
+        """)
+        
+        self.assertEqual(len(report.cycles), 1)
+        self.assertEqual(sorted(report.cycles[0]), ["A", "B", "C"])
+    
+    def test_deep_call_chain(self):
+        """Test long call chains do not hit the recursion limit"""
+        from analyzer import LatencyAnalyzer
+        from ast_nodes import Program, Connection
+        
+        program = Program()
+        for i in range(5000):
+            service = Service(name=f"S{i}", endpoints=[Endpoint(path="/x", timeout="1s")])
+            if i + 1 < 5000:
+                service.connections.append(Connection(f"S{i + 1}"))
+            program.services.append(service)
+        
+        report = LatencyAnalyzer(0).analyze(program)
+        self.assertEqual(len(report.critical_path), 5000)
+        self.assertEqual(report.critical_latency, 4999)
+        self.assertEqual(report.summary().strip(),
+                         "Critical path: S0 -> S1 -> S2 -> ... 4994 more ... -> S4997 -> S4998 -> S4999 "
+                         "(4999s worst case)")
+
+
+class TestSimulator(unittest.TestCase):
+    """Test the discrete-event simulator"""
+    
+    def simulate(self, code, load_factors, **options):
+        from simulator import Simulator
+        
+        ast = Parser(Lexer(code).tokenize()).parse()
+        simulator = Simulator(ast, duration=20.0, **options)
+        return simulator, simulator.sweep(load_factors)
+    
+    def test_cache_and_rate_limit(self):
+        """Test cache hits and rate limit rejections are simulated"""
+        _, results = self.simulate("""
+        service API {
+            endpoint /items {
+                method: GET
+                cache: 1m
+            }
+            endpoint /orders {
+                method: POST
+                rateLimit: 60/m
+            }
+        }
+        """, [1.0])
+        
+        stats = results[0].services["API"]
+        self.assertGreater(stats.cache_hits, 150)
+        # 10 req/s offered against a 1 req/s limit
+        self.assertGreater(stats.rejected, 150)
+        self.assertGreater(results[0].events, 0)
+    
+    def test_saturation_point(self):
+        """Test saturation is detected as load increases"""
+        simulator, results = self.simulate("""
+        service Frontend {
+            endpoint /home { method: GET }
+            connect to Backend via http
+            replicas: 4
+        }
+        service Backend {
+            endpoint /data { method: GET }
+            replicas: 1
+        }
+        """, [1.0, 3.0], service_time=0.04, distribution="constant")
+        
+        # Backend gets 20 req/s at 1x (40% busy) and 60 req/s at 3x
+        points = simulator.saturation_points(results)
+        self.assertEqual(points["Backend"], 3.0)
+        self.assertIsNone(points["Frontend"])
+        self.assertLess(results[0].services["Backend"].percentile(99), 1.0)
+    
+    def test_cli_rejects_non_positive_rates(self):
+        """Test zero or negative rates and times are usage errors, not tracebacks"""
+        import argparse
+        from cloudscript import positive_float, positive_float_list
+        self.assertEqual(positive_float("2.5"), 2.5)
+        self.assertEqual(positive_float_list("1, 2,3"), [1.0, 2.0, 3.0])
+        for value in ("0", "-1", "nan", "fast"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                positive_float(value)
+        with self.assertRaisesRegex(argparse.ArgumentTypeError, "got 0"):
+            positive_float_list("1,0")
 
 
 class TestEndToEnd(unittest.TestCase):
@@ -262,6 +2235,162 @@ class TestEndToEnd(unittest.TestCase):
         openapi_gen = OpenAPIGenerator()
         spec = openapi_gen.generate_openapi(service)
         self.assertIn("UserService", spec)
+    
+    SHARDED_SOURCE = """
+    service UserService {
+        endpoint /users { method: GET response: User[] }
+        endpoint /users/:id { method: GET response: User }
+        endpoint /users { method: POST response: User }
+        connect to OrderService via http
+        replicas: 3
+    }
+    service OrderService {
+        endpoint /orders { method: GET response: Order[] }
+        endpoint /orders { method: POST response: Order }
+    }
+    service PaymentService {
+        endpoint /payments { method: POST response: Payment }
+    }
+    service SearchService {
+        endpoint /search { method: GET response: Result[] }
+    }
+    """
+    
+    def _compile(self, source, output, shard=None, shard_timings=None):
+        import contextlib
+        import io
+        from cloudscript import CloudScriptCompiler
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            CloudScriptCompiler(source, output).compile("all", shard=shard, shard_timings=shard_timings)
+        return stdout.getvalue()
+    
+    def _files(self, directory):
+        from pathlib import Path
+        root = Path(directory)
+        return {path.relative_to(root).as_posix(): path.read_bytes()
+                for path in root.rglob("*") if path.is_file()}
+    
+    def test_shard_plan(self):
+        """Test every service and the program land on exactly one shard, balanced by endpoints"""
+        from sharding import PROGRAM_UNIT, ShardError, parse_shard, plan_shards
+        ast = Parser(Lexer(self.SHARDED_SOURCE).tokenize()).parse()
+        for count in (1, 2, 3, 7):
+            plan = plan_shards(ast, count)
+            assigned = [unit for units in plan.units for unit in units]
+            self.assertEqual(sorted(assigned), sorted([PROGRAM_UNIT, "UserService", "OrderService",
+                                                       "PaymentService", "SearchService"]))
+            self.assertEqual(plan.units, plan_shards(ast, count).units)
+        
+        # Weights 4, 4 (program), 3, 2, 2 split 8 / 7
+        loads = [sum(plan_shards(ast, 2).weights[unit] for unit in units) for units in plan_shards(ast, 2).units]
+        self.assertEqual(sorted(loads), [7.0, 8.0])
+        
+        # Measured timings override the estimates, which are scaled to seconds (7s for 9 endpoints)
+        plan = plan_shards(ast, 2, {"SearchService": 5.0, "UserService": 1.0, "OrderService": 1.0})
+        self.assertEqual(plan.weights["SearchService"], 5.0)
+        self.assertAlmostEqual(plan.weights["PaymentService"], 2 * 7 / 9)
+        self.assertEqual(plan.units_for(1)[0], "SearchService")
+        
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "1", "a/b"):
+            with self.assertRaises(ShardError):
+                parse_shard(spec)
+    
+    def test_sharded_compile_merges_to_full_output(self):
+        """Test merging every shard reproduces an unsharded compile"""
+        import json
+        import tempfile
+        from sharding import MANIFEST_NAME, TIMINGS_NAME, ShardError, merge_shards
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "platform.cs")
+            with open(source, "w") as f:
+                f.write(self.SHARDED_SOURCE)
+            full = os.path.join(directory, "full")
+            # A clean compile still reports its critical path
+            self.assertIn("Critical path: UserService -> OrderService (", self._compile(source, full))
+            
+            shards = [os.path.join(directory, f"shard{i}") for i in (1, 2, 3)]
+            # Left in a reused output directory by some other compile; not part of shard 2
+            os.makedirs(os.path.join(shards[1], "retiredservice"))
+            with open(os.path.join(shards[1], "retiredservice", "app.py"), "w") as f:
+                f.write("# stale")
+            for index, shard_dir in enumerate(shards, 1):
+                self._compile(source, shard_dir, shard=(index, 3))
+            owners = [name for name in ("docker-compose.yml", "docs/gateway-openapi.json")
+                      for shard_dir in shards if os.path.exists(os.path.join(shard_dir, name))]
+            self.assertEqual(len(owners), 2)
+            
+            merged = os.path.join(directory, "merged")
+            timings = merge_shards(shards, merged)
+            self.assertEqual(sorted(timings["shards"]), ["1", "2", "3"])
+            self.assertEqual(len(timings["units"]), 5)
+            files = self._files(merged)
+            del files[TIMINGS_NAME]
+            self.assertEqual(files, self._files(full))
+            
+            # Timings from the merge rebalance the next run
+            self._compile(source, shards[0], shard=(1, 3), shard_timings=os.path.join(merged, TIMINGS_NAME))
+            with open(os.path.join(shards[0], MANIFEST_NAME)) as f:
+                self.assertTrue(json.load(f)["units"])
+            
+            with self.assertRaisesRegex(ShardError, "Missing shard"):
+                merge_shards(shards[1:], os.path.join(directory, "partial"))
+            with self.assertRaisesRegex(ShardError, "both shard 2"):
+                merge_shards([shards[1], shards[1], shards[2]], os.path.join(directory, "twice"))
+            with self.assertRaisesRegex(ShardError, "planned differently"):
+                merge_shards(shards, os.path.join(directory, "replanned"))
+            with self.assertRaisesRegex(ShardError, "No shard-manifest.json"):
+                merge_shards([full], os.path.join(directory, "unsharded"))
+
+
+class TestStartup(unittest.TestCase):
+    """CLI startup cost, measured with python -X importtime"""
+    
+    # Cumulative import time of cloudscript, in ms; the best of three runs must fit
+    IMPORT_BUDGET_MS = float(os.environ.get("CLOUDSCRIPT_IMPORT_BUDGET_MS", "150"))
+    
+    # Modules only some targets or commands need
+    LAZY_MODULES = {"yaml", "json", "concurrent.futures.process", "templates", "docker_generator",
+                    "grpc_generator", "kubernetes_generator", "openapi_generator", "mesh_generator",
+                    "loadtest_generator", "standin_generator", "simulator", "query"}
+    
+    SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    
+    def _import_times(self, *args):
+        """{module: cumulative microseconds} for one run of python -X importtime"""
+        import subprocess
+        result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=self.SRC,
+                                capture_output=True, text=True, check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative)
+        return times
+    
+    def test_targets_imported_lazily(self):
+        """Test importing the CLI loads no generator, and a target loads only its own"""
+        import tempfile
+        loaded = set(self._import_times("-c", "import cloudscript"))
+        self.assertIn("cloudscript", loaded)
+        self.assertEqual(loaded & self.LAZY_MODULES, set())
+        
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "service.cs")
+            with open(source, "w") as f:
+                f.write("service UserService { endpoint /users { method: GET response: User[] } }")
+            loaded = set(self._import_times("cloudscript.py", "compile", source, "-t", "docker",
+                                            "-o", os.path.join(directory, "out")))
+        self.assertIn("docker_generator", loaded)
+        self.assertEqual(loaded & {"yaml", "kubernetes_generator", "openapi_generator", "simulator"}, set())
+    
+    def test_import_time_budget(self):
+        """Test importing the CLI stays within its startup budget"""
+        best = min(self._import_times("-c", "import cloudscript")["cloudscript"] for _ in range(3)) / 1000
+        self.assertLess(best, self.IMPORT_BUDGET_MS,
+                        f"importing cloudscript took {best:.1f}ms; run python -X importtime -c "
+                        f"'import cloudscript' in src/ to see which imports grew")
 
 
 def run_tests():
@@ -272,8 +2401,18 @@ def run_tests():
     # Add all test classes
     suite.addTests(loader.loadTestsFromTestCase(TestLexer))
     suite.addTests(loader.loadTestsFromTestCase(TestParser))
+    suite.addTests(loader.loadTestsFromTestCase(TestErrorRecovery))
+    suite.addTests(loader.loadTestsFromTestCase(TestIntermediateRepresentation))
+    suite.addTests(loader.loadTestsFromTestCase(TestModules))
+    suite.addTests(loader.loadTestsFromTestCase(TestASTSerializer))
+    suite.addTests(loader.loadTestsFromTestCase(TestQuery))
+    suite.addTests(loader.loadTestsFromTestCase(TestTemplates))
+    suite.addTests(loader.loadTestsFromTestCase(TestLanguageServer))
     suite.addTests(loader.loadTestsFromTestCase(TestCodeGeneration))
+    suite.addTests(loader.loadTestsFromTestCase(TestSemanticAnalysis))
+    suite.addTests(loader.loadTestsFromTestCase(TestSimulator))
     suite.addTests(loader.loadTestsFromTestCase(TestEndToEnd))
+    suite.addTests(loader.loadTestsFromTestCase(TestStartup))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)